@@ -23,12 +23,52 @@ Options can be specified to configure otherwise.
 For example, small images can be scaled down ("options" : "scale=0.8") 
 or images too large for the page can have reduced height ("options" : "height=0.8\textheight")
 
+saveFigure accepts PNG, JPG, PDF and SVG images, and the other raster formats that 
+Pillow reads. SVG images are converted to PDF when they are saved (with cairosvg, 
+rsvg-convert or Inkscape), and TIFF, BMP, GIF and WebP images to PNG. Images are 
+copied losslessly, unless `rep.figureDpi` is set (e.g. to 300): raster images are 
+then downscaled to it at the print width. Conversions are cached by image content, 
+so LaTeX never has to convert anything at compile time.
+
+Figures can be shared between reports through an asset store
+(`rep.assetStore = AssetStore('../report/.assetStore')`). Each image is then
+stored once under its content hash and hard-linked into the figures folder
+of every report that uses it. Setting a `dpi` on the store also downscales
+oversized images to the target print resolution.
+
 ## Tables
 All Tables listed in the 'tables' section will be generated into tex files.
 Filename(s) of the actual data must be provided under 'files'.
 If multiple files are specified, they will be concatenated together.
 A single tex file will be generated and stored in the tables directory.
 
+Tables and figures can also be added lazily, bound to a pgIO query or a python
+function (`addLazyTable`, `addLazyFigure`). Their data is only fetched when 
+`makeReport` includes them (with `sectionOnly=True`, only when a section references 
+them), independent items are fetched concurrently, and with a render cache set the 
+data of functions is kept for later builds. Query results are only cached when a 
+`maxAge` is given, since the cache cannot see changes to the database.
+
+Dependencies can be declared on `rep.artifacts`, an `ArtifactGraph`: data extracts 
+read from a query, a pickle or a function of other extracts, and the tables and figures 
+made from them (`addData`, `addTable`, `addFigure`). `makeReport` then only rebuilds the 
+stale ones, in topological order, with independent branches in parallel.
+
+## Render Cache
+With a render cache set (`rep.renderCache = RenderCache()`), `saveTable` and 
+`plotFigure` hash their input data, caption and (for figures) the source of the 
+plotting function. Rendering is skipped when the same inputs were already rendered, 
+and the cached .tex/.png is reused instead. The cache is bounded in size, and 
+`rep.renderCache.report()` prints its hits and misses.
+
+## Manifest
+Every section, table and figure saved through the report is recorded in 
+`manifest.sqlite` in the report folder, with its caption, options or level, and 
+the hash, modification time and size of its file. `initialize()` restores them, so 
+a report reopened in a new process keeps the captions and section order of earlier 
+runs, and builds list figures and tables from the manifest in the order they were 
+added. `rep.manifest.stale()` lists the artifacts that were edited or removed since.
+
 ## Appendix 
 Mapping/LookUp tables in the form of csv files can be added to the end of the report. 
 List the file names under the 'appendix' list of the jsonConfig. 
@@ -40,4 +80,68 @@ A tex file will be created for each section you add, under the sections director
 You can also add subsections and subsubsections by defining the level. 
 
 The sections will later be added to the report in order.
+
+## Previews
+`makePreview()` renders the same sections, figures, tables and appendix to a 
+self-contained HTML file in the output folder, without running LaTeX. Tables saved 
+in the current session are rendered straight from their dataframes; everything else 
+is converted from the tex files. Use it to check content and layout, and only run 
+`makeReport()` for the final PDF.
+
+`python3 -m lib.LaTeXreport.watcher <name>` (or `make watch name=<name>`) keeps a 
+process running that rebuilds the preview, and with `--pdf` the PDF, whenever a file 
+in the report folders changes. Only changed images and tables are converted again, 
+and the main tex file is only regenerated when files are added or removed.
+
+## Build Profiles
+`makeReport(profile=True)` records the time and memory peak of every build stage 
+(reset, sections, figures, tables, appendix, tex dump and each compiler pass), along 
+with counts of sections, images, tables and appendix rows. The profile is written to 
+`output/<name>.profile.json`, the previous one is kept as `<name>.profile.prev.json`, 
+and the two are printed side by side.
+
+## Concurrent Builds
+Several jobs may build the same report at once, e.g. when a retried task overlaps the 
+original. `makeReport` holds a lock on the report, and every table, figure and section 
+is written under a lock of its own (`rep.lock(name)`, a file lock in `.locks/`), through 
+a temporary file and a rename. Different artifacts are written in parallel; a builder 
+that waited for another one to write the same table or figure reuses it if the data 
+is the same.
+
+## Build Folder
+The tex is generated and compiled in the `.build` folder of the report, never in the 
+output folder. The aux and log files of the compiler stay in the build folder and are 
+reused by the next build, and only the final .tex and PDF are copied to the output folder, 
+each with an atomic rename, so readers never see a half-written PDF. Set 
+`rep.buildDir = 'tmpfs'` (or any fast local folder) to build outside the report folder, 
+e.g. when it is on a network drive.
+
+## PDF Optimization
+Set `rep.pdfOptimize = {}` to shrink the PDF after it is compiled: duplicate embedded 
+images are stored once, streams are recompressed into object streams, and the file is 
+linearized for fast first page display. Options (see `pdfOptimize.DEFAULTS`) are set per 
+report, e.g. `rep.pdfOptimize = {'imageQuality': 85}` also re-encodes large images as JPEG. 
+The sizes before and after are printed. Uses pikepdf, or qpdf if pikepdf is not installed.
+
+## Section-wise Builds
+`makeReport(bySection=True)` compiles every section to its own PDF in parallel, with 
+the preamble of the report and the counters (section, figure, table, ...) it starts at, 
+and includes the section PDFs with pdfpages, which adds the page numbers, bookmarks and 
+table of contents entries. A section is only recompiled when it, a file it inputs, the 
+preamble or its start counters change, so a small edit only recompiles one section. 
+References between sections are not resolved in this mode.
+
+## Notebook Previews
+`rep.previewSnippet('Introduction')` renders one section (or with `kind='table'`,
+`'figure'` or `'tex'`, a table, a figure or any tex) with the preamble of the report,
+and returns its pages as images that a notebook displays inline (`fmt='png'` or `'svg'`).
+The preamble is compiled once into a format file in `output/.snippets`, and a snippet
+is only recompiled when it, a file it inputs or the preamble changes. Needs poppler
+(pdftocairo or pdftoppm) or PyMuPDF to convert the PDF into images.
+
+## Large Reports
+`StreamingReport` (in `texStream`) has the same API as `Report`, but writes the 
+tex body to disk as content is added instead of holding a pylatex tree in memory, 
+and streams mapping table rows into the appendix in chunks. The generated tex is 
+identical. Compare both backends with `make benchmark`.
 """
\ No newline at end of file
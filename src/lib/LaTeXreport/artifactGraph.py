@@ -0,0 +1,271 @@
+import os, time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.LaTeXreport.renderCache import makeKey
+
+class ArtifactNode():
+    """A node of the artifact graph: a data extract, a table or a figure.
+
+    The data of a node comes from exactly one of a database query, a
+    pickle file, or a function of the data of its (inputs). A table or
+    figure without a source of its own takes the data of its single input
+    (or the list of data of several inputs, which saveTable concatenates).
+    """
+    def __init__(self, name, kind, inputs=(), query=None, values=None, dbName=None, columns=None,
+                 pickle=None, func=None, plotFunc=None, params={}, caption='', option='', maxAge=None):
+        """Arguments:
+            name {str} -- Name of the node. Tables and figures are saved under this name.
+            kind {str} -- One of 'data', 'table' or 'figure'.
+
+        Keyword Arguments:
+            inputs {list} -- Names of the nodes whose data this node uses. (default: {()})
+            query {str} -- Query to run with pgIO.getAllData. (default: {None})
+            values {tuple} -- Values passed along with the (query). (default: {None})
+            dbName {str} -- Database to run the (query) on. (default: {None}, the default database)
+            columns {list} -- Column names for the rows returned by the (query). (default: {None})
+            pickle {str} -- Path of a pickled dataframe to read. (default: {None})
+            func {callable} -- Called with the data of the (inputs), in order. (default: {None})
+            plotFunc {callable} -- For figures, called as plotFunc(data, **params). (default: {None})
+            caption {str} -- Caption of the table or figure. (default: {''})
+            option {str} -- Tex options of a figure. (default: {''})
+            maxAge {float} -- Rebuild after this many seconds even if nothing changed, e.g. for
+            queries on tables that are updated. (default: {None}, never)
+        """
+        sources = [s for s in (query, pickle, func) if s is not None]
+        if len(sources) > 1:
+            raise ValueError(f'{name}: give at most one of a query, a pickle or a func.')
+        if sources == [] and (kind == 'data' or len(inputs) == 0):
+            raise ValueError(f'{name}: give a query, a pickle or a func, or inputs.')
+        if kind == 'figure' and plotFunc is None:
+            raise ValueError(f'{name}: a figure needs a plotFunc.')
+
+        self.name = name
+        self.kind = kind
+        self.inputs = list(inputs)
+        self.query = query
+        self.values = values
+        self.dbName = dbName
+        self.columns = columns
+        self.pickle = pickle
+        self.func = func
+        self.plotFunc = plotFunc
+        self.params = params
+        self.caption = caption
+        self.option = option
+        self.maxAge = maxAge
+        return
+
+    def source(self):
+        """Returns a description of where the data of this node comes from.
+        """
+        if self.query is not None:
+            return f'query: {self.query}'
+        if self.pickle is not None:
+            return f'pickle: {self.pickle}'
+        if self.func is not None:
+            return f'function: {getattr(self.func, "__module__", "")}.{getattr(self.func, "__qualname__", repr(self.func))}'
+        return 'inputs: ' + ', '.join(self.inputs)
+
+    def definition(self):
+        """Returns everything that defines this node, apart from its inputs.
+        Pickles are included by the hash of their file, functions by their source.
+        """
+        parts = [self.kind, self.query, self.values, self.dbName, self.columns,
+                 self.func, self.plotFunc, self.params, self.caption, self.option]
+        if self.pickle is not None:
+            parts.append(self.hashFile(self.pickle) if os.path.exists(self.pickle) else None)
+        return parts
+
+    def hashFile(self, fpath, chunkSize=1<<20):
+        """Returns the sha256 hex digest of the file at (fpath), without loading it.
+        """
+        h = hashlib.sha256()
+        with open(fpath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunkSize), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def load(self, inputs):
+        """Returns the data of this node, given the data of its (inputs).
+        This runs in a worker thread.
+        """
+        import pandas as pd
+        if self.query is not None:
+            from lib.databaseIO import pgIO
+            rows = pgIO.getAllData(self.query, self.values, dbName=self.dbName)
+            if rows is None:
+                raise RuntimeError(f'the query for {self.name} failed. Check the logs.')
+            return pd.DataFrame(rows, columns=self.columns)
+        if self.pickle is not None:
+            return pd.read_pickle(self.pickle)
+        if self.func is not None:
+            return self.func(*inputs)
+        return inputs[0] if len(inputs) == 1 else list(inputs)
+
+    def outputPath(self, rep):
+        """Returns the file the node is saved to, or None for data nodes.
+        """
+        if self.kind == 'table':
+            return os.path.join(rep.fpath, 'tables', self.name + '.tex')
+        if self.kind == 'figure':
+            return os.path.join(rep.fpath, 'figures', self.name + '.png')
+        return None
+
+    def render(self, rep, data):
+        """Save the table or figure into the report (rep).
+        """
+        if self.kind == 'table':
+            rep.saveTable(self.name, data, caption=self.caption, override=True)
+        elif self.kind == 'figure':
+            rep.plotFigure(self.name, self.plotFunc, data, self.params,
+                           caption=self.caption, option=self.option, override=True)
+        return
+
+class ArtifactGraph():
+    """Declared dependencies between the data extracts, tables and figures
+    of a report.
+
+    Every node is keyed by a hash of its definition and the keys of its
+    inputs, so a changed query, pickle or function makes the node and
+    everything downstream of it stale. build() only rebuilds stale nodes,
+    in topological order, running the independent nodes of each generation
+    in parallel. The keys of the last build are kept in the report manifest.
+    With a render cache set on the report, the data of every node is cached
+    as well, so that upstream nodes that did not change need not be rerun.
+    """
+    def __init__(self, rep, workers=4):
+        """Arguments:
+            rep {Report} -- The report the tables and figures are saved into.
+
+        Keyword Arguments:
+            workers {int} -- Number of nodes loaded at the same time. (default: {4})
+        """
+        import networkx as nx
+        self.rep = rep
+        self.workers = workers
+        self.graph = nx.DiGraph()
+        return
+
+    def add(self, name, kind, inputs=(), **kwargs):
+        """Add a node. See ArtifactNode for the arguments.
+        """
+        node = ArtifactNode(name, kind, inputs, **kwargs)
+        if name in self.graph:
+            old = list(self.graph.predecessors(name))
+            self.graph.remove_edges_from(list(self.graph.in_edges(name)))
+            # inputs that were never added, and that nothing else uses any more
+            self.graph.remove_nodes_from([i for i in old if 'node' not in self.graph.nodes[i]
+                                          and self.graph.out_degree(i) == 0])
+        self.graph.add_node(name, node=node)
+        for inp in node.inputs:
+            self.graph.add_edge(inp, name)
+        return node
+
+    def addData(self, name, inputs=(), **kwargs):
+        return self.add(name, 'data', inputs, **kwargs)
+
+    def addTable(self, name, inputs=(), **kwargs):
+        return self.add(name, 'table', inputs, **kwargs)
+
+    def addFigure(self, name, plotFunc, inputs=(), **kwargs):
+        return self.add(name, 'figure', inputs, plotFunc=plotFunc, **kwargs)
+
+    def check(self):
+        """Raise a ValueError for inputs that were never added, and for cycles.
+        """
+        import networkx as nx
+        missing = [n for n, d in self.graph.nodes(data=True) if 'node' not in d]
+        if missing != []:
+            raise ValueError(f'Unknown artifact inputs: {", ".join(sorted(missing))}')
+        if not nx.is_directed_acyclic_graph(self.graph):
+            cycle = nx.find_cycle(self.graph)
+            raise ValueError('Artifact dependencies form a cycle: ' + ' -> '.join(u for u, _ in cycle))
+        return
+
+    def keys(self):
+        """Returns the key of every node, computed in topological order.
+        """
+        import networkx as nx
+        keys = {}
+        for name in nx.topological_sort(self.graph):
+            node = self.graph.nodes[name]['node']
+            keys[name] = makeKey(node.definition(), [keys[i] for i in node.inputs])
+        return keys
+
+    def stale(self, keys=None):
+        """Returns the nodes that changed since their last build, whose output
+        file is missing, or whose last build is older than their maxAge.
+        """
+        import networkx as nx
+        self.check()
+        keys = keys or self.keys()
+        builds = self.rep.manifest.builds() if self.rep.manifest is not None else {}
+        stale = set()
+        for name, key in keys.items():
+            node = self.graph.nodes[name]['node']
+            last = builds.get(name)
+            out = node.outputPath(self.rep)
+            if (last is None or last['key'] != key
+                    or (out is not None and not os.path.exists(out))
+                    or (node.maxAge is not None and time.time() - last['built'] > node.maxAge)):
+                stale.add(name)
+        # everything downstream of a stale node is stale too
+        for name in list(stale):
+            stale |= nx.descendants(self.graph, name)
+        return stale
+
+    def build(self, force=False):
+        """Rebuild the stale nodes (all of them with (force)), and save the
+        tables and figures among them into the report.
+
+        Returns:
+            dict -- The names of the nodes that were 'built', that 'failed',
+            and that were 'skipped' because one of their inputs failed.
+        """
+        import networkx as nx
+        self.check()
+        keys = self.keys()
+        stale = set(keys) if force else self.stale(keys)
+        cache = self.rep.renderCache
+
+        # Walk up from the stale nodes, and also run the inputs whose data is not cached
+        run, data = set(stale), {}
+        for name in reversed(list(nx.topological_sort(self.graph))):
+            if name not in run:
+                continue
+            for inp in self.graph.nodes[name]['node'].inputs:
+                if inp in run or inp in data:
+                    continue
+                hit, obj = cache.getObject(keys[inp]) if cache is not None else (False, None)
+                if hit:
+                    data[inp] = obj
+                else:
+                    run.add(inp)
+
+        result = {'built': [], 'failed': [], 'skipped': []}
+        for generation in nx.topological_generations(self.graph.subgraph(run)):
+            nodes = [self.graph.nodes[name]['node'] for name in sorted(generation)]
+            ready = [n for n in nodes if all(i in data for i in n.inputs)]
+            result['skipped'] += [n.name for n in nodes if n not in ready]
+
+            with ThreadPoolExecutor(max_workers=self.workers) as ex:
+                futures = {n.name: ex.submit(n.load, [data[i] for i in n.inputs]) for n in ready}
+            for node in ready: # saved on this thread, since matplotlib is not thread safe
+                try:
+                    data[node.name] = futures[node.name].result()
+                    node.render(self.rep, data[node.name])
+                except Exception as e:
+                    print(f'Error: unable to build {node.name}: {e}')
+                    data.pop(node.name, None)
+                    result['failed'].append(node.name)
+                    continue
+                if cache is not None:
+                    cache.putObject(keys[node.name], data[node.name])
+                if self.rep.manifest is not None:
+                    self.rep.manifest.recordBuild(node.name, keys[node.name], node.source())
+                result['built'].append(node.name)
+
+        print(f'Built {len(result["built"])} of {len(keys)} artifacts '
+              f'({len(stale)} stale, {len(result["failed"])} failed, {len(result["skipped"])} skipped).')
+        return result
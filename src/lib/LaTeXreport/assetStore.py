@@ -0,0 +1,231 @@
+import os, stat
+import threading
+import shutil
+import hashlib
+import subprocess
+
+VECTOR = ('.svg',) # converted to PDF when stored
+RASTER = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif', '.webp') # read with Pillow
+CONVERTED = ('.tif', '.tiff', '.bmp', '.gif', '.webp') # not included by LaTeX, converted to PNG when stored
+FIGURES = ('.png', '.pdf', '.jpg', '.jpeg') # figure files that LaTeX includes
+UNTRACKED = '.untracked' # marks an object that was symlinked or copied into a report, see prune
+
+def storedExt(fpath):
+    """Returns the extension (fpath) has once it is stored.
+    """
+    ext = os.path.splitext(fpath)[1].lower()
+    if ext in VECTOR:
+        return '.pdf'
+    return '.png' if ext in CONVERTED else ext
+
+def tmpName(path):
+    """Returns a temporary name next to (path), unique to this process
+    and thread, to write to before an atomic os.replace.
+    """
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+class AssetStore():
+    """Content-addressed store for report figures.
+
+    Figures are hashed and kept once under (root), no matter how many
+    reports or reruns use them. Each report then gets a hard link (or a
+    symlink, or as a last resort a copy) to the stored object inside its
+    own figures folder.
+
+    Objects in the store are made read-only, since every report linking
+    to them shares the same file. Always replace a figure through
+    Report.saveFigure rather than writing over the linked file.
+
+    SVG figures are converted to PDF once, when they are stored, so that
+    compiling the report never needs to shell out for a conversion. Raster
+    formats that LaTeX cannot include (TIFF, BMP, GIF, WebP) are converted
+    to PNG the same way.
+    """
+    def __init__(self, root='../report/.assetStore', dpi=None, printWidth=6.5,
+                 linkMode='hardlink'):
+        """Keyword Arguments:
+            root {str} -- Folder where the stored objects live. It is shared between reports. (default: {'../report/.assetStore'})
+            dpi {int} -- Optional target print resolution. Raster images (PNG, JPEG, TIFF, ...) wider than
+            (dpi * printWidth) pixels are downscaled and recompressed before they are stored. Requires Pillow.
+            (default: {None}, images are stored as they are)
+            printWidth {float} -- Widest the figure will be printed, in inches. (default: {6.5})
+            linkMode {str} -- One of 'hardlink', 'symlink' or 'copy'. Falls back to the next one if the
+            filesystem does not support it. (default: {'hardlink'})
+        """
+        self.root = root
+        self.dpi = dpi
+        self.printWidth = printWidth
+        self.linkMode = linkMode
+        return
+
+    def hashFile(self, fpath, chunkSize=1<<20):
+        """Returns the sha256 hex digest of the file at (fpath).
+        """
+        h = hashlib.sha256()
+        with open(fpath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunkSize), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def objectPath(self, key, ext='.png'):
+        """Location of the object (key) in the store. Objects are
+        spread over sub-folders named after the first two hex digits.
+        """
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def add(self, fpath):
+        """Add the file at (fpath) to the store, if it is not already there.
+
+        Arguments:
+            fpath {str} -- Location of the original file.
+
+        Returns:
+            str -- Path of the stored object.
+        """
+        ext = os.path.splitext(fpath)[1].lower()
+        key = self.hashFile(fpath)
+        if self.dpi is not None and ext in RASTER:
+            # processing parameters are part of the key
+            key = hashlib.sha256(f'{key}:{self.dpi}:{self.printWidth}'.encode()).hexdigest()
+        elif ext in VECTOR:
+            key = hashlib.sha256(f'{key}:pdf'.encode()).hexdigest()
+        elif ext in CONVERTED:
+            key = hashlib.sha256(f'{key}:png'.encode()).hexdigest()
+
+        objPath = self.objectPath(key, storedExt(fpath))
+        if os.path.exists(objPath):
+            return objPath
+
+        os.makedirs(os.path.dirname(objPath), exist_ok=True)
+        tmpPath = tmpName(objPath)
+        if self.dpi is not None and ext in RASTER:
+            try:
+                self.downscale(fpath, tmpPath)
+            except ImportError:
+                if ext in CONVERTED:
+                    raise
+                print('Pillow is not installed. Storing the image at its original resolution.')
+                shutil.copyfile(fpath, tmpPath)
+        elif ext in VECTOR:
+            self.toPdf(fpath, tmpPath)
+        elif ext in CONVERTED:
+            self.toPng(fpath, tmpPath)
+        else:
+            shutil.copyfile(fpath, tmpPath)
+        os.chmod(tmpPath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmpPath, objPath)
+        print(f'Stored {os.path.basename(fpath)} as {key[:12]} in {self.root}.')
+        return objPath
+
+    def toPdf(self, fpath, outPath):
+        """Convert the SVG at (fpath) to a PDF at (outPath), with cairosvg if
+        it is installed, and otherwise with rsvg-convert or Inkscape.
+        """
+        try:
+            import cairosvg
+            cairosvg.svg2pdf(url=fpath, write_to=outPath)
+            return
+        except ImportError:
+            pass
+
+        if shutil.which('rsvg-convert'):
+            cmd = ['rsvg-convert', '-f', 'pdf', '-o', outPath, fpath]
+        elif shutil.which('inkscape'):
+            cmd = ['inkscape', fpath, '--export-type=pdf', f'--export-filename={outPath}']
+        else:
+            raise RuntimeError(f'Unable to convert {fpath} to PDF. Install cairosvg, rsvg-convert or Inkscape.')
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        return
+
+    def toPng(self, fpath, outPath):
+        """Convert a raster image that LaTeX cannot include, such as a TIFF,
+        to a PNG at its original resolution. Requires Pillow.
+        """
+        from PIL import Image
+
+        with Image.open(fpath) as img:
+            img.save(outPath, format='PNG', optimize=True)
+        return
+
+    def downscale(self, fpath, outPath):
+        """Resize a raster image so that it is no wider than the target
+        DPI at the print width. JPEG images are written as JPEG, and all
+        other formats as optimized PNG. Images that are already small
+        enough are only recompressed, apart from JPEG images, which are
+        copied as they are.
+        """
+        from PIL import Image
+
+        maxWidth = int(self.dpi * self.printWidth)
+        jpeg = os.path.splitext(fpath)[1].lower() in ('.jpg', '.jpeg')
+        with Image.open(fpath) as img:
+            if jpeg and img.width <= maxWidth:
+                shutil.copyfile(fpath, outPath) # recompressing would only lose quality
+                return
+            if img.width > maxWidth:
+                height = max(1, round(img.height * maxWidth / img.width))
+                img = img.resize((maxWidth, height), Image.LANCZOS)
+            if jpeg:
+                img.convert('RGB').save(outPath, format='JPEG', quality=90, optimize=True, dpi=(self.dpi, self.dpi))
+            else:
+                img.save(outPath, format='PNG', optimize=True, dpi=(self.dpi, self.dpi))
+        return
+
+    def link(self, objPath, dest):
+        """Place the stored object (objPath) at (dest). An existing file
+        at (dest) is replaced, unless it is already the same object.
+        """
+        if os.path.exists(dest) and os.path.samefile(objPath, dest):
+            return
+
+        tmpDest = tmpName(dest)
+        modes = ['hardlink', 'symlink', 'copy']
+        for mode in modes[modes.index(self.linkMode):]:
+            try:
+                if mode == 'hardlink':
+                    os.link(objPath, tmpDest)
+                elif mode == 'symlink':
+                    os.symlink(os.path.abspath(objPath), tmpDest)
+                else:
+                    shutil.copyfile(objPath, tmpDest)
+                break
+            except OSError:
+                continue
+        if mode != 'hardlink' and not os.path.exists(objPath + UNTRACKED):
+            # e.g. the report is on another filesystem. Its use of the
+            # object cannot be seen from the link count any more.
+            open(objPath + UNTRACKED, 'w').close()
+        os.replace(tmpDest, dest)
+        return
+
+    def place(self, fpath, dest):
+        """Store (fpath) and link it to (dest) in one go.
+        """
+        self.link(self.add(fpath), dest)
+        return
+
+    def prune(self):
+        """Remove stored objects that are no longer linked from any report.
+        Only hard links can be tracked: with linkMode='symlink' or 'copy'
+        every object has a single link, so nothing is removed, and objects
+        that were ever symlinked or copied into a report, because a hard
+        link failed, are kept.
+
+        Returns:
+            int -- Number of objects removed.
+        """
+        if self.linkMode != 'hardlink':
+            print(f'Objects in {self.root} are not hard linked, so unused ones cannot be found. Nothing is pruned.')
+            return 0
+
+        removed = 0
+        for dirPath, _, files in os.walk(self.root):
+            for f in files:
+                objPath = os.path.join(dirPath, f)
+                if f.endswith(('.tmp', UNTRACKED)) or os.path.exists(objPath + UNTRACKED):
+                    continue # being written, or in use without a hard link
+                if os.stat(objPath).st_nlink == 1:
+                    os.remove(objPath)
+                    removed += 1
+        print(f'Removed {removed} unused objects from {self.root}.')
+        return removed
@@ -0,0 +1,82 @@
+'''Benchmarks for the report writers
+
+Run from the ``src`` folder with::
+
+    python3 -m lib.LaTeXreport.benchmarks --sections 200 --rows 100000
+
+Each benchmark builds the same synthetic report in a temporary folder
+with every backend, and prints the wall time and the peak Python memory
+of generating the tex document.
+'''
+import os, io, time
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from lib.LaTeXreport.reportWriter import Report
+from lib.LaTeXreport.texStream import StreamingReport
+
+def makeInputs(rep, nSections, nTables, nRows):
+    """Populate (rep) with (nSections) sections, (nTables) small tables
+    and a 3-column and a 2-column mapping table with (nRows) rows each.
+    """
+    for i in range(nSections):
+        rep.addSection(f'Section {i}')
+
+    tbl = pd.DataFrame({'a': range(20), 'b': [0.5] * 20})
+    for i in range(nTables):
+        rep.saveTable(f'Table{i}', tbl, caption=f'Table {i}')
+
+    apdxPath = os.path.join(rep.fpath, 'mappingTables')
+    pd.DataFrame({0: range(nRows), 1: range(1, nRows + 1), 2: ['Category'] * nRows}
+        ).to_csv(os.path.join(apdxPath, 'Ranges.csv'), header=False, index=False)
+    pd.DataFrame({0: [f'code{i}' for i in range(nRows)], 1: [f'Group{i % 50}' for i in range(nRows)]}
+        ).to_csv(os.path.join(apdxPath, 'Codes.csv'), header=False, index=False)
+    return
+
+def benchTexWriter(nSections=200, nTables=50, nRows=100000):
+    """Compare the in-memory pylatex Report with the StreamingReport
+    on generating the tex of the same report.
+
+    Returns:
+        dict -- For each backend, the time in seconds and the peak memory in MB.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for cls in [Report, StreamingReport]:
+            rep = cls('Bench')
+            with redirect_stdout(io.StringIO()):
+                rep.initialize(os.path.join(tmp, cls.__name__))
+                makeInputs(rep, nSections, nTables, nRows)
+
+                t0 = time.perf_counter()
+                rep.makeReport(tex_only=True)
+                seconds = time.perf_counter() - t0
+
+                tracemalloc.start()
+                rep.makeReport(tex_only=True)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            texSize = os.path.getsize(os.path.join(rep.outputPath, 'Bench.tex'))
+            results[cls.__name__] = {'seconds': seconds, 'peakMB': peak / 2**20,
+                                     'texMB': texSize / 2**20}
+
+    print(f'{nSections} sections, {nTables} tables, 2 x {nRows} appendix rows')
+    print(f'{"backend":<18}{"time [s]":>10}{"peak [MB]":>12}{"tex [MB]":>10}')
+    for name, r in results.items():
+        print(f'{name:<18}{r["seconds"]:>10.2f}{r["peakMB"]:>12.1f}{r["texMB"]:>10.1f}')
+    return results
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='report writer benchmarks')
+    parser.add_argument('--sections', type=int, default=200, help='number of sections')
+    parser.add_argument('--tables',   type=int, default=50,  help='number of tables')
+    parser.add_argument('--rows',     type=int, default=100000, help='rows in each mapping table')
+    args = parser.parse_args()
+
+    benchTexWriter(args.sections, args.tables, args.rows)
@@ -0,0 +1,126 @@
+import os, sys
+import json
+import time
+import resource
+import tracemalloc
+from datetime import datetime as dt
+from contextlib import contextmanager
+
+class BuildProfile():
+    """Stage timings, memory peaks and counts of a single report build.
+
+    Wrap each stage of the build in `with profile.stage(name):`. The wall
+    time of the stage and the peak Python memory allocated during it are
+    recorded, together with the peak resident memory of any child process
+    (such as pdflatex) that finished by then. A disabled profile records
+    nothing, so that the build code does not need to branch on it.
+    """
+    def __init__(self, enabled=True, memory=True):
+        """Keyword Arguments:
+            enabled {bool} -- Whether anything is recorded at all. (default: {True})
+            memory {bool} -- Also record Python memory peaks. This slows the build down. (default: {True})
+        """
+        self.enabled = enabled
+        self.memory = memory
+        self.stages = []
+        self.counts = {}
+        self.started = dt.now().isoformat(timespec='seconds')
+        return
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        # The peak of a tracemalloc started by someone else is left alone.
+        # The stage then reports that peak if it was reached during the
+        # stage, and otherwise the most memory it saw at its start or end.
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory() if self.memory else None
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'name': name, 'seconds': time.perf_counter() - t0}
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                if not tracing and peak <= before[1]:
+                    peak = max(before[0], current)
+                record['peakMB'] = peak / 2**20
+            if tracing:
+                tracemalloc.stop()
+            maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            scale = 2**20 if sys.platform == 'darwin' else 2**10 # bytes on macOS, kB elsewhere
+            record['childMaxRssMB'] = maxrss / scale
+            self.stages.append(record)
+        return
+
+    def count(self, name, n=1):
+        """Add (n) to the counter (name), e.g. the number of images.
+        """
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+        return
+
+    def total(self):
+        return sum(s['seconds'] for s in self.stages)
+
+    def toDict(self):
+        return {
+            'started' : self.started,
+            'total'   : self.total(),
+            'stages'  : self.stages,
+            'counts'  : self.counts
+        }
+
+    def save(self, fpath):
+        """Write the profile as JSON to (fpath). A profile already at (fpath)
+        is kept as the previous build, with '.prev' before the extension.
+
+        Returns:
+            dict or None -- The previous profile, if there was one.
+        """
+        if not self.enabled:
+            return None
+
+        previous = None
+        if os.path.exists(fpath):
+            with open(fpath) as f:
+                previous = json.load(f)
+            root, ext = os.path.splitext(fpath)
+            os.replace(fpath, root + '.prev' + ext)
+
+        with open(fpath, 'w') as f:
+            json.dump(self.toDict(), f, indent=4)
+        print(f'Build profile written to {fpath}')
+        return previous
+
+    def compare(self, previous):
+        """Print the stage timings and counts of this build next to those
+        of a (previous) profile.
+
+        Returns:
+            dict -- For every stage and counter, the previous and current values.
+        """
+        prevStages = {s['name']: s['seconds'] for s in previous.get('stages', [])}
+        diffs = {}
+        print(f'{"stage":<24}{"previous [s]":>14}{"current [s]":>14}{"change":>10}')
+        rows = [(s['name'], prevStages.get(s['name']), s['seconds']) for s in self.stages]
+        rows.append(('total', previous.get('total'), self.total()))
+        for name, before, after in rows:
+            diffs[name] = (before, after)
+            if before is None:
+                print(f'{name:<24}{"-":>14}{after:>14.3f}{"new":>10}')
+            else:
+                change = (after - before) / before * 100 if before > 0 else 0
+                print(f'{name:<24}{before:>14.3f}{after:>14.3f}{change:>+9.0f}%')
+
+        for name, value in self.counts.items():
+            before = previous.get('counts', {}).get(name)
+            diffs[name] = (before, value)
+            if before != value:
+                print(f'{name:<24}{str(before):>14}{value:>14}')
+        return diffs
@@ -0,0 +1,378 @@
+import os, re, glob
+import html
+import base64
+
+from lib.LaTeXreport.assetStore import FIGURES, VECTOR
+
+LIPSUM = ('Lorem ipsum dolor sit amet, consectetuer adipiscing elit. Ut purus elit, '
+          'vestibulum ut, placerat ac, adipiscing vitae, felis. Curabitur dictum gravida '
+          'mauris. Nam arcu libero, nonummy eget, consectetuer id, vulputate a, magna.')
+
+HEADINGS = {'section': 'h2', 'subsection': 'h3', 'subsubsection': 'h4'}
+INLINE   = {'textbf': 'b', 'textit': 'i', 'emph': 'em', 'texttt': 'code', 'underline': 'u'}
+TABULARS = {'tabular': 1, 'tabularx': 2, 'longtable': 1, 'longtabularx': 2, 'tabu': 1}
+IGNORED_ROWS = re.compile(r'\\(toprule|midrule|bottomrule|hline|endhead|endfirsthead|'
+                          r'endfoot|endlastfoot)|\\cline\{[^}]*\}')
+MIME = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.svg': 'image/svg+xml',
+        '.pdf': 'application/pdf'}
+
+STYLE = '''
+body { font-family: Georgia, serif; max-width: 50em; margin: 2em auto; line-height: 1.5; }
+header { text-align: center; margin-bottom: 2em; }
+figure { text-align: center; margin: 1.5em 0; }
+embed { width: 80%; height: 40em; }
+figcaption, .caption { font-size: 0.9em; color: #444; text-align: center; }
+table { border-collapse: collapse; margin: 1em auto; font-size: 0.9em; }
+th, td { border-bottom: 1px solid #ccc; padding: 0.2em 0.6em; text-align: right; }
+.math { font-family: monospace; color: #555; }
+.missing { color: #b00; }
+.center { text-align: center; }
+'''
+
+class TexToHTML():
+    """A small converter for the subset of LaTeX found in report sections.
+
+    Headings, text formatting, links, figures, tables, lists and the
+    lipsum placeholder are converted. Maths is shown as source. Unknown
+    commands are dropped and their arguments are kept as text. Tables that
+    were saved through Report.saveTable in this session are rendered
+    straight from their dataframes.
+    """
+    def __init__(self, rep, cache=None):
+        """Keyword Arguments:
+            cache {dict} -- Converted images, tables and mapping tables, kept between 
+            conversions. Only files that changed since are converted again. (default: {None})
+        """
+        self.rep = rep
+        self.cache = cache
+        return
+
+    def cached(self, fpath, render):
+        """Returns render(fpath), reusing the result of an earlier conversion
+        as long as the file at (fpath) is unchanged.
+        """
+        if self.cache is None:
+            return render(fpath)
+        st = os.stat(fpath)
+        stamp = (st.st_mtime_ns, st.st_size)
+        hit = self.cache.get(fpath)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        out = render(fpath)
+        self.cache[fpath] = (stamp, out)
+        return out
+
+    def readFile(self, fpath):
+        with open(fpath) as f:
+            return self.convert(f.read())
+
+    def readGroup(self, tex, i, close='}'):
+        """Returns the content of the group opened at tex[i] and the
+        index just after its closing bracket.
+        """
+        openChar = tex[i]
+        depth, j = 0, i
+        while j < len(tex):
+            c = tex[j]
+            if c == '\\':
+                j += 2
+                continue
+            if c == openChar:
+                depth += 1
+            elif c == close:
+                depth -= 1
+                if depth == 0:
+                    return tex[i+1:j], j+1
+            j += 1
+        return tex[i+1:], len(tex)
+
+    def skipSpace(self, tex, i):
+        while i < len(tex) and tex[i] in ' \t\n':
+            i += 1
+        return i
+
+    def optional(self, tex, i):
+        """Reads an optional [argument] at tex[i], if there is one.
+        """
+        if i < len(tex) and tex[i] == '[':
+            return self.readGroup(tex, i, close=']')
+        return '', i
+
+    def argument(self, tex, i):
+        """Reads a mandatory {argument} at tex[i], if there is one.
+        """
+        j = self.skipSpace(tex, i)
+        if j < len(tex) and tex[j] == '{':
+            return self.readGroup(tex, j)
+        return '', i
+
+    def convert(self, tex):
+        """Convert the LaTeX string (tex) to HTML.
+        """
+        tex = re.sub(r'(?<!\\)%[^\n]*\n?', '', tex)
+        out = []
+        text = re.compile(r'[^\\${}~\n]+')
+        i = 0
+        while i < len(tex):
+            c = tex[i]
+            if c == '\\':
+                i = self.command(tex, i, out)
+            elif c == '$':
+                end = tex.find('$', i+1)
+                end = len(tex) if end < 0 else end
+                out.append(f'<span class="math">{html.escape(tex[i+1:end])}</span>')
+                i = end + 1
+            elif c == '\n':
+                j = self.skipSpace(tex, i)
+                out.append('</p>\n<p>' if tex.count('\n', i, j) > 1 else '\n')
+                i = j
+            elif c == '~':
+                out.append('&nbsp;')
+                i += 1
+            elif c in '{}':
+                i += 1
+            else:
+                m = text.match(tex, i)
+                out.append(html.escape(m.group()))
+                i = m.end()
+        return ''.join(out)
+
+    def command(self, tex, i, out):
+        """Convert the command starting at tex[i]. Returns the index
+        after the command and its arguments.
+        """
+        m = re.compile(r'\\([A-Za-z]+\*?|.)').match(tex, i)
+        if m is None:
+            return i + 1
+        name, i = m.group(1).rstrip('*'), m.end()
+
+        if name == '\\' or name in ('newline', 'linebreak', 'par'):
+            _, i = self.optional(tex, i)
+            out.append('<br>')
+        elif name in '_%&#${}':
+            out.append(html.escape(name))
+        elif name in ',; ':
+            out.append(' ')
+        elif name == '[':
+            end = tex.find('\\]', i)
+            end = len(tex) if end < 0 else end
+            out.append(f'<div class="math">{html.escape(tex[i:end])}</div>')
+            i = end + 2
+        elif name == 'begin':
+            env, i = self.argument(tex, i)
+            body, i = self.environmentBody(tex, i, env)
+            out.append(self.environment(env.rstrip('*'), body))
+        elif name in HEADINGS:
+            title, i = self.argument(tex, i)
+            out.append(f'<{HEADINGS[name]}>{self.convert(title)}</{HEADINGS[name]}>\n<p>')
+        elif name in INLINE:
+            content, i = self.argument(tex, i)
+            out.append(f'<{INLINE[name]}>{self.convert(content)}</{INLINE[name]}>')
+        elif name == 'href':
+            url, i = self.argument(tex, i)
+            text, i = self.argument(tex, i)
+            out.append(f'<a href="{html.escape(url)}">{self.convert(text)}</a>')
+        elif name == 'url':
+            url, i = self.argument(tex, i)
+            out.append(f'<a href="{html.escape(url)}">{html.escape(url)}</a>')
+        elif name == 'input':
+            path, i = self.argument(tex, i)
+            out.append(self.inputFile(path))
+        elif name == 'includegraphics':
+            option, i = self.optional(tex, i)
+            path, i = self.argument(tex, i)
+            out.append(self.image(path, option))
+        elif name == 'caption':
+            _, i = self.optional(tex, i)
+            caption, i = self.argument(tex, i)
+            out.append(f'<p class="caption">{self.convert(caption)}</p>')
+        elif name == 'lipsum':
+            _, i = self.optional(tex, i)
+            out.append(f'</p>\n<p>{LIPSUM}</p>\n<p>')
+        elif name == 'frac':
+            num, i = self.argument(tex, i)
+            den, i = self.argument(tex, i)
+            out.append(f'({self.convert(num)})/({self.convert(den)})')
+        elif name in ('label', 'ref', 'cite'):
+            _, i = self.argument(tex, i)
+        elif name in ('setlength', 'resizebox'):
+            _, i = self.argument(tex, i)
+            _, i = self.argument(tex, i)
+        else:
+            # unknown command: drop it, and let its arguments through as text
+            _, i = self.optional(tex, i)
+        return i
+
+    def environmentBody(self, tex, i, env):
+        """Returns the body of the environment (env) starting at tex[i],
+        and the index after its \\end.
+        """
+        begin, end = f'\\begin{{{env}}}', f'\\end{{{env}}}'
+        depth, j = 1, i
+        while depth > 0:
+            nextEnd = tex.find(end, j)
+            if nextEnd < 0:
+                return tex[i:], len(tex)
+            nextBegin = tex.find(begin, j, nextEnd)
+            if nextBegin >= 0:
+                depth += 1
+                j = nextBegin + len(begin)
+            else:
+                depth -= 1
+                j = nextEnd + len(end)
+        return tex[i:j-len(end)], j
+
+    def environment(self, env, body):
+        """Convert the (body) of the environment (env).
+        """
+        if env in TABULARS:
+            _, i = self.optional(body, 0)
+            for _ in range(TABULARS[env]):
+                _, i = self.argument(body, i)
+            return self.tabular(body[i:])
+        if env in ('figure', 'table'):
+            _, i = self.optional(body, 0)
+            return f'<figure>{self.convert(body[i:])}</figure>\n'
+        if env in ('itemize', 'enumerate'):
+            tag = 'ul' if env == 'itemize' else 'ol'
+            items = [self.convert(item) for item in re.split(r'\\item\b', body)[1:]]
+            return f'<{tag}>' + ''.join(f'<li>{item}</li>' for item in items) + f'</{tag}>'
+        if env == 'center':
+            return f'<div class="center">{self.convert(body)}</div>'
+        if env in ('equation', 'align', 'eqnarray', 'displaymath', 'verbatim'):
+            return f'<div class="math">{html.escape(body)}</div>'
+        return self.convert(body)
+
+    def tabular(self, body):
+        """Convert the rows of a tabular environment to an HTML table.
+        The first row is taken as the header.
+        """
+        body = IGNORED_ROWS.sub('', body)
+        rows = [r for r in re.split(r'\\\\(?:\[[^\]]*\])?', body) if r.strip()]
+        out = ['<table>']
+        for n, row in enumerate(rows):
+            tag = 'th' if n == 0 else 'td'
+            cells = re.split(r'(?<!\\)&', ' '.join(row.split()))
+            out.append('<tr>' + ''.join(f'<{tag}>{self.convert(c).strip()}</{tag}>' for c in cells) + '</tr>')
+        out.append('</table>')
+        return '\n'.join(out)
+
+    def inputFile(self, path):
+        """Render an \\input{(path)}. Tables saved in this session come
+        straight from their dataframes, anything else is converted from tex.
+        """
+        name = os.path.basename(path)
+        if not name.endswith('.tex'):
+            name += '.tex'
+
+        table = self.rep.tables.get(name, {})
+        if table.get('data') is not None:
+            return dataframeHTML(table['data'], table.get('caption', ''))
+
+        for fpath in [os.path.join(self.rep.outputPath, path),
+                      os.path.join(self.rep.fpath, 'tables', name),
+                      os.path.join(self.rep.fpath, 'sections', name)]:
+            if not fpath.endswith('.tex'):
+                fpath += '.tex'
+            if os.path.exists(fpath):
+                if os.path.basename(os.path.dirname(fpath)) == 'tables':
+                    return self.cached(fpath, self.readFile) # tables do not input other files
+                return self.readFile(fpath)
+        return f'<p class="missing">Missing input: {html.escape(path)}</p>'
+
+    def image(self, path, option=''):
+        """Embed the image at (path) into the page as a data URI. Figures
+        converted from SVG are shown from the original SVG file while it
+        exists, other PDF files are embedded as they are.
+        """
+        candidates = [os.path.join(self.rep.outputPath, path),
+                      os.path.join(self.rep.fpath, 'figures', os.path.basename(path))]
+        fpath = next((p for p in candidates if os.path.exists(p)), None)
+        ext = os.path.splitext(path)[1].lower()
+        source = self.rep.figures.get(os.path.basename(path), {}).get('fpath', '')
+        if ext == '.pdf' and source.lower().endswith(VECTOR) and os.path.exists(source):
+            fpath, ext = source, os.path.splitext(source)[1].lower()
+        if fpath is None or ext not in MIME:
+            return f'<p class="missing">Image not shown: {html.escape(path)}</p>'
+
+        style = ''
+        width = re.search(r'width=([\d.]+)\\(textwidth|linewidth)', option)
+        scale = re.search(r'scale=([\d.]+)', option)
+        if width:
+            style = f' style="width:{float(width.group(1))*100:.0f}%"'
+        elif scale:
+            style = f' style="max-width:{float(scale.group(1))*100:.0f}%"'
+        else:
+            style = ' style="max-width:80%"'
+
+        data = self.cached(fpath, encodeFile)
+        if ext == '.pdf':
+            return f'<embed type="{MIME[ext]}" src="data:{MIME[ext]};base64,{data}"{style}>'
+        return f'<img src="data:{MIME[ext]};base64,{data}"{style}>'
+
+def encodeFile(fpath):
+    with open(fpath, 'rb') as f:
+        return base64.b64encode(f.read()).decode('ascii')
+
+def dataframeHTML(data, caption=''):
+    """Render a dataframe (or series) as an HTML table, with the same
+    number format as the tex tables.
+    """
+    table = data.to_frame() if hasattr(data, 'to_frame') else data
+    out = table.to_html(float_format=lambda x: '%0.2f' % x, border=0)
+    if caption != '':
+        out += f'\n<p class="caption">{html.escape(caption)}</p>'
+    return out
+
+def makeHTML(rep, sectionOnly=False, cache=None):
+    """Render the report (rep) to a self-contained HTML page with the same
+    content as Report.makeReport: the sections, then the figures and tables
+    folders (unless (sectionOnly)), and the mapping tables as an appendix.
+    Pass the same (cache) dict to later calls to only convert what changed.
+
+    Returns:
+        str -- The HTML page.
+    """
+    conv = TexToHTML(rep, cache)
+    body = []
+
+    for sect in rep.sections:
+        body.append(conv.inputFile(os.path.join('../sections', sect)))
+
+    if not sectionOnly:
+        body.append('<h2>Figures</h2>')
+        for fig in rep.listArtifacts('figures', FIGURES):
+            config = rep.figures.get(os.path.basename(fig), {})
+            body.append('<figure>' + conv.image(fig, config.get('option', '')))
+            if config.get('caption', '') != '':
+                body.append(f'<figcaption>{conv.convert(config["caption"])}</figcaption>')
+            body.append('</figure>')
+
+        body.append('<h2>Tables</h2>')
+        for tbl in rep.listArtifacts('tables', '.tex'):
+            body.append(conv.inputFile(tbl))
+
+    apdxs = glob.glob(os.path.join(rep.fpath, 'mappingTables', '*.csv'))
+    if apdxs != []:
+        body.append('<h2>Appendix - Mapping Tables</h2>')
+        for apdx in apdxs:
+            body.append(f'<h3>{html.escape(os.path.basename(apdx).replace("_", " "))}</h3>')
+            body.append(conv.cached(apdx, lambda p: rep.readMappingTable(p)[0].to_html(index=False, border=0)))
+
+    return f'''<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8" />
+<title>{html.escape(rep.title)}</title>
+<style type="text/css">{STYLE}</style>
+</head>
+<body>
+<header>
+<h1>{html.escape(rep.title)}</h1>
+<p>{html.escape(rep.author)}<br>{html.escape(rep.date)}</p>
+</header>
+<p>
+{''.join(body)}
+</p>
+</body>
+</html>
+'''
@@ -0,0 +1,130 @@
+import os, re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+from lib.LaTeXreport.renderCache import makeKey
+
+class LazyItem():
+    """A table or figure whose data is only fetched when a report includes it.
+
+    The data comes either from a database query run through pgIO, or from
+    a python callable. Nothing is run when the item is added to the report.
+    Report.makeReport evaluates the items it includes, fetching the data of
+    independent items concurrently, and then saves them like any other
+    table or figure.
+    """
+    def __init__(self, name, kind, query=None, values=None, dbName=None, columns=None,
+                 func=None, args=(), kwargs={}, plotFunc=None, params={},
+                 caption='', option='', cache=None, maxAge=None):
+        """Arguments:
+            name {str} -- Name of the table or figure.
+            kind {str} -- Either 'table' or 'figure'.
+
+        Keyword Arguments:
+            query {str} -- Query to run with pgIO.getAllData. (default: {None})
+            values {tuple} -- Values passed along with the (query). (default: {None})
+            dbName {str} -- Database to run the (query) on. (default: {None}, the default database)
+            columns {list} -- Column names for the rows returned by the (query). (default: {None})
+            func {callable} -- Called as func(*args, **kwargs) to get the data, if there is no (query). (default: {None})
+            plotFunc {callable} -- For figures, called as plotFunc(data, **params). (default: {None})
+            caption {str} -- Caption of the table or figure. (default: {''})
+            option {str} -- Tex options of a figure. (default: {''})
+            cache {bool} -- Keep the fetched data in the report's render cache for later builds. Cached
+            data is only keyed by the query or the func and its arguments, so changes to the database,
+            or to what the func reads, are not seen until the entry is older than (maxAge).
+            (default: {None}, cache func items, and query items only when a (maxAge) is given)
+            maxAge {float} -- Refetch cached data older than this many seconds. (default: {None}, never)
+        """
+        if (query is None) == (func is None):
+            raise ValueError(f'{name}: give either a query or a func.')
+        if kind == 'figure' and plotFunc is None:
+            raise ValueError(f'{name}: a figure needs a plotFunc.')
+
+        self.name = name
+        self.kind = kind
+        self.query = query
+        self.values = values
+        self.dbName = dbName
+        self.columns = columns
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.plotFunc = plotFunc
+        self.params = params
+        self.caption = caption
+        self.option = option
+        self.cache = (query is None or maxAge is not None) if cache is None else cache
+        self.maxAge = maxAge
+        return
+
+    def key(self):
+        """Cache key of the data of this item.
+        """
+        if self.query is not None:
+            return makeKey('lazy-query', self.query, self.values, self.dbName, self.columns)
+        return makeKey('lazy-func', self.func, self.args, self.kwargs)
+
+    def load(self):
+        """Fetch the data of this item. This runs in a worker thread.
+        """
+        import pandas as pd
+        if self.query is not None:
+            from lib.databaseIO import pgIO
+            rows = pgIO.getAllData(self.query, self.values, dbName=self.dbName)
+            if rows is None:
+                raise RuntimeError(f'the query for {self.name} failed. Check the logs.')
+            return pd.DataFrame(rows, columns=self.columns)
+        return self.func(*self.args, **self.kwargs)
+
+    def render(self, rep, data):
+        """Save the table or figure into the report (rep).
+        """
+        if self.kind == 'table':
+            rep.saveTable(self.name, data, caption=self.caption, override=True)
+        else:
+            rep.plotFigure(self.name, self.plotFunc, data, self.params,
+                           caption=self.caption, option=self.option, override=True)
+        return
+
+    def referencedIn(self, tex):
+        """Whether the tex string (tex) includes this item.
+        """
+        folder = 'tables' if self.kind == 'table' else 'figures'
+        return re.search(rf'{folder}/{re.escape(self.name)}(\.tex|\.png)?\b', tex) is not None
+
+def evaluate(rep, items, workers=4):
+    """Fetch the data of (items) and save them into the report (rep).
+    Data found in the report's render cache is reused. The rest is fetched
+    concurrently on (workers) threads. Tables and figures are then saved in
+    order on the calling thread, since matplotlib is not thread safe.
+
+    Returns:
+        int -- The number of items that were saved.
+    """
+    data, todo = {}, []
+    for item in items:
+        if rep.renderCache is not None and item.cache:
+            hit, obj = rep.renderCache.getObject(item.key(), item.maxAge)
+            if hit:
+                data[item.name] = obj
+                continue
+        todo.append(item)
+
+    if todo != []:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(item.load): item for item in todo}
+            for fut in as_completed(futures):
+                item = futures[fut]
+                try:
+                    data[item.name] = fut.result()
+                except Exception as e:
+                    print(f'Error: unable to get the data for {item.name}: {e}')
+                    continue
+                if rep.renderCache is not None and item.cache:
+                    rep.renderCache.putObject(item.key(), data[item.name])
+
+    for item in items:
+        if item.name in data:
+            item.render(rep, data[item.name])
+    print(f'Evaluated {len(data)} of {len(items)} lazy items ({len(todo)} fetched).')
+    return len(data)
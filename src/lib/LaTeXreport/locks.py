@@ -0,0 +1,39 @@
+import os
+import functools
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # not available on Windows
+    fcntl = None
+
+@contextmanager
+def fileLock(path, shared=False):
+    """Hold an advisory lock on the lock file (path) for the duration of a
+    `with` block. The lock is exclusive, or shared between readers with
+    (shared). Other processes, and other threads opening the same lock file,
+    wait until it is released. Without fcntl, nothing is locked.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return
+
+def locked(name):
+    """Decorate a Report method so that it holds the report lock (name) while it runs.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.lock(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
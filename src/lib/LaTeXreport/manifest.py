@@ -0,0 +1,174 @@
+import os, json, time
+import sqlite3
+import hashlib
+from contextlib import contextmanager, closing
+
+SCHEMA = '''
+create table if not exists artifacts (
+    kind     text not null,
+    name     text not null,
+    path     text not null,
+    hash     text,
+    mtime    integer,
+    size     integer,
+    meta     text not null default '{}',
+    position integer not null,
+    primary key (kind, name)
+);
+create table if not exists builds (
+    name   text primary key,
+    key    text not null,
+    source text not null default '',
+    built  real not null
+);
+'''
+
+class Manifest():
+    """On-disk index of the sections, tables and figures of a report.
+
+    Every artifact is recorded with its file, the sha256 hash, modification
+    time and size of that file when it was written, and its metadata (the
+    caption and options of figures, the level of sections, ...). A report
+    opened in a new process restores its state from the manifest, and
+    builds list the artifacts from it instead of reconstructing them.
+    Artifacts are kept in the order they were first recorded.
+
+    The manifest is a SQLite database in the report folder. A connection
+    is opened for every call, so it can be used from any thread or process.
+    """
+    def __init__(self, dbPath):
+        """Arguments:
+            dbPath {str} -- Location of the SQLite database, usually <report>/manifest.sqlite.
+        """
+        self.dbPath = dbPath
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+        return
+
+    @contextmanager
+    def connect(self):
+        """Open a connection for a `with` block. The transaction is committed,
+        or rolled back on an error, and the connection is closed at the end.
+        """
+        with closing(sqlite3.connect(self.dbPath, timeout=30)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+        return
+
+    def hashFile(self, fpath, chunkSize=1<<20):
+        """Returns the sha256 hex digest of the file at (fpath).
+        """
+        h = hashlib.sha256()
+        with open(fpath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunkSize), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def stamp(self, fpath):
+        """Returns the hash, modification time (ns) and size of the file at
+        (fpath), or Nones if it does not exist.
+        """
+        if not os.path.exists(fpath):
+            return None, None, None
+        st = os.stat(fpath)
+        return self.hashFile(fpath), st.st_mtime_ns, st.st_size
+
+    def record(self, kind, name, path, meta={}):
+        """Record the artifact (name) of (kind) ('section', 'table' or 'figure')
+        written to (path), with its (meta)data. An artifact recorded before
+        keeps its position.
+        """
+        digest, mtime, size = self.stamp(path)
+        with self.connect() as conn:
+            conn.execute('''
+                insert into artifacts (kind, name, path, hash, mtime, size, meta, position)
+                values (?, ?, ?, ?, ?, ?, ?, (select coalesce(max(position), 0) + 1 from artifacts))
+                on conflict (kind, name) do update set
+                    path=excluded.path, hash=excluded.hash, mtime=excluded.mtime,
+                    size=excluded.size, meta=excluded.meta
+                ''', (kind, name, path, digest, mtime, size, json.dumps(meta)))
+        return
+
+    def remove(self, kind, name):
+        with self.connect() as conn:
+            conn.execute('delete from artifacts where kind=? and name=?', (kind, name))
+        return
+
+    def toDict(self, row):
+        item = dict(row)
+        item['meta'] = json.loads(item['meta'])
+        return item
+
+    def get(self, kind, name):
+        """Returns the record of an artifact as a dict, or None.
+        """
+        with self.connect() as conn:
+            row = conn.execute('select * from artifacts where kind=? and name=?', (kind, name)).fetchone()
+        return None if row is None else self.toDict(row)
+
+    def items(self, kind):
+        """Returns the records of all artifacts of (kind), in the order they were first recorded.
+        """
+        with self.connect() as conn:
+            rows = conn.execute('select * from artifacts where kind=? order by position', (kind,)).fetchall()
+        return [self.toDict(row) for row in rows]
+
+    def stale(self, kind=None):
+        """Returns the artifacts whose file is missing, or differs from the
+        file that was recorded. Files are only hashed when their modification
+        time or size changed; when the content turns out to be the same, the
+        new time is recorded so that the file is not hashed again.
+        """
+        query, args = 'select * from artifacts', ()
+        if kind is not None:
+            query, args = query + ' where kind=?', (kind,)
+        with self.connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+
+        stale = []
+        for row in rows:
+            if not os.path.exists(row['path']):
+                stale.append(self.toDict(row))
+                continue
+            st = os.stat(row['path'])
+            if (st.st_mtime_ns, st.st_size) == (row['mtime'], row['size']):
+                continue
+            if self.hashFile(row['path']) != row['hash']:
+                stale.append(self.toDict(row))
+            else:
+                with self.connect() as conn:
+                    conn.execute('update artifacts set mtime=? where kind=? and name=?',
+                                 (st.st_mtime_ns, row['kind'], row['name']))
+        return stale
+
+    def track(self, kind, folder, ext):
+        """Record the files with extension (ext) in (folder) that are not in
+        the manifest yet, e.g. figures copied into the folder by hand, with
+        empty metadata.
+
+        Returns:
+            list -- The records of all artifacts of (kind).
+        """
+        known = {item['path'] for item in self.items(kind)}
+        for fname in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+            fpath = os.path.join(folder, fname)
+            if fname.endswith(ext) and fpath not in known:
+                self.record(kind, fname, fpath)
+        return self.items(kind)
+
+    def recordBuild(self, name, key, source=''):
+        """Record that the artifact graph node (name) was built from the inputs
+        hashed to (key). The (source) describes where its data comes from.
+        """
+        with self.connect() as conn:
+            conn.execute('insert or replace into builds (name, key, source, built) values (?, ?, ?, ?)',
+                         (name, key, source, time.time()))
+        return
+
+    def builds(self):
+        """Returns the last build of every artifact graph node, as {name: {key, source, built}}.
+        """
+        with self.connect() as conn:
+            rows = conn.execute('select * from builds').fetchall()
+        return {row['name']: dict(row) for row in rows}
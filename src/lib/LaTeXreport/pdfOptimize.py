@@ -0,0 +1,151 @@
+import os, io, time
+import shutil
+import hashlib
+import subprocess
+
+DEFAULTS = {
+    'dedupe'       : True,  # keep a single copy of images embedded several times
+    'imageQuality' : None,  # re-encode large opaque images as JPEG at this quality (lossy)
+    'objectStreams': True,  # pack small objects into compressed object streams
+    'linearize'    : True,  # fast first page display when opened over a network
+}
+
+def optimize(fpath, **options):
+    """Shrink the PDF at (fpath) in place. pikepdf is used if it is installed,
+    and the qpdf command line tool otherwise (which does not remove duplicate
+    images or re-encode them). The optimized file replaces the original only
+    if it is smaller.
+
+    Arguments:
+        fpath {str} -- Path of the PDF.
+
+    Keyword Arguments:
+        **options -- Any of dedupe, imageQuality, objectStreams and linearize. See DEFAULTS.
+
+    Returns:
+        dict or None -- The size before and after, the time taken and the tool used,
+        or None if neither pikepdf nor qpdf is available.
+    """
+    opts = dict(DEFAULTS, **options)
+    tmpPath = f'{fpath}.{os.getpid()}.tmp'
+    before = os.path.getsize(fpath)
+    t0 = time.perf_counter()
+
+    try:
+        import pikepdf
+        tool = 'pikepdf'
+    except ImportError:
+        tool = 'qpdf' if shutil.which('qpdf') else None
+    if tool is None:
+        print('Neither pikepdf nor qpdf is installed. The PDF was not optimized.')
+        return None
+
+    try:
+        if tool == 'pikepdf':
+            with pikepdf.open(fpath) as pdf:
+                if opts['dedupe']:
+                    dedupeImages(pdf)
+                if opts['imageQuality'] is not None:
+                    recompressImages(pdf, opts['imageQuality'])
+                mode = pikepdf.ObjectStreamMode.generate if opts['objectStreams'] else pikepdf.ObjectStreamMode.preserve
+                pdf.save(tmpPath, compress_streams=True, recompress_flate=True,
+                         object_stream_mode=mode, linearize=opts['linearize'])
+        else:
+            cmd = ['qpdf', '--recompress-flate', '--compression-level=9']
+            if opts['objectStreams']:
+                cmd.append('--object-streams=generate')
+            if opts['linearize']:
+                cmd.append('--linearize')
+            subprocess.run(cmd + [fpath, tmpPath], check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+        after = os.path.getsize(tmpPath)
+        if after < before:
+            os.replace(tmpPath, fpath)
+        else:
+            after = before
+            os.remove(tmpPath)
+    finally:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+    stats = {'before': before, 'after': after, 'seconds': time.perf_counter() - t0, 'tool': tool}
+    print(f'Optimized {os.path.basename(fpath)} with {tool}: {before/2**20:.2f} MB -> '
+          f'{after/2**20:.2f} MB ({(after - before) / before * 100:+.0f}%) in {stats["seconds"]:.2f}s')
+    return stats
+
+def imageXObjects(resources, seen=None):
+    """Yield (xobjects dict, name, image) for every image in (resources),
+    also inside form XObjects, such as included PDF figures.
+    """
+    seen = set() if seen is None else seen
+    xobjs = resources.get('/XObject') if resources is not None else None
+    if xobjs is None:
+        return
+    for name in list(xobjs.keys()):
+        obj = xobjs[name]
+        if obj.get('/Subtype') == '/Image':
+            yield xobjs, name, obj
+        elif obj.get('/Subtype') == '/Form' and obj.objgen not in seen:
+            seen.add(obj.objgen)
+            yield from imageXObjects(obj.get('/Resources'), seen)
+    return
+
+def imageKey(image):
+    """Hash of the encoded data, the dictionary and the soft mask of an image.
+    """
+    h = hashlib.sha256(image.read_raw_bytes())
+    for key in ['/Width', '/Height', '/BitsPerComponent', '/ColorSpace', '/Filter', '/DecodeParms', '/Decode']:
+        h.update(f'{key}={image.get(key)!r};'.encode())
+    if '/SMask' in image:
+        h.update(imageKey(image.SMask).encode())
+    return h.hexdigest()
+
+def dedupeImages(pdf):
+    """Point every reference to an image at the first identical image.
+    The duplicates are not written when the PDF is saved.
+
+    Returns:
+        int -- The number of references that were redirected.
+    """
+    first, replaced = {}, 0
+    seen = set()
+    for page in pdf.pages:
+        for xobjs, name, image in imageXObjects(page.obj.get('/Resources'), seen):
+            key = imageKey(image)
+            if key not in first:
+                first[key] = image
+            elif first[key].objgen != image.objgen:
+                xobjs[name] = first[key]
+                replaced += 1
+    return replaced
+
+def recompressImages(pdf, quality=85, minPixels=250000):
+    """Re-encode large 8-bit RGB or grayscale images without transparency
+    as JPEG at (quality), where that makes them smaller. Requires Pillow.
+
+    Returns:
+        int -- The number of images that were re-encoded.
+    """
+    import pikepdf
+    done, count = set(), 0
+    for page in pdf.pages:
+        for _, _, image in imageXObjects(page.obj.get('/Resources')):
+            if image.objgen in done or '/SMask' in image or image.get('/Filter') == '/DCTDecode':
+                continue
+            done.add(image.objgen)
+            if image.get('/BitsPerComponent') != 8 or int(image.Width) * int(image.Height) < minPixels:
+                continue
+            try:
+                pil = pikepdf.PdfImage(image).as_pil_image()
+            except Exception: # unsupported colour spaces and filters are left alone
+                continue
+            if pil.mode not in ('RGB', 'L'):
+                continue
+            buf = io.BytesIO()
+            pil.save(buf, format='JPEG', quality=quality, optimize=True)
+            if buf.tell() < len(image.read_raw_bytes()):
+                image.write(buf.getvalue(), filter=pikepdf.Name.DCTDecode)
+                if '/DecodeParms' in image:
+                    del image['/DecodeParms']
+                count += 1
+    return count
@@ -0,0 +1,167 @@
+import os, time
+import json
+import pickle
+import shutil
+import hashlib
+import inspect
+
+
+from lib.LaTeXreport.assetStore import tmpName
+
+class RenderCache():
+    """Size-bounded cache of rendered report artifacts.
+
+    Rendered .tex tables and .png figures are kept under a key built
+    from the data and parameters that produced them. When a Report is
+    asked to render the same data again, the cached artifact is reused
+    instead. The least recently used entries are evicted once the cache
+    grows beyond (maxBytes).
+    """
+    def __init__(self, root='../report/.renderCache', maxBytes=500*2**20):
+        """Keyword Arguments:
+            root {str} -- Folder where the rendered artifacts are kept. (default: {'../report/.renderCache'})
+            maxBytes {int} -- Size limit of the cache in bytes. (default: {500MB})
+        """
+        self.root = root
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+        return
+
+    def entryPath(self, key, ext):
+        return os.path.join(self.root, key + ext)
+
+    def get(self, key, ext):
+        """Look up a rendered artifact.
+
+        Returns:
+            str or None -- Path of the cached artifact, or None on a miss.
+        """
+        path = self.entryPath(key, ext)
+        if os.path.exists(path):
+            os.utime(path) # mark as recently used
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def put(self, key, ext, fpath):
+        """Copy the freshly rendered artifact at (fpath) into the cache.
+        """
+        path = self.entryPath(key, ext)
+        tmpPath = tmpName(path)
+        shutil.copyfile(fpath, tmpPath)
+        os.replace(tmpPath, path)
+        self.evict()
+        return path
+
+    def getObject(self, key, maxAge=None):
+        """Look up a cached python object, such as the result of a query.
+
+        Keyword Arguments:
+            maxAge {float} -- Treat entries older than this many seconds as a miss. (default: {None})
+
+        Returns:
+            tuple -- (True, object) on a hit, (False, None) on a miss.
+        """
+        path = self.get(key, '.pkl')
+        if path is None:
+            return False, None
+        with open(path, 'rb') as f:
+            created, obj = pickle.load(f)
+        if maxAge is not None and time.time() - created > maxAge:
+            self.hits -= 1
+            self.misses += 1
+            return False, None
+        return True, obj
+
+    def putObject(self, key, obj):
+        """Pickle (obj) into the cache under (key).
+        """
+        path = self.entryPath(key, '.pkl')
+        tmpPath = tmpName(path)
+        with open(tmpPath, 'wb') as f:
+            pickle.dump((time.time(), obj), f)
+        os.replace(tmpPath, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits
+        within (maxBytes).
+        """
+        entries = []
+        for f in os.listdir(self.root):
+            if f.endswith('.tmp'):
+                continue
+            st = os.stat(os.path.join(self.root, f))
+            entries.append((st.st_mtime, st.st_size, f))
+
+        total = sum(e[1] for e in entries)
+        for _, size, f in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            os.remove(os.path.join(self.root, f))
+            total -= size
+        return
+
+    def stats(self):
+        """Returns a dictionary with the hits, misses and size of the cache.
+        """
+        files = [os.path.join(self.root, f) for f in os.listdir(self.root)]
+        return {
+            'hits'    : self.hits,
+            'misses'  : self.misses,
+            'entries' : len(files),
+            'bytes'   : sum(os.path.getsize(f) for f in files)
+        }
+
+    def report(self):
+        """Print the hit/miss statistics of the cache.
+        """
+        s = self.stats()
+        print(f'Render cache: {s["hits"]} hits, {s["misses"]} misses, '
+              f'{s["entries"]} entries ({s["bytes"]/2**20:.1f} MB) in {self.root}.')
+        return s
+
+def hashPart(h, part):
+    """Feed a single (part) of the key into the hash object (h).
+    DataFrames and Series are hashed by value, callables by their
+    source code, and everything else by its JSON or repr form.
+    """
+    import pandas as pd
+    if isinstance(part, (pd.DataFrame, pd.Series)):
+        if isinstance(part, pd.DataFrame):
+            h.update(repr((list(part.columns), list(part.dtypes), part.shape)).encode())
+        else:
+            h.update(repr((part.name, part.dtype, part.shape)).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+        except TypeError: # unhashable cells, such as arrays
+            h.update(pickle.dumps(part))
+    elif isinstance(part, (list, tuple)):
+        h.update(f'{type(part).__name__}:{len(part)}'.encode())
+        for p in part:
+            hashPart(h, p)
+    elif callable(part):
+        func = inspect.unwrap(part)
+        try:
+            src = inspect.getsource(func)
+        except (OSError, TypeError):
+            src = repr(getattr(func, '__code__', func))
+        h.update(f'{getattr(func, "__qualname__", "")}:{src}'.encode())
+    else:
+        try:
+            h.update(json.dumps(part, sort_keys=True, default=repr).encode())
+        except TypeError:
+            h.update(repr(part).encode())
+    return
+
+def makeKey(*parts):
+    """Returns a hex key for the combination of (parts).
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        hashPart(h, part)
+    return h.hexdigest()
@@ -1,16 +1,27 @@
-import pickle
-import pandas as pd
-import matplotlib.pyplot as plt
+import pickle, subprocess
 import os, glob
-import shutil
-import jsonref
+import shutil, filecmp
+import hashlib, tempfile, threading
+
+# pandas, matplotlib and pylatex are imported in the methods that use
+# them, so that importing this module stays quick
+
+from lib.LaTeXreport.assetStore import AssetStore, storedExt, VECTOR, CONVERTED, FIGURES
+from lib.LaTeXreport.renderCache import RenderCache, makeKey
+from lib.LaTeXreport import htmlPreview
+from lib.LaTeXreport.buildProfile import BuildProfile
+from lib.LaTeXreport import lazyItems
+from lib.LaTeXreport import pdfOptimize
+from lib.LaTeXreport.sectionBuild import SectionBuilder
+from lib.LaTeXreport.snippetPreview import SnippetPreview
+from lib.LaTeXreport.manifest import Manifest
+from lib.LaTeXreport.artifactGraph import ArtifactGraph
+from lib.LaTeXreport.locks import fileLock, locked
 
-import pylatex
-from pylatex import Document, Section, Subsection, Tabular,  Tabularx, LongTabularx, MultiColumn, NoEscape, Figure, Package, Command, LineBreak, NewLine
-from pylatex.utils import bold
 
 class Report():
     def __init__(self, name):
+        from pylatex import Document
         self.name = name
         self.title = 'Insert Report Title Here'
         self.author = 'Insert Author Name'
@@ -22,6 +33,15 @@ class Report():
         self.figures = {}
         self.tables = {}
         self.sections = {}
+        self.assetStore = None # set to an AssetStore to share figures between reports
+        self.figureDpi = None # set to a print resolution, e.g. 300, to downscale raster figures to
+        self.pdfOptimize = None # set to a dict of pdfOptimize options, e.g. {}, to shrink the PDF
+        self.buildDir = None # 'tmpfs' or a fast local folder to compile in, see makeReport
+        self.renderCache = None # set to a RenderCache to skip re-rendering unchanged data
+        self.lazyItems = {} # tables and figures evaluated only when included
+        self.lazyWorkers = 4
+        self.manifest = None # opened by initialize()
+        self.artifacts = ArtifactGraph(self) # declared dependencies of tables and figures
         return 
     
     def makeDirs(self, dirPath):
@@ -29,11 +49,44 @@ class Report():
         If the sub-directories do not exist, they will be created as well. 
         """
         if not os.path.exists(dirPath):
-            os.makedirs(dirPath)
+            os.makedirs(dirPath, exist_ok=True) # another builder may be creating it too
             print('Created', dirPath)
         else: 
             print(dirPath, 'already exists.')
         return
+
+    def lock(self, name):
+        """Lock (name) of this report, for use in a `with` block. Builders in other
+            processes or threads that take the same lock wait until it is released.
+            makeReport holds the 'report' lock, and every table, figure and section
+            is written under a lock of its own, so different artifacts are written
+            in parallel, but never the same one twice at the same time.
+        """
+        return fileLock(os.path.join(self.fpath, '.locks', name.replace(os.sep, '_') + '.lock'))
+
+    def upToDate(self, kind, name, path, key):
+        """Whether the manifest records the artifact (name) at (path) as built
+            from the inputs hashed to (key), and the file is unchanged since.
+            Checked after taking the lock of the artifact, so that a builder that
+            waited for another one to write the same artifact reuses it, even with
+            override. With a render cache, the cache is used for this instead.
+        """
+        if self.manifest is None or not os.path.exists(path):
+            return False
+        record = self.manifest.get(kind, name)
+        if record is None or record['meta'].get('key') != key:
+            return False
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size) == (record['mtime'], record['size'])
+
+    def writeText(self, fpath, text):
+        """Write (text) to (fpath) through a temporary file and a rename.
+        """
+        tmpPath = f'{fpath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmpPath, 'w') as tf:
+            tf.write(text)
+        os.replace(tmpPath, fpath)
+        return
         
     def initialize(self, fpath=None):
         """Initialize a report project. 
@@ -45,34 +98,103 @@ class Report():
             fpath = self.fpath
         else:
             self.fpath = fpath
+            self.outputPath = os.path.join(fpath, 'output')
 
         self.makeDirs(fpath)
         subs = list(self.objects) + ['output'] 
         for sub in subs:
             self.makeDirs(os.path.join(fpath,sub))
+        self.manifest = Manifest(os.path.join(fpath, 'manifest.sqlite'))
+        self.loadManifest()
         self.resetDoc()
 
         print(f'>> {self.name} report structure has been initialized.')
         return 
 
+    def loadManifest(self):
+        """Restore the sections, tables and figures recorded in the manifest
+        by earlier runs, with their captions and options. Those added in this
+        session are kept as they are.
+        """
+        for item in self.manifest.items('section'):
+            self.sections.setdefault(item['name'], {'fpath': item['path'], 'level': item['meta'].get('level', 1)})
+        for item in self.manifest.items('table'):
+            self.tables.setdefault(item['name'], dict(item['meta'], data=None))
+        for item in self.manifest.items('figure'):
+            self.figures.setdefault(item['name'], item['meta'])
+        return
+
+    def recordArtifact(self, kind, name, path, meta={}):
+        """Record an artifact in the manifest, if the report has one.
+        """
+        if self.manifest is not None and os.path.exists(path):
+            self.manifest.record(kind, name, path, meta)
+        return
+
+    def recorded(self, kind, name):
+        """The manifest record of the artifact (name), or None.
+        """
+        return None if self.manifest is None else self.manifest.get(kind, name)
+
+    def recordedKey(self, kind, name):
+        """The key of the inputs the manifest records the artifact (name) as
+        built from, or None.
+        """
+        record = self.recorded(kind, name)
+        return None if record is None else record['meta'].get('key')
+
+    def listArtifacts(self, kind, ext):
+        """Returns the paths of the (kind) files ('tables' or 'figures') of the
+        report with the extension(s) (ext), in the order they were added. Files 
+        put into the folder by hand are added to the manifest as well.
+        """
+        folder = os.path.join(self.fpath, kind)
+        if self.manifest is None:
+            return sorted(f for f in glob.glob(os.path.join(folder, '*')) if f.endswith(ext))
+        items = self.manifest.track(kind[:-1], folder, ext)
+        return [item['path'] for item in items if os.path.exists(item['path'])]
+
     def resetDoc(self):
         """Adds packages and preamble to the document
         when it is to be regenerated. Clears previous entries.
         """
+        from pylatex import Document
         self.doc=Document()
+        self.addPreamble()
+        return
+
+    def addPreamble(self, doc=None):
+        """Adds the packages, preamble and title to a fresh document.
+
+        Keyword Arguments:
+            doc {pylatex Document} -- Document to add them to. (default: {None}, self.doc)
+        """
+        from pylatex import Package, Command, NoEscape
+        if doc is None:
+            doc = self.doc
+        # No svg package: SVG figures are converted to PDF when they are saved
         pkgs_to_add = [ 'booktabs','hyperref','lipsum','microtype', 'graphicx',\
-                        'nicefrac','url','bookmark','tabularx', 'svg']
+                        'nicefrac','url','bookmark','tabularx']
         pream_to_add = {
                         'title'  : f'{self.title}',
                         'author' : f'{self.author}',
                         'date'   : f'{self.date}'
         }
         for pkg in pkgs_to_add:
-            self.doc.packages.append(Package(pkg))
+            doc.packages.append(Package(pkg))
         for pa in pream_to_add:
-            self.doc.preamble.append(Command(pa, pream_to_add[pa]))
-        self.doc.append(NoEscape(r'\maketitle'))
+            doc.preamble.append(Command(pa, pream_to_add[pa]))
+        doc.append(NoEscape(r'\maketitle'))
         return
+
+    def preambleTex(self):
+        """Returns the tex of the document up to (not including) \\begin{document}.
+        """
+        from pylatex import Document
+        doc = Document()
+        self.addPreamble(doc)
+        tex = doc.dumps()
+        return tex[:tex.find('\\begin{document}')]
    
     ########################### ADDING TABLES ########################
     
@@ -90,33 +212,70 @@ class Report():
             caption {str} -- Optional caption that will be appended to the next line after the table. (default: {''})
             override {bool} -- Specify whether to override an existing tex file. (default: {False})
         """
+        import pandas as pd
         inPath = os.path.join(self.fpath, 'tables', name+'.tex') # to write the tex file in
         outPath = os.path.join(path, name+'.tex') # to point to the tex file? ## Why do i need this
 
-        if not os.path.exists(inPath) or override==True:
-            if isinstance(data, list): # concat multiple dataframes 
-                dataOut = pd.concat(data, axis=1, sort=False)
-                dataOut.fillna(0, inplace=True)
-            else: 
-                dataOut = data.copy()
-
-            tbl_width = len(dataOut) # handle wide tables 
-            with open(inPath,'w') as tf:
-                if tbl_width >= 10:
-                    tf.write(r'\setlength{\tabcolsep}{2pt}')
-                    tf.write(r'\resizebox{0.95\textwidth}{!}{')
-
-                tf.write(r'\begin{center}')
-                tf.write(dataOut.to_latex(multirow=True, float_format=lambda x: '%0.2f' % x)) 
-                tf.write(r'\end{center}')
-                if caption != '': tf.write(r'\\\centerline{\caption{' + caption + r'}}')
-                
-                if tbl_width >= 10:
-                    tf.write(r'}')
-            print(f'Written {name}.tex to {inPath}')
+        # Keep the data for previews that render tables without LaTeX
+        self.tables[name+'.tex'] = {
+            'name': name,
+            'caption': caption,
+            'data': pd.concat(data, axis=1, sort=False).fillna(0) if isinstance(data, list) else data
+        }
+
+        key = makeKey('table', data, caption)
+        seen = self.recorded('table', name+'.tex')
+        with self.lock('table-' + name):
+            # with (override), only a table written by another builder while this one waited is reused
+            if (self.renderCache is None and self.upToDate('table', name+'.tex', inPath, key)
+                    and (not override or self.recorded('table', name+'.tex') != seen)):
+                print(f'{name} is unchanged. Reused {name}.tex.')
+                return
+
+            written = False
+            if not os.path.exists(inPath) or override==True:
+                written = True
+                cached = None
+                if self.renderCache is not None:
+                    cached = self.renderCache.get(key, '.tex')
+
+                if cached is not None:
+                    if not (os.path.exists(inPath) and filecmp.cmp(cached, inPath, shallow=False)):
+                        self.publish(cached, inPath)
+                    print(f'{name} is unchanged. Reused the cached {name}.tex.')
+                else:
+                    self.renderTable(self.tables[name+'.tex']['data'], inPath, caption)
+                    if self.renderCache is not None:
+                        self.renderCache.put(key, '.tex', inPath)
+                    print(f'Written {name}.tex to {inPath}')
+
+            elif os.path.exists(inPath) and data.empty:
+                print(f'{name} already exists in {inPath}. No override instruction was given.')
 
-        elif os.path.exists(inPath) and data.empty:
-            print(f'{name} already exists in {inPath}. No override instruction was given.')
+            # a file that was not written keeps the key of the data it was written from
+            self.recordArtifact('table', name+'.tex', inPath, {'name': name, 'caption': caption,
+                                'key': key if written else self.recordedKey('table', name+'.tex')})
+        return
+
+    def renderTable(self, dataOut, inPath, caption=''):
+        """Write the dataframe (dataOut) as a tex table to (inPath).
+        Wide tables are shrunk to fit the page.
+        """
+        tbl_width = len(dataOut) # handle wide tables 
+        tmpPath = f'{inPath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmpPath,'w') as tf:
+            if tbl_width >= 10:
+                tf.write(r'\setlength{\tabcolsep}{2pt}')
+                tf.write(r'\resizebox{0.95\textwidth}{!}{')
+
+            tf.write(r'\begin{center}')
+            tf.write(dataOut.to_latex(multirow=True, float_format=lambda x: '%0.2f' % x)) 
+            tf.write(r'\end{center}')
+            if caption != '': tf.write(r'\\\centerline{\caption{' + caption + r'}}')
+            
+            if tbl_width >= 10:
+                tf.write(r'}')
+        os.replace(tmpPath, inPath) # readers never see a partial table
         return
 
     def addTbl2Doc(self, tbl):
@@ -125,25 +284,52 @@ class Report():
         Arguments:
             tblpath {str} -- file path where the tex file will be retrieved from
         """
+        from pylatex import NoEscape
+        tbl = os.path.basename(tbl)
         inPath = os.path.join(self.fpath, 'tables', tbl)
         outPath = os.path.join('../tables', tbl)
 
-        if not os.path.exists(tblpath):
-            print(f'Error: {tblpath} does not exist. Please save first and try again.')
+        if not os.path.exists(inPath):
+            print(f'Error: {inPath} does not exist. Please save first and try again.')
         else:
             self.doc.append(NoEscape(r'\input{' + outPath + r'}')) 
-            print(f'Added {tblpath} to the tex doc obj.')
+            print(f'Added {inPath} to the tex doc obj.')
         return
     
     
+    def addLazyTable(self, name, query=None, func=None, caption='', **kwargs):
+        """Add a table whose data is only fetched when makeReport includes it.
+            The data comes from a database (query) run through pgIO, or from
+            a python (func) that returns a dataframe or a list of dataframes.
+
+        Arguments:
+            name {str} -- Name of the table of which the tex file will be saved as.
+
+        Keyword Arguments:
+            query {str} -- Query to run with pgIO.getAllData. (default: {None})
+            func {callable} -- Called as func(*args, **kwargs) to get the data. (default: {None})
+            caption {str} -- Caption of the table. (default: {''})
+            **kwargs -- values, dbName and columns for the query, args and kwargs for the func,
+            and cache/maxAge for caching the data. See lazyItems.LazyItem.
+        """
+        self.lazyItems[name] = lazyItems.LazyItem(name, 'table', query=query, func=func,
+                                                  caption=caption, **kwargs)
+        return
+    
     ########################## ADDING FIGURES ###########################
     
     
     def saveFigure(self, name, fpath='', caption='', option='', override=False):
         """Given an existing image file (fpath), save to Figures folder 
-            as a png file with the same (name), if it doesn't yet exist. 
+            with the same (name), if it doesn't yet exist. 
             Optional to (override) even if it exists.
 
+        PNG, JPG, PDF and SVG images are accepted, and other raster images
+            that Pillow reads (TIFF, BMP, GIF, WebP). SVG images are converted
+            to PDF, and the other raster images to PNG. With (figureDpi) set, 
+            raster images are also downscaled to it at the print width. All 
+            of this is done once per image content, and cached. 
+
         If (caption) and (option) are given, will be added to the 
             figures' configuration dictionary. 
             The (Option) is any extra tex formatting of the image. 
@@ -153,40 +339,182 @@ class Report():
         
         Keyword Arguments:
             fpath {str} -- Location of the original file. Optional; if not provided, will just use files in the savePath (default: {''})
-            savePath {str} -- file path where the png will be copied to if fpath provided or override instruction given. (default: {''})
             caption {str} -- Caption that will be added to the bottom of the figure. (default: {''})
             option {str} -- Special tex configurations/formatting for the image. It must be a raw tex string, such as option='r'0.8\textheight'' or option='scale=0.5'. (default: {''})
-            override {bool} -- Specify whether to override a png file in savePath even if it exists. (default: {False})
-
-        Returns:
-            [type] -- [description]
+            override {bool} -- Specify whether to override a figure in savePath even if it exists. (default: {False})
         """
         savePath = os.path.join(self.fpath, 'figures')
-        outPng = os.path.join(savePath, name + '.png')
-        
-        if not os.path.exists(outPng) and fpath != '':
-            print(f'Copying {name}.png to {savePath}.')
-            shutil.copyfile(fpath, outPng)
+        ext = self.figureExt(fpath, name)
+        outFig = os.path.join(savePath, name + ext)
         
-        elif override==True:
-            print(f'Overriding {name}.png at {savePath}')
-            shutil.copyfile(fpath, outPng)
+        with self.lock('figure-' + name):
+            if not os.path.exists(outFig) and fpath != '':
+                print(f'Copying {name}{ext} to {savePath}.')
+                self.copyFigure(fpath, outFig)
+            
+            elif override==True:
+                print(f'Overriding {name}{ext} at {savePath}')
+                self.copyFigure(fpath, outFig)
 
-        elif fpath == '' and not os.path.exists(outPng):
-            print('No input path provided. Image not found.')
+            elif fpath == '' and not os.path.exists(outFig):
+                print('No input path provided. Image not found.')
 
-        elif os.path.exists(outPng):
-            print(f'{name} already exists in {savePath}. No override instruction was given.')
-        
-        # Add to dictionary. 
-        self.figures[name+'.png'] = {
-            'name': name,
-            'fpath': fpath,
-            'caption': caption,
-            'option': option
-        }
+            elif os.path.exists(outFig):
+                print(f'{name} already exists in {savePath}. No override instruction was given.')
+            
+            # Add to dictionary. 
+            self.figures[name+ext] = {
+                'name': name,
+                'fpath': fpath,
+                'caption': caption,
+                'option': option
+            }
+            self.recordArtifact('figure', name+ext, outFig, self.figures[name+ext])
         return
+
+    def figureExt(self, fpath, name):
+        """Extension of the figure (name) saved from (fpath) in the figures folder.
+        Without (fpath), that of the figure already saved under (name).
+        """
+        if fpath != '':
+            return storedExt(fpath)
+        for ext in FIGURES:
+            if os.path.exists(os.path.join(self.fpath, 'figures', name + ext)):
+                return ext
+        return '.png'
     
+    def plotFigure(self, name, plotFunc, data=None, params={}, caption='', option='', override=False):
+        """Render a figure by calling (plotFunc) on (data), and save it to 
+            the Figures folder as a png file with the same (name).
+
+        If a (renderCache) has been set, the data, parameters and the source
+            of (plotFunc) are hashed, and plotting is skipped when a figure
+            for the same inputs has already been rendered.
+
+        Arguments:
+            name {str} -- Name of the figure that will be saved into the figures folder.
+            plotFunc {callable} -- Function called as plotFunc(data, **params). It may draw on the 
+            current pyplot figure, or return a matplotlib Figure.
+        
+        Keyword Arguments:
+            data {any} -- Input data of the plot, typically a pandas dataframe. (default: {None})
+            params {dict} -- Extra keyword arguments passed to (plotFunc). (default: {{}})
+            caption {str} -- Caption that will be added to the bottom of the figure. (default: {''})
+            option {str} -- Special tex configurations/formatting for the image. (default: {''})
+            override {bool} -- Specify whether to re-render a figure that already exists. (default: {False})
+        """
+        import matplotlib.pyplot as plt
+        outPng = os.path.join(self.fpath, 'figures', name + '.png')
+        key = makeKey('figure', plotFunc, data, params)
+
+        seen = self.recorded('figure', name+'.png')
+        with self.lock('figure-' + name):
+            written = False
+            if (self.renderCache is None and self.upToDate('figure', name+'.png', outPng, key)
+                    and (not override or self.recorded('figure', name+'.png') != seen)):
+                print(f'{name} is unchanged. Reused {name}.png.')
+                written = True # the file is the figure of these inputs
+
+            elif not os.path.exists(outPng) or override==True:
+                written = True
+                cached = None
+                if self.renderCache is not None:
+                    cached = self.renderCache.get(key, '.png')
+
+                if cached is not None:
+                    if not (os.path.exists(outPng) and filecmp.cmp(cached, outPng, shallow=False)):
+                        if self.assetStore is None:
+                            self.publish(cached, outPng) # already rendered at its final size
+                        else:
+                            self.assetStore.place(cached, outPng)
+                    print(f'{name} is unchanged. Reused the cached {name}.png.')
+                else:
+                    blank = plt.figure()
+                    fig = None
+                    try:
+                        fig = plotFunc(data, **params)
+                        if not isinstance(fig, plt.Figure):
+                            fig = plt.gcf()
+                        # a new file, so that nothing is written through a link into the asset store
+                        tmpPng = f'{outPng}.{os.getpid()}.{threading.get_ident()}.tmp'
+                        fig.savefig(tmpPng, format='png')
+                    finally:
+                        # plotFunc may have drawn on a figure of its own instead
+                        plt.close(blank)
+                        if fig is not None:
+                            plt.close(fig)
+                    os.replace(tmpPng, outPng)
+                    if self.assetStore is not None:
+                        self.assetStore.place(outPng, outPng)
+                    print(f'Plotted {name}.png to {outPng}')
+                    if self.renderCache is not None:
+                        self.renderCache.put(key, '.png', outPng)
+            else:
+                print(f'{name} already exists in {os.path.dirname(outPng)}. No override instruction was given.')
+
+            self.figures[name+'.png'] = {
+                'name': name,
+                'fpath': outPng,
+                'caption': caption,
+                'option': option
+            }
+            self.recordArtifact('figure', name+'.png', outPng, dict(self.figures[name+'.png'],
+                                key=key if written else self.recordedKey('figure', name+'.png')))
+        return
+
+    def addLazyFigure(self, name, plotFunc, query=None, func=None, params={}, caption='', option='', **kwargs):
+        """Add a figure whose data is only fetched, and which is only plotted,
+            when makeReport includes it. See addLazyTable and plotFigure.
+
+        Arguments:
+            name {str} -- Name of the figure that will be saved into the figures folder.
+            plotFunc {callable} -- Called as plotFunc(data, **params) to draw the figure.
+        """
+        self.lazyItems[name] = lazyItems.LazyItem(name, 'figure', query=query, func=func,
+                                                  plotFunc=plotFunc, params=params,
+                                                  caption=caption, option=option, **kwargs)
+        return
+
+    def evaluateLazy(self, sectionOnly=False):
+        """Evaluate the lazy tables and figures that the report includes:
+            all of them, or with (sectionOnly) only those that are referenced
+            from a section.
+
+        Returns:
+            int -- The number of lazy items that were saved.
+        """
+        items = list(self.lazyItems.values())
+        if sectionOnly:
+            text = ''
+            for sect in self.sections.values():
+                if os.path.exists(sect['fpath']):
+                    with open(sect['fpath']) as f:
+                        text += f.read()
+            items = [item for item in items if item.referencedIn(text)]
+
+        if items == []:
+            return 0
+        return lazyItems.evaluate(self, items, self.lazyWorkers)
+
+    def copyFigure(self, fpath, outFig):
+        """Copy the image at (fpath) to (outFig), converting SVG images to PDF
+            and, with (figureDpi) set, downscaling raster images. If an (assetStore) has been set, the
+            image is stored once in the shared store and linked into the 
+            figures folder instead of being copied. Otherwise, images that
+            need converting or downscaling are cached in the .figureCache 
+            folder of the report, and all others are copied as they are.
+        """
+        ext = os.path.splitext(fpath)[1].lower()
+        if self.assetStore is not None:
+            self.assetStore.place(fpath, outFig)
+        elif self.figureDpi is None and ext not in VECTOR + CONVERTED:
+            shutil.copyfile(fpath, outFig)
+        else:
+            cache = AssetStore(root=os.path.join(self.fpath, '.figureCache'), 
+                               dpi=self.figureDpi, linkMode='copy')
+            cache.place(fpath, outFig)
+        return
+
     def addFig2Doc(self, figpath):
         """Add a figure by name to the end of the latex document, 
             if it exists in the folder, by referencing the configurations
@@ -195,6 +523,7 @@ class Report():
         Arguments:
             figpath {str} -- file path of the figure to be added to the document.
         """ 
+        from pylatex import Figure, Command, NoEscape, LineBreak
         fig = os.path.basename(figpath)
         inPath = os.path.join(self.fpath, 'figures', fig)
         outPath = os.path.join('../figures', fig)
@@ -227,6 +556,7 @@ class Report():
         """To add a new line to the document. If use NewLine() without
         the \leavevmode command, pdflatex will throw a 'no line to break' error.
         """
+        from pylatex import NoEscape, NewLine
         self.doc.append(NoEscape(r'\leavevmode'))
         self.doc.append(NewLine())
         return
@@ -240,6 +570,7 @@ class Report():
             special characters you want to include as tex.
             e.g. use r'\textbf'
         """
+        from pylatex import NoEscape
         self.doc.append(NoEscape(text))
         return 
 
@@ -250,6 +581,7 @@ class Report():
         Returns:
             pylatex Container -- Section/Subsection/Subsubsection container.
         """
+        from pylatex import Section, Subsection, Subsubsection
         if level == 1:
             return Section(title)
         elif level == 2:
@@ -271,21 +603,22 @@ class Report():
             level {int} -- The level of the seciton to be created. For example, level=2 gives a subsection. (default: {1})
             override {bool} -- Whether to override existing Figures on subsequent runs. (default: {False})
         """
+        from pylatex import NoEscape, LineBreak
         sectPath = os.path.join(self.fpath, 'sections',  name.replace(' ','_')+'.tex')
-        if not os.path.exists(sectPath) or override==True:
-            # Create a section
-            sect = self.sectionLevel(level, name)
-            sect.append('Insert your text here.')
-            sect.append(NoEscape(r'\lipsum[1]'))
-            sect.append(LineBreak())
-
-            # Dump the section 
-            with open(sectPath, 'w') as tf:
-                tf.write(sect.dumps())
-            print(f'Created section {name} at {sectPath}')
-
-        else:
-            print(f'{sectPath} already exists. Did not override.')
+        with self.lock('section-' + name.replace(' ', '_')):
+            if not os.path.exists(sectPath) or override==True:
+                # Create a section
+                sect = self.sectionLevel(level, name)
+                sect.append('Insert your text here.')
+                sect.append(NoEscape(r'\lipsum[1]'))
+                sect.append(LineBreak())
+
+                # Dump the section 
+                self.writeText(sectPath, sect.dumps())
+                print(f'Created section {name} at {sectPath}')
+
+            else:
+                print(f'{sectPath} already exists. Did not override.')
         
         if not name in self.sections:
             # avoid tex errors with any _ in the section name
@@ -293,65 +626,270 @@ class Report():
                 "fpath" : sectPath,
                 "level" : level
             }
+        self.recordArtifact('section', name.replace(' ', '_'), sectPath, {'level': level})
         return
     
-    def addAppendix(self, apdx):
-        """Adds mapping tables as an appendix to the report.
-        For the specified (apdx) csv file in the appendix folder, 
-            it will create a table with either 2/3-columns
-            specifying the mapping values. 
-        Note that this might not work well with extremely long mapping tables.
+    def readMappingTable(self, apdx):
+        """Reads the mapping table csv (apdx). Two-column tables map original
+            values to categories, and are grouped by category. Three-column
+            tables map ranges to categories.
+
+        Returns:
+            tuple -- The mapping table as a dataframe, and the column names
+            for the header of the table.
         """
+        import pandas as pd
         mappingTable = pd.read_csv(apdx, header=None)
         colNum = len(mappingTable.columns)
-        apdx_name = os.path.basename(apdx) # for printing
 
         if colNum == 2:
-            hdr_format = 'l X[l]'
             col_names = ['Original', 'Category']
             mappingTable.columns = col_names
             mappingTable = mappingTable.groupby('Category')['Original'].apply(list).reset_index()
-            tbl_type = LongTabularx(hdr_format, width_argument=NoEscape(r'0.9\textwidth'))
 
         elif colNum == 3:
-            hdr_format = 'l l l'
             col_names = ['Lower','Upper','Category']
-            tbl_type = Tabular(hdr_format)
+            mappingTable.columns = col_names
 
-        self.doc.append(Subsection('{}'.format(apdx_name.replace('_', ' '))))
+        return mappingTable, col_names
+
+    def appendixTable(self, apdx):
+        """Reads the mapping table (apdx) and prepares an empty table
+            with the header (and page footers, for long tables) for it.
+
+        Returns:
+            tuple -- The mapping table as a dataframe, and the pylatex table
+            that its rows are to be added to.
+        """
+        from pylatex import Tabular, LongTabularx, MultiColumn, NoEscape
+        mappingTable, col_names = self.readMappingTable(apdx)
+        colNum = len(col_names)
+
+        if colNum == 2:
+            hdr_format = 'l X[l]'
+            appendix = LongTabularx(hdr_format, width_argument=NoEscape(r'0.9\textwidth'))
+
+        elif colNum == 3:
+            hdr_format = 'l l l'
+            appendix = Tabular(hdr_format)
+
+        appendix.add_hline()
+        appendix.add_row(col_names) 
+        appendix.add_hline()
 
-        with self.doc.create(tbl_type) as appendix:
+        if colNum == 2: 
+            appendix.end_table_header()
             appendix.add_hline()
-            appendix.add_row(col_names) 
+            appendix.add_row((MultiColumn(colNum, align='r',
+                                        data='Continued on Next Page'),))
+            appendix.end_table_footer()
             appendix.add_hline()
+            appendix.add_row((MultiColumn(colNum, align='r',
+                            data='Not Continued on Next Page'),))
+            appendix.end_table_last_footer()
 
-            if colNum == 2: 
-                appendix.end_table_header()
-                appendix.add_hline()
-                appendix.add_row((MultiColumn(colNum, align='r',
-                                            data='Continued on Next Page'),))
-                appendix.end_table_footer()
-                appendix.add_hline()
-                appendix.add_row((MultiColumn(colNum, align='r',
-                                data='Not Continued on Next Page'),))
-                appendix.end_table_last_footer()
-
-            # Iterate through each row in the csv. 
-            for i, rw in mappingTable.iterrows():
-                row = [rw[j] for j in range(colNum)]
-                appendix.add_row(row)
+        return mappingTable, appendix
 
-            appendix.add_hline()
+    def addAppendix(self, apdx):
+        """Adds mapping tables as an appendix to the report.
+        For the specified (apdx) csv file in the appendix folder, 
+            it will create a table with either 2/3-columns
+            specifying the mapping values. 
+        Note that this might not work well with extremely long mapping tables.
+
+        Returns:
+            int -- The number of rows in the table.
+        """
+        from pylatex import Subsection, LineBreak
+        mappingTable, appendix = self.appendixTable(apdx)
+        apdx_name = os.path.basename(apdx) # for printing
 
+        self.doc.append(Subsection('{}'.format(apdx_name.replace('_', ' '))))
+
+        # Iterate through each row in the csv. 
+        for row in mappingTable.itertuples(index=False):
+            appendix.add_row(list(row))
+        appendix.add_hline()
+
+        self.doc.append(appendix)
         self.doc.append(LineBreak())
         
-        return
+        return len(mappingTable)
     
     
     ########################## MAKING THE REPORT ##########################
+
+    def makePreview(self, sectionOnly=False, cache=None):
+        """Quick preview of the report as a self-contained HTML file, 
+            without compiling any LaTeX. It contains the same sections, 
+            figures, tables and appendix as makeReport. Tables saved in 
+            this session are rendered directly from their dataframes.
+
+        Keyword Arguments:
+            sectionOnly {bool} -- Same as for makeReport. (default: {False})
+            cache {dict} -- Converted images and tables of earlier previews, see htmlPreview.makeHTML. (default: {None})
+
+        Returns:
+            str -- Path of the HTML file.
+        """
+        htmlPath = os.path.join(self.outputPath, self.name + '.html')
+        page = htmlPreview.makeHTML(self, sectionOnly, cache)
+        with open(htmlPath + '.tmp', 'w') as f:
+            f.write(page)
+        os.replace(htmlPath + '.tmp', htmlPath) # a browser reloading never sees half a page
+        print(f'Preview written to {htmlPath}')
+        return htmlPath
+
+    def previewSnippet(self, name, kind='section', fmt='png', dpi=150, display=True):
+        """Render a single section, table or figure with the preamble of the
+            report, for a quick look in a notebook. See snippetPreview.SnippetPreview.
+
+        Arguments:
+            name {str} -- Name of the section, table or figure, or tex with (kind) 'tex'.
+
+        Keyword Arguments:
+            kind {str} -- One of 'section', 'table', 'figure' or 'tex'. (default: {'section'})
+            fmt {str} -- 'png' or 'svg'. (default: {'png'})
+            dpi {int} -- Resolution of PNG images. (default: {150})
+            display {bool} -- Return IPython display objects, where IPython is installed. (default: {True})
+
+        Returns:
+            list -- One image per page: display objects, or PNG bytes or SVG strings.
+        """
+        preview = SnippetPreview(self, fmt=fmt, dpi=dpi)
+        render = {'section': preview.section, 'table': preview.table,
+                  'figure': preview.figure, 'tex': preview.render}[kind]
+        pages = render(name)
+        if display:
+            try:
+                return preview.show(pages)
+            except ImportError:
+                pass
+        return pages
+
         
-        
-    def makeReport(self, sectionOnly=False, tex_only=False):
+    def prepareBuildDir(self):
+        """Returns the folder that the tex is generated and compiled in: the
+            .build folder of the report, or with (buildDir) set, a folder of this 
+            report inside (buildDir). 'tmpfs' picks /dev/shm where it is available.
+            The build folder links to the sections, tables, figures and mapping 
+            tables of the report, so the relative paths in the tex still work, 
+            and it is kept between builds so that the aux files are reused. The
+            compiler never writes to the output folder, see publish.
+        """
+        if self.buildDir is None:
+            root = os.path.join(self.fpath, '.build')
+        else:
+            base = self.buildDir
+            if base == 'tmpfs':
+                base = '/dev/shm' if os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
+            tag = hashlib.sha256(os.path.abspath(self.fpath).encode()).hexdigest()[:12]
+            root = os.path.join(base, f'reportWriter-{self.name}-{tag}')
+        os.makedirs(os.path.join(root, 'output'), exist_ok=True)
+
+        links = {obj: os.path.join(self.fpath, obj) for obj in self.objects}
+        links[os.path.join('output', '.sectionBuild')] = os.path.join(self.outputPath, '.sectionBuild')
+        for rel, target in links.items():
+            link = os.path.join(root, rel)
+            if not os.path.islink(link):
+                os.symlink(os.path.abspath(target), link)
+        return os.path.join(root, 'output')
+
+    def publish(self, src, dest):
+        """Copy (src) to (dest) through a temporary file and a rename, so that
+            readers of (dest) never see a half-written file.
+        """
+        tmpPath = f'{dest}.{os.getpid()}.{threading.get_ident()}.tmp'
+        shutil.copyfile(src, tmpPath)
+        os.replace(tmpPath, dest)
+        return
+
+    def compileTex(self, filepath, compiler='pdflatex', maxPasses=4, profile=None, cwd=None, options=[]):
+        """Compile (filepath).tex into a PDF in the same folder. The compiler
+            is re-run for as long as LaTeX asks for it (to settle references
+            and the table of contents), up to (maxPasses) times.
+
+        Arguments:
+            filepath {str} -- Path of the tex file, without the .tex extension.
+
+        Keyword Arguments:
+            compiler {str} -- LaTeX compiler to use. (default: {'pdflatex'})
+            maxPasses {int} -- Maximum number of compiler runs. (default: {4})
+            profile {BuildProfile} -- Records the time of every pass. (default: {None})
+            cwd {str} -- Folder to run the compiler in, that relative paths in the tex
+            are resolved from. (default: {None}, the folder of the tex file)
+            options {list} -- Extra command line options of the compiler, e.g. a format file. (default: {[]})
+
+        Returns:
+            int -- The number of passes that were run.
+        """
+        if profile is None:
+            profile = BuildProfile(enabled=False)
+
+        outDir, base = os.path.split(os.path.abspath(filepath))
+        runDir = outDir if cwd is None else os.path.abspath(cwd)
+        cmd = [compiler, '-interaction=nonstopmode'] + list(options)
+        if runDir != outDir:
+            cmd.append('-output-directory=' + os.path.relpath(outDir, runDir))
+        cmd.append(os.path.relpath(os.path.join(outDir, base + '.tex'), runDir))
+
+        for n in range(1, maxPasses+1):
+            with profile.stage(f'compile pass {n}'):
+                proc = subprocess.run(cmd, cwd=runDir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if proc.returncode != 0:
+                print(proc.stdout.decode(errors='replace')[-2000:])
+                raise subprocess.CalledProcessError(proc.returncode, compiler)
+
+            with open(os.path.join(outDir, base + '.log'), errors='replace') as f:
+                if 'Rerun to get' not in f.read():
+                    break
+        profile.count('compilePasses', n)
+        return n
+
+    def compileReport(self, buildPath, prof=None):
+        """Compile the tex at (buildPath) in the build folder, optimize the PDF
+            if (pdfOptimize) is set, and publish it to the output folder. The
+            caller holds the 'report' lock.
+
+        Returns:
+            bool -- Whether the PDF was compiled and published.
+        """
+        if prof is None:
+            prof = BuildProfile(enabled=False)
+        texPath = os.path.join(self.outputPath, self.name)
+
+        try:
+            self.compileTex(buildPath, profile=prof)
+            prof.count('pdfBytes', os.path.getsize(buildPath + '.pdf'))
+            if self.pdfOptimize is not None:
+                with prof.stage('optimize pdf'):
+                    pdfOptimize.optimize(buildPath + '.pdf', **self.pdfOptimize)
+                prof.count('optimizedPdfBytes', os.path.getsize(buildPath + '.pdf'))
+        except Exception as e:
+            print(f'error! Unable to compile {texPath}.tex: {e}')
+            return False
+
+        with prof.stage('publish pdf'):
+            self.publish(buildPath + '.pdf', texPath + '.pdf')
+        print(f'Published {self.name}.pdf to {self.outputPath}')
+        return True
+
+    @locked('report')
+    def recompile(self):
+        """Recompile the PDF from the tex of the last makeReport, without
+            generating the tex again, e.g. after a section was edited.
+
+        Returns:
+            bool -- Whether the PDF was compiled and published.
+        """
+        buildPath = os.path.join(self.prepareBuildDir(), self.name)
+        texPath = os.path.join(self.outputPath, self.name)
+        if not os.path.exists(buildPath + '.tex'):
+            shutil.copyfile(texPath + '.tex', buildPath + '.tex')
+        return self.compileReport(buildPath)
+
+    @locked('report')
+    def makeReport(self, sectionOnly=False, tex_only=False, profile=False, bySection=False, workers=None):
         """Automated generation of the report. 
 
         Keyword Arguments:
@@ -364,49 +902,98 @@ class Report():
             will be regenerated at the end of your main tex document,
             even if you have already moved a copy out into the sections. 
             (default: {False})
-            texOnly {bool} -- Specify whether you would like a PDF document to be generated,
+
+            The tex is generated and compiled in a build folder (see prepareBuildDir),
+            and only the final .tex and PDF are copied to the output folder, each 
+            replaced in one atomic rename. Set (buildDir) to build in a fast local folder.
+
+            tex_only {bool} -- Specify whether you would like a PDF document to be generated,
             or if you only want to generate as tex for previewing. (default: {False})
+            profile {bool} -- Record the time and memory peak of every stage of the build, 
+            and write them to output/<name>.profile.json. The profile is compared against 
+            the one of the previous build. (default: {False})
+            bySection {bool} -- Compile every section to its own PDF in parallel, reusing the 
+            PDFs of unchanged sections, and include them in the report. Use it for large reports
+            where a full recompile is slow. See sectionBuild.SectionBuilder. (default: {False})
+            workers {int} -- Number of sections compiled at the same time with (bySection). (default: {None}, the number of CPUs)
+
+        Returns:
+            BuildProfile -- The (possibly disabled) profile of this build.
         """
+        from pylatex import Package, Section
+        prof = BuildProfile(enabled=profile)
+        texPath = os.path.join(self.outputPath, self.name)
+
+        # Rebuild the stale tables and figures of the artifact graph
+        with prof.stage('artifacts'):
+            if len(self.artifacts.graph) > 0:
+                prof.count('artifactsBuilt', len(self.artifacts.build()['built']))
+
+        # Fetch and save the lazy tables and figures that are included
+        with prof.stage('lazy items'):
+            prof.count('lazyItems', self.evaluateLazy(sectionOnly))
+
         # Clear document 
-        self.resetDoc()
+        with prof.stage('reset'):
+            self.resetDoc()
 
         # For section inside the folder, add sections
-        sectPath = os.path.join(self.fpath, 'sections')
-        # for sect in os.listdir(sectPath): 
-        for sect in self.sections: 
-            sectFile = os.path.join('../sections', sect)
-            self.addText2Doc(r'\input{' + sectFile + r'}')
+        with prof.stage('sections'):
+            sectPath = os.path.join(self.fpath, 'sections')
+            # for sect in os.listdir(sectPath): 
+            if bySection:
+                self.doc.packages.append(Package('pdfpages'))
+                for line in SectionBuilder(self, workers).build(prof):
+                    self.addText2Doc(line)
+                prof.count('sections', len(self.sections))
+            else:
+                for sect in self.sections: 
+                    sectFile = os.path.join('../sections', sect)
+                    self.addText2Doc(r'\input{' + sectFile + r'}')
+                    prof.count('sections')
 
         if not sectionOnly: # figures and tables tex will be pushed to main doc    
             # For figures inside the folder, add figures
-            figPath = os.path.join(self.fpath, 'figures')
-            self.doc.create(Section('Figures'))
-            for fig in glob.glob(figPath+'/*.png'):
-                self.addFig2Doc(fig)
+            with prof.stage('figures'):
+                self.doc.create(Section('Figures'))
+                for fig in self.listArtifacts('figures', FIGURES):
+                    self.addFig2Doc(fig)
+                    prof.count('images')
+                    prof.count('imageBytes', os.path.getsize(fig))
                 
             # For tables inside the folder, add tables
-            tblPath = os.path.join(self.fpath, 'tables')
-            self.doc.create(Section('Tables'))
-            for tbl in glob.glob(tblPath+'/*.tex'):
-                self.addTbl2Doc(tbl)
+            with prof.stage('tables'):
+                self.doc.create(Section('Tables'))
+                for tbl in self.listArtifacts('tables', '.tex'):
+                    self.addTbl2Doc(tbl)
+                    prof.count('tables')
 
         # For apx inside the folder, add appendix
-        appenPath = os.path.join(self.fpath, 'mappingTables')
-        apdxs = glob.glob(appenPath+'/*.csv')
-        if apdxs != []:
-            self.addText2Doc(r'\clearpage') # page break
-            self.doc.append(Section('Appendix - Mapping Tables'))
-            for apdx in apdxs:
-                self.addAppendix(apdx)
+        with prof.stage('appendix'):
+            appenPath = os.path.join(self.fpath, 'mappingTables')
+            apdxs = glob.glob(appenPath+'/*.csv')
+            if apdxs != []:
+                self.addText2Doc(r'\clearpage') # page break
+                self.doc.append(Section('Appendix - Mapping Tables'))
+                for apdx in apdxs:
+                    prof.count('appendixRows', self.addAppendix(apdx))
         
         ## generate tex/pdf
-        if texOnly:
-            self.doc.generate_tex(os.path.join(self.outputPath, self.name))
-        else:
-            try:
-                self.doc.generate_pdf(os.path.join(self.outputPath, self.name), 
-                                  clean_tex=False) #,compiler='pdflatex',compiler_args='-interaction=batchmode')
-            except:
-                print('error!')
+        buildPath = os.path.join(self.prepareBuildDir(), self.name)
+        with prof.stage('tex dump'):
+            tmpPath = f'{buildPath}.{os.getpid()}.tmp'
+            self.doc.generate_tex(tmpPath)
+            os.replace(tmpPath + '.tex', buildPath + '.tex')
+        prof.count('texBytes', os.path.getsize(buildPath + '.tex'))
 
-        return 
+        with prof.stage('publish tex'):
+            self.publish(buildPath + '.tex', texPath + '.tex')
+
+        if not tex_only:
+            self.compileReport(buildPath, prof)
+
+        previous = prof.save(texPath + '.profile.json')
+        if previous is not None:
+            prof.compare(previous)
+
+        return prof
@@ -0,0 +1,183 @@
+import os, re, json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Counters carried over from one section to the next
+COUNTERS = ['section', 'subsection', 'subsubsection', 'figure', 'table', 'equation', 'footnote']
+LEVELS = {1: 'section', 2: 'subsection', 3: 'subsubsection'}
+REFERENCES = re.compile(r'\\(?:input|include|includegraphics)\s*(?:\[[^\]]*\])?\s*\{([^}]*)\}')
+COUNTER_LINE = re.compile(r'SECTIONCOUNTERS((?: \w+=-?\d+)+)')
+
+class SectionBuilder():
+    """Compiles every section of a report to its own PDF, for reports
+    where recompiling every page after a small edit takes too long.
+
+    Each section is compiled in a standalone document with the preamble of
+    the report, without page numbers, and with the counters (section,
+    figure, table, ...) it starts at in the full report. Sections are
+    compiled in parallel, and a section PDF is reused for as long as the
+    preamble, the section, the files it inputs and its start counters are
+    unchanged. Report.makeReport then includes the section PDFs with
+    pdfpages, which adds the page numbers and the table of contents entries.
+
+    References between sections (\\ref to a label in another section) are
+    not resolved, since every section is compiled on its own.
+    """
+    def __init__(self, rep, workers=None, compiler='pdflatex'):
+        """Arguments:
+            rep {Report} -- The report whose sections are compiled.
+
+        Keyword Arguments:
+            workers {int} -- Number of sections compiled at the same time. (default: {None}, the number of CPUs)
+            compiler {str} -- LaTeX compiler to use. (default: {'pdflatex'})
+        """
+        self.rep = rep
+        self.workers = workers or os.cpu_count()
+        self.compiler = compiler
+        self.buildDir = os.path.join(rep.outputPath, '.sectionBuild')
+        self.indexPath = os.path.join(self.buildDir, 'index.json')
+        return
+
+    def loadIndex(self):
+        """Returns the key, start and end counters of every section PDF built so far.
+        """
+        if not os.path.exists(self.indexPath):
+            return {}
+        with open(self.indexPath) as f:
+            return json.load(f)
+
+    def saveIndex(self, index):
+        with open(self.indexPath + '.tmp', 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(self.indexPath + '.tmp', self.indexPath)
+        return
+
+    def dependencies(self, text):
+        """Returns the existing files that the tex (text) inputs or includes.
+        Paths are resolved from the output folder, like the compiler does.
+        """
+        deps = []
+        for ref in REFERENCES.findall(text):
+            fpath = os.path.join(self.rep.outputPath, ref.strip())
+            for candidate in [fpath, fpath + '.tex']:
+                if os.path.isfile(candidate):
+                    deps.append(candidate)
+                    break
+        return deps
+
+    def key(self, preamble, name, start):
+        """Hash of everything the PDF of section (name) depends on.
+        """
+        h = hashlib.sha256()
+        h.update(preamble.encode())
+        h.update(json.dumps(start, sort_keys=True).encode())
+        with open(self.rep.sections[name]['fpath'], 'rb') as f:
+            text = f.read()
+        h.update(text)
+        for dep in self.dependencies(text.decode(errors='replace')):
+            with open(dep, 'rb') as f:
+                h.update(dep.encode() + b'\0' + hashlib.sha256(f.read()).digest())
+        return h.hexdigest()
+
+    def sectionTex(self, preamble, name, start):
+        """Returns the standalone tex of section (name), starting at the
+        counters (start) and reporting its end counters in the log.
+        """
+        report = ' '.join(f'{c}=\\arabic{{{c}}}' for c in COUNTERS)
+        lines = [preamble, '\\pagestyle{empty}%\n', '\\begin{document}%\n']
+        lines += [f'\\setcounter{{{c}}}{{{start[c]}}}%\n' for c in COUNTERS]
+        lines += [f'\\input{{../sections/{name}}}%\n',
+                  f'\\typeout{{SECTIONCOUNTERS {report}}}%\n',
+                  '\\end{document}\n']
+        return ''.join(lines)
+
+    def compileSection(self, preamble, name, start):
+        """Compile section (name) starting at the counters (start).
+
+        Returns:
+            dict -- The counters at the end of the section.
+        """
+        texPath = os.path.join(self.buildDir, name)
+        with open(texPath + '.tex', 'w') as f:
+            f.write(self.sectionTex(preamble, name, start))
+        if os.path.exists(texPath + '.pdf'):
+            os.remove(texPath + '.pdf') # a section without output leaves no stale PDF behind
+        self.rep.compileTex(texPath, compiler=self.compiler, cwd=self.rep.outputPath)
+
+        end = dict(start)
+        with open(texPath + '.log', errors='replace') as f:
+            found = COUNTER_LINE.findall(f.read())
+        if found != []:
+            for pair in found[-1].split():
+                counter, value = pair.split('=')
+                end[counter] = int(value)
+        return end
+
+    def build(self, profile=None):
+        """Compile the sections that changed since the last build, in parallel.
+        Sections start at the counters the previous sections ended at. When a
+        section ends at different counters than before, the sections after it
+        are compiled again with the new start counters.
+
+        Keyword Arguments:
+            profile {BuildProfile} -- Counts the sections compiled and reused. (default: {None})
+
+        Returns:
+            list -- The tex lines that include the section PDFs in the report.
+        """
+        os.makedirs(self.buildDir, exist_ok=True)
+        preamble = self.rep.preambleTex()
+        names = list(self.rep.sections)
+        index = self.loadIndex()
+        compiled = set()
+
+        for _ in range(len(names) + 1):
+            todo, starts = [], {}
+            counters = dict.fromkeys(COUNTERS, 0)
+            for name in names:
+                starts[name] = counters
+                key = self.key(preamble, name, counters)
+                entry = index.get(name, {})
+                if entry.get('key') != key:
+                    todo.append((name, key))
+                counters = entry.get('end', counters) # until compiled, assume it is unchanged
+
+            if todo == []:
+                break
+
+            with ThreadPoolExecutor(max_workers=self.workers) as ex:
+                futures = {name: ex.submit(self.compileSection, preamble, name, starts[name])
+                           for name, _ in todo}
+                for name, key in todo:
+                    try:
+                        end = futures[name].result()
+                    except Exception as e:
+                        print(f'error! Unable to compile section {name}: {e}')
+                        index.pop(name, None)
+                        continue
+                    index[name] = {'key': key, 'start': starts[name], 'end': end}
+                    compiled.add(name)
+            self.saveIndex(index)
+            if any(name not in index for name, _ in todo):
+                break # do not retry failed sections
+
+        if profile is not None:
+            profile.count('sectionsCompiled', len(compiled))
+            profile.count('sectionsReused', len(names) - len(compiled))
+        print(f'Compiled {len(compiled)} of {len(names)} sections, reused the rest.')
+        return [self.includeTex(name, index.get(name)) for name in names
+                if os.path.exists(os.path.join(self.buildDir, name + '.pdf'))]
+
+    def includeTex(self, name, entry):
+        """Returns the tex that includes the PDF of section (name) with page
+        numbers, and adds it to the table of contents and bookmarks.
+        """
+        level = LEVELS.get(self.rep.sections[name].get('level', 1), 'section')
+        depth = COUNTERS.index(level) + 1
+        number = ''
+        if entry and entry['end'][level] > 0: # not numbered if the compiler did not report counters
+            number = '.'.join(str(entry['end'][c]) for c in COUNTERS[:depth])
+        title = f'{number} {name.replace("_", " ")}'.strip()
+        options = (f'pages=-,pagecommand={{\\thispagestyle{{plain}}}},'
+                   f'addtotoc={{1,{level},{depth},{{{title}}},sec:{name}}}')
+        return f'\\includepdf[{options}]{{.sectionBuild/{name}.pdf}}'
@@ -0,0 +1,211 @@
+import os, re, glob
+import shutil
+import hashlib
+import subprocess
+
+from lib.LaTeXreport.sectionBuild import REFERENCES
+
+class SnippetPreview():
+    """Renders a single section, table or figure of a report to images,
+    for a quick look from a notebook without building the whole report.
+
+    The snippet is compiled in a tiny document with the preamble of the
+    report. The preamble is compiled once into a format file, which is
+    rebuilt only when the preamble changes, so that the compiler starts
+    without loading any packages. Rendered pages are cached by the content
+    of the snippet and of every file it inputs or includes, so showing an
+    unchanged snippet again does not run LaTeX at all.
+
+    Pages are rasterized with pdftocairo or pdftoppm (poppler), or with
+    PyMuPDF if it is installed, and cropped to their content.
+    """
+    def __init__(self, rep, fmt='png', dpi=150, compiler='pdflatex'):
+        """Arguments:
+            rep {Report} -- The report the snippets come from.
+
+        Keyword Arguments:
+            fmt {str} -- 'png' or 'svg'. (default: {'png'})
+            dpi {int} -- Resolution of PNG images. (default: {150})
+            compiler {str} -- LaTeX compiler to use. (default: {'pdflatex'})
+        """
+        self.rep = rep
+        self.fmt = fmt
+        self.dpi = dpi
+        self.compiler = compiler
+        self.buildDir = os.path.join(rep.outputPath, '.snippets')
+        return
+
+    def section(self, name):
+        return self.render(f'\\input{{../sections/{name.replace(" ", "_")}}}')
+
+    def table(self, name):
+        return self.render(f'\\input{{../tables/{name}}}')
+
+    def figure(self, name):
+        """Render the figure (name) with its caption and options, as makeReport does.
+        """
+        ext = self.rep.figureExt('', name)
+        config = self.rep.figures.get(name + ext, {})
+        option = config.get('option', '') or r'width=0.8\textwidth'
+        tex = ['\\begin{figure}[h]', '\\centering',
+               f'\\includegraphics[{option}]{{../figures/{name}{ext}}}']
+        if config.get('caption', '') != '':
+            tex.append(f'\\caption{{{config["caption"]}}}')
+        tex.append('\\end{figure}')
+        return self.render('\n'.join(tex))
+
+    def dependencies(self, text, seen=None):
+        """Returns the files that (text) inputs or includes, recursively.
+        """
+        seen = set() if seen is None else seen
+        for ref in REFERENCES.findall(text):
+            fpath = os.path.normpath(os.path.join(self.rep.outputPath, ref.strip()))
+            for candidate in [fpath, fpath + '.tex']:
+                if os.path.isfile(candidate) and candidate not in seen:
+                    seen.add(candidate)
+                    if candidate.endswith('.tex'):
+                        with open(candidate, errors='replace') as f:
+                            self.dependencies(f.read(), seen)
+                    break
+        return seen
+
+    def key(self, preamble, body):
+        """Hash of the preamble, the snippet and every file the snippet uses.
+        """
+        h = hashlib.sha256(f'{self.compiler}:{self.fmt}:{self.dpi}\0{preamble}\0{body}'.encode())
+        for dep in sorted(self.dependencies(body)):
+            with open(dep, 'rb') as f:
+                h.update(dep.encode() + b'\0' + hashlib.sha256(f.read()).digest())
+        return h.hexdigest()
+
+    def formatFile(self, preamble):
+        """Returns the name of the format file of (preamble), relative to the
+        output folder, compiling it first if needed. Returns None if the
+        format cannot be compiled; snippets then load the preamble as usual.
+        """
+        name = 'preamble-' + hashlib.sha256(f'{self.compiler}\0{preamble}'.encode()).hexdigest()[:16]
+        fmtPath = os.path.join(self.buildDir, name + '.fmt')
+        if os.path.exists(fmtPath):
+            return os.path.join('.snippets', name)
+
+        with open(os.path.join(self.buildDir, name + '.tex'), 'w') as f:
+            f.write(preamble + '\\dump\n')
+        cmd = [self.compiler, '-ini', '-interaction=nonstopmode', f'-jobname={name}',
+               '-output-directory=.snippets', '&' + self.compiler, os.path.join('.snippets', name + '.tex')]
+        try:
+            proc = subprocess.run(cmd, cwd=self.rep.outputPath, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError:
+            return None
+        if proc.returncode != 0 or not os.path.exists(fmtPath):
+            print(f'Unable to compile the preamble into a format file. Compiling snippets without it.')
+            return None
+        return os.path.join('.snippets', name)
+
+    def compile(self, preamble, body, key):
+        """Compile the snippet (body) and returns the path of its PDF.
+        """
+        texPath = os.path.join(self.buildDir, key[:16])
+        fmtName = self.formatFile(preamble)
+        lines = [] if fmtName is not None else [preamble]
+        lines += ['\\pagestyle{empty}%\n', '\\begin{document}%\n', body, '%\n\\end{document}\n']
+        with open(texPath + '.tex', 'w') as f:
+            f.write(''.join(lines))
+        options = [] if fmtName is None else [f'-fmt={fmtName}']
+        self.rep.compileTex(texPath, compiler=self.compiler, maxPasses=1,
+                            cwd=self.rep.outputPath, options=options)
+        return texPath + '.pdf'
+
+    def pageCount(self, pdfPath):
+        """Returns the number of pages of (pdfPath), from pdfinfo, which comes
+        with pdftocairo, or with PyMuPDF. Without either, the page objects in
+        the file are counted.
+        """
+        if shutil.which('pdfinfo'):
+            proc = subprocess.run(['pdfinfo', pdfPath], stdout=subprocess.PIPE, check=True)
+            m = re.search(rb'^Pages:\s+(\d+)', proc.stdout, re.M)
+            if m is not None:
+                return int(m.group(1))
+        try:
+            import fitz
+            with fitz.open(pdfPath) as doc:
+                return doc.page_count
+        except ImportError:
+            pass
+        with open(pdfPath, 'rb') as f:
+            return max(1, len(re.findall(rb'/Type\s*/Page\b', f.read())))
+
+    def rasterize(self, pdfPath, prefix):
+        """Convert every page of (pdfPath) to an image file (prefix)-<page>.<fmt>.
+
+        Returns:
+            list -- Paths of the images, in page order.
+        """
+        if self.fmt == 'svg' and shutil.which('pdftocairo'):
+            for n in range(1, self.pageCount(pdfPath) + 1):
+                subprocess.run(['pdftocairo', '-svg', '-f', str(n), '-l', str(n), pdfPath,
+                                f'{prefix}-{n}.svg'], check=True)
+        elif self.fmt == 'png' and (shutil.which('pdftocairo') or shutil.which('pdftoppm')):
+            tool = 'pdftocairo' if shutil.which('pdftocairo') else 'pdftoppm'
+            subprocess.run([tool, '-png', '-r', str(self.dpi), pdfPath, prefix], check=True)
+            for n, fpath in enumerate(sorted(glob.glob(prefix + '-*.png'), key=lambda p: int(p.rsplit('-', 1)[1][:-4])), 1):
+                os.replace(fpath, f'{prefix}-{n}.png') # poppler pads page numbers with zeros
+        else:
+            try:
+                import fitz
+            except ImportError:
+                raise RuntimeError('Install poppler (pdftocairo) or PyMuPDF to preview snippets.')
+            with fitz.open(pdfPath) as doc:
+                for n, page in enumerate(doc, 1):
+                    if self.fmt == 'svg':
+                        with open(f'{prefix}-{n}.svg', 'w') as f:
+                            f.write(page.get_svg_image())
+                    else:
+                        page.get_pixmap(dpi=self.dpi).save(f'{prefix}-{n}.png')
+
+        images = sorted(glob.glob(f'{prefix}-*.{self.fmt}'), key=lambda p: int(p.rsplit('-', 1)[1].split('.')[0]))
+        if self.fmt == 'png':
+            for fpath in images:
+                crop(fpath)
+        return images
+
+    def render(self, body):
+        """Render the tex (body) with the preamble of the report.
+
+        Returns:
+            list -- The pages as PNG bytes, or SVG strings.
+        """
+        os.makedirs(self.buildDir, exist_ok=True)
+        preamble = self.rep.preambleTex()
+        key = self.key(preamble, body)
+        prefix = os.path.join(self.buildDir, key[:16])
+
+        images = sorted(glob.glob(f'{prefix}-*.{self.fmt}'))
+        if images == []:
+            images = self.rasterize(self.compile(preamble, body, key), prefix)
+
+        mode = 'rb' if self.fmt == 'png' else 'r'
+        pages = []
+        for fpath in sorted(images, key=lambda p: int(p.rsplit('-', 1)[1].split('.')[0])):
+            with open(fpath, mode) as f:
+                pages.append(f.read())
+        return pages
+
+    def show(self, pages):
+        """Returns the (pages) as IPython display objects, for a notebook.
+        """
+        from IPython.display import Image, SVG
+        return [Image(data=p) if self.fmt == 'png' else SVG(data=p) for p in pages]
+
+def crop(fpath, margin=10):
+    """Crop the PNG at (fpath) to its content, leaving a (margin) in pixels.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(fpath) as img:
+        box = ImageOps.invert(img.convert('L')).getbbox()
+        if box is None:
+            return
+        box = (max(0, box[0] - margin), max(0, box[1] - margin),
+               min(img.width, box[2] + margin), min(img.height, box[3] + margin))
+        cropped = img.crop(box)
+    cropped.save(fpath)
+    return
@@ -0,0 +1,169 @@
+import os
+import copy
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from pylatex import Document, Subsection, LineBreak
+from pylatex.base_classes import Container
+from pylatex.utils import dumps_list
+
+from lib.LaTeXreport.reportWriter import Report
+
+class StreamDocument(Document):
+    """A pylatex Document that does not keep its body in memory.
+
+    Every object appended at the top level of the document is dumped
+    straight away into a temporary body file, and only its packages are
+    remembered. Objects appended inside a `with doc.create(...)` block
+    are collected by that container as usual, and written out once the
+    block is closed. The preamble is small and stays in memory.
+    """
+    def __init__(self, tmpDir=None, **kwargs):
+        """Keyword Arguments:
+            tmpDir {str} -- Folder for the temporary body file. Use a folder on the same
+            disk as the output. (default: {None}, the system temporary folder)
+        """
+        self.depth = 0
+        self.body = tempfile.TemporaryFile(mode='w+', dir=tmpDir, suffix='.tex')
+        super().__init__(**kwargs)
+        return
+
+    def collectPackages(self, item):
+        """Add the packages needed by (item) to the document.
+        """
+        if isinstance(item, Container):
+            item._propagate_packages()
+        for p in getattr(item, 'packages', []):
+            self.packages.add(p)
+        return
+
+    def write(self, item):
+        """Dump (item) at the end of the body file, and collect its packages.
+        """
+        self.collectPackages(item)
+        self.body.write(dumps_list([item], escape=self.escape, token='%\n'))
+        self.body.write('%\n')
+        return
+
+    def append(self, item):
+        if self.depth > 0:
+            self.data.append(item)
+        else:
+            self.write(item)
+        return
+
+    @contextmanager
+    def create(self, child):
+        prev_data = self.data
+        self.data = child.data # appends go to the child
+        self.depth += 1
+        try:
+            yield child
+        finally:
+            self.depth -= 1
+            self.data = prev_data
+        self.append(child)
+
+    def streamTable(self, table, rows, chunkSize=1000):
+        """Write a (possibly very long) table without building all of its
+            rows in memory. The (table) should only contain the header,
+            the (rows) are added in chunks of (chunkSize) and dumped
+            straight away. A final hline closes the table.
+        """
+        full = table.dumps()
+        split = full.rfind('\\end{')
+        self.collectPackages(table)
+        self.body.write(full[:split])
+
+        def flush(chunk, hline=False):
+            part = copy.copy(table)
+            part.data = []
+            for row in chunk:
+                part.add_row(row)
+            if hline:
+                part.add_hline()
+            self.body.write(part.dumps_content())
+            if not hline:
+                self.body.write('%\n')
+            return
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunkSize:
+                flush(chunk)
+                chunk = []
+        flush(chunk, hline=True)
+
+        self.body.write('%\n' + full[split:] + '%\n')
+        return
+
+    def headAndTail(self):
+        """Returns the document text before and after the body.
+        """
+        data = self.data
+        self.data = []
+        full = Document.dumps(self)
+        self.data = data
+        split = full.rfind('%\n\\end{document}') # the body ends with its own '%\n'
+        return full[:split], full[split+2:]
+
+    def dumps(self):
+        head, tail = self.headAndTail()
+        self.body.seek(0)
+        body = self.body.read()
+        return head + body + tail
+
+    def generate_tex(self, filepath=None):
+        """Write the .tex file, copying the body over from disk.
+        """
+        filepath = self._select_filepath(filepath)
+        head, tail = self.headAndTail()
+        self.body.flush()
+        self.body.seek(0)
+        with open(filepath + '.tex', 'w') as tf:
+            tf.write(head)
+            shutil.copyfileobj(self.body, tf)
+            tf.write(tail)
+        self.body.seek(0, os.SEEK_END)
+        return
+
+    def close(self):
+        self.body.close()
+        return
+
+class StreamingReport(Report):
+    """A Report that writes the tex body to disk as content is added.
+
+    The public API is the same as Report. Instead of an in-memory pylatex
+    tree, the document is a StreamDocument, and mapping tables in the
+    appendix are streamed row by row. Use it for very large reports, where
+    holding and dumping the whole pylatex tree costs too much memory and time.
+    """
+    def resetDoc(self):
+        """Adds packages and preamble to a new streamed document.
+        Clears previous entries.
+        """
+        if isinstance(getattr(self, 'doc', None), StreamDocument):
+            self.doc.close()
+        tmpDir = self.outputPath if os.path.exists(self.outputPath) else None
+        self.doc = StreamDocument(tmpDir=tmpDir)
+        self.addPreamble()
+        return
+
+    def addAppendix(self, apdx, chunkSize=1000):
+        """Adds mapping tables as an appendix to the report, streaming
+            the rows of the table into the document in chunks.
+
+        Returns:
+            int -- The number of rows in the table.
+        """
+        mappingTable, appendix = self.appendixTable(apdx)
+        apdx_name = os.path.basename(apdx) # for printing
+
+        self.doc.append(Subsection('{}'.format(apdx_name.replace('_', ' '))))
+        rows = (list(row) for row in mappingTable.itertuples(index=False))
+        self.doc.streamTable(appendix, rows, chunkSize)
+        self.doc.append(LineBreak())
+        return len(mappingTable)
@@ -0,0 +1,210 @@
+'''Watch mode for report projects
+
+Run from the ``src`` folder with::
+
+    python3 -m lib.LaTeXreport.watcher Example1 --pdf
+
+The sections, figures, tables and mappingTables folders of the report are
+watched, and the report is rebuilt as soon as a file in them changes. The
+process stays alive between builds, so pandas, matplotlib and pylatex are
+only imported once, and only the parts affected by a change are rebuilt:
+
+- the HTML preview only converts the images, tables and mapping tables
+  that changed since the previous build,
+- the main tex file only \\input's the sections and tables, so it is only
+  regenerated when files are added or removed, or when a mapping table
+  (which is written into the appendix) changes. Otherwise the PDF is just
+  recompiled, with ``Report.recompile``, which builds it in the build
+  folder and publishes it atomically, like ``makeReport``.
+
+Changes are picked up through inotify when ``inotify_simple`` is installed,
+and by polling the folders otherwise.
+'''
+import os, time
+import argparse
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+from lib.LaTeXreport.reportWriter import Report
+
+IGNORED_SUFFIXES = ('~', '.swp', '.swx', '.tmp', '.part')
+
+class ReportWatcher():
+    """Rebuilds the preview and/or the PDF of a report whenever its inputs change.
+    """
+    def __init__(self, rep, preview=True, pdf=False, sectionOnly=False,
+                 interval=0.5, debounce=0.2, useInotify=None):
+        """Arguments:
+            rep {Report} -- The report to rebuild. Sections found in its sections folder
+            that it does not know of yet are added in alphabetical order.
+
+        Keyword Arguments:
+            preview {bool} -- Rebuild the HTML preview. (default: {True})
+            pdf {bool} -- Rebuild the tex and recompile the PDF. (default: {False})
+            sectionOnly {bool} -- Same as for makeReport. (default: {False})
+            interval {float} -- Seconds between two checks when polling. (default: {0.5})
+            debounce {float} -- Seconds to wait after a change, so that editors finish writing. (default: {0.2})
+            useInotify {bool} -- Use inotify instead of polling. (default: {None}, when available)
+        """
+        self.rep = rep
+        self.preview = preview
+        self.pdf = pdf
+        self.sectionOnly = sectionOnly
+        self.interval = interval
+        self.debounce = debounce
+        self.folders = [os.path.join(rep.fpath, obj) for obj in rep.objects]
+        self.fragments = {} # converted files of the preview, see htmlPreview.makeHTML
+        self.texPath = os.path.join(rep.outputPath, rep.name)
+
+        if useInotify is None:
+            useInotify = INotify is not None
+        self.inotify = None
+        if useInotify:
+            self.inotify = INotify()
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+            for folder in self.folders:
+                self.inotify.add_watch(folder, mask)
+
+        self.snap = self.snapshot()
+        self.addSections(self.snap)
+        return
+
+    def ignored(self, name):
+        """Hidden files, editor swap files and partial writes are not inputs.
+        """
+        return name.startswith(('.', '#')) or name.endswith(IGNORED_SUFFIXES)
+
+    def snapshot(self):
+        """Returns the modification time and size of every input file.
+        """
+        snap = {}
+        for folder in self.folders:
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                if entry.is_file() and not self.ignored(entry.name):
+                    st = entry.stat()
+                    snap[entry.path] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def addSections(self, snap):
+        """Keep the sections of the report in line with the section files in (snap).
+        """
+        sectPath = os.path.join(self.rep.fpath, 'sections')
+        files = sorted(p for p in snap if os.path.dirname(p) == sectPath and p.endswith('.tex'))
+        for fpath in files:
+            name = os.path.basename(fpath)[:-len('.tex')]
+            if name not in self.rep.sections:
+                self.rep.sections[name] = {'fpath': fpath, 'level': 1}
+                print(f'Watching the new section {name}')
+        for name in [n for n, s in self.rep.sections.items() if s['fpath'] not in snap]:
+            del self.rep.sections[name]
+            print(f'Section {name} was removed')
+        return
+
+    def wait(self):
+        """Block until an input may have changed.
+        """
+        if self.inotify is not None:
+            while self.inotify.read(timeout=None) == []:
+                pass
+        else:
+            time.sleep(self.interval)
+        time.sleep(self.debounce)
+        if self.inotify is not None:
+            self.inotify.read(timeout=0) # events of the same burst of writes
+        return
+
+    def changes(self):
+        """Returns the input files that were changed, added or removed since
+        the previous call, and whether any were added or removed.
+        """
+        new = self.snapshot()
+        changed = {p for p in set(new) | set(self.snap) if new.get(p) != self.snap.get(p)}
+        structural = set(new) != set(self.snap)
+        self.snap = new
+        return changed, structural
+
+    def rebuild(self, changed=None, structural=True):
+        """Rebuild what is affected by the (changed) files. Without (changed),
+        everything is rebuilt.
+
+        Returns:
+            float -- The time the rebuild took, in seconds.
+        """
+        t0 = time.perf_counter()
+        if structural:
+            self.addSections(self.snap)
+
+        tblPath = os.path.join(self.rep.fpath, 'tables')
+        apdxPath = os.path.join(self.rep.fpath, 'mappingTables')
+        for fpath in changed or []:
+            if os.path.dirname(fpath) == tblPath:
+                # edited on disk: the dataframe of this session is out of date
+                self.rep.tables.pop(os.path.basename(fpath), None)
+
+        if self.preview:
+            self.rep.makePreview(self.sectionOnly, cache=self.fragments)
+
+        if self.pdf:
+            apdxChanged = changed is None or any(os.path.dirname(p) == apdxPath for p in changed)
+            if structural or apdxChanged or not os.path.exists(self.texPath + '.tex'):
+                self.rep.makeReport(self.sectionOnly, tex_only=True)
+            # in the build folder, under the report lock, like makeReport
+            self.rep.recompile()
+
+        seconds = time.perf_counter() - t0
+        print(f'Rebuilt {self.rep.name} in {seconds:.2f}s')
+        return seconds
+
+    def step(self):
+        """Wait for changes, and rebuild once if there were any.
+
+        Returns:
+            set -- The files that changed.
+        """
+        self.wait()
+        changed, structural = self.changes()
+        if changed:
+            print(f'{len(changed)} changed: ' + ', '.join(sorted(os.path.basename(p) for p in changed)))
+            self.rebuild(changed, structural)
+        return changed
+
+    def run(self):
+        """Build once, and then rebuild on every change until interrupted.
+        """
+        self.rebuild()
+        mode = 'inotify' if self.inotify is not None else 'polling'
+        print(f'Watching {self.rep.fpath} ({mode}). Press Ctrl-C to stop.')
+        try:
+            while True:
+                self.step()
+        except KeyboardInterrupt:
+            print('Stopped watching.')
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+        return
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='rebuild a report whenever its inputs change')
+    parser.add_argument('name', help='name of the report, a folder in ../report')
+    parser.add_argument('--path', default=None, help='folder of the report (default: ../report/<name>)')
+    parser.add_argument('--pdf', action='store_true', help='also recompile the PDF')
+    parser.add_argument('--no-preview', dest='preview', action='store_false', help='do not rebuild the HTML preview')
+    parser.add_argument('--section-only', dest='sectionOnly', action='store_true', help='same as makeReport(sectionOnly=True)')
+    parser.add_argument('--sections', nargs='*', default=[], help='section names, in the order of the report')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between checks when polling')
+    args = parser.parse_args()
+
+    rep = Report(args.name)
+    rep.initialize(args.path)
+    for sect in args.sections:
+        rep.addSection(sect)
+
+    ReportWatcher(rep, preview=args.preview, pdf=args.pdf, sectionOnly=args.sectionOnly,
+                  interval=args.interval).run()
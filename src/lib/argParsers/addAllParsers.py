@@ -1,9 +1,10 @@
 from lib.argParsers import config as cf
 
 from logs import logDecorator as lD
-import jsonref, copy
+from lib.configLib import configLib as cL
+import copy
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.lib.argParsers.addAllParsers'
 
 @lD.log(logBase + '.parsersAdd')
@@ -1,5 +1,5 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
+from lib.configLib import configLib as cL
 from celery import Celery
 import logging
 
@@ -8,11 +8,11 @@ from datetime import datetime as dt
 from celery.signals import after_setup_logger
 
 
-config   = jsonref.load(open('../config/config.json'))
+config   = cL.loadConfig()
 logBase  = config['logging']['logBase']
 logLevel = config['logging']['level']
 logSpecs = config['logging']['specs']
-cConfig  = jsonref.load(open('../config/celery.json'))
+cConfig  = cL.loadConfig('../config/celery.json')
 
 logger = logging.getLogger(logBase)
 
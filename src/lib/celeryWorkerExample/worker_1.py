@@ -1,9 +1,9 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
+from lib.configLib import configLib as cL
 
 from lib.celery.App import app
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + 'lib.celeryWorkerExample.worker_1'
 
 @app.task
@@ -0,0 +1,8 @@
+'''Cached loading of the configuration files
+
+Every library and module reads ``../config/config.json`` when it is
+imported, to find its logging base. ``configLib.loadConfig`` parses
+each file once per process, and again only when the file changes.
+Files are parsed with ``json``, and with ``jsonref`` only when they
+contain a ``$ref``.
+'''
@@ -0,0 +1,38 @@
+import os, json, copy
+
+cache = {} # parsed files, by path, with the modification time and size they were parsed at
+
+def loadConfig(path='../config/config.json'):
+    '''read a JSON configuration file
+
+    The file is parsed the first time it is read in this process, and
+    again only when its modification time or size changes. Every call
+    returns a copy, so callers may update it. This is not decorated with
+    ``lD.log``, since it runs when modules are imported, before logging
+    has been set up.
+
+    Parameters
+    ----------
+    path : {str}, optional
+        path of the file (the default is ``'../config/config.json'``)
+
+    Returns
+    -------
+    dict or list
+        the contents of the file, with ``$ref`` references resolved
+    '''
+
+    st    = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit   = cache.get(path)
+    if hit is None or hit[0] != stamp:
+        with open(path) as f:
+            text = f.read()
+        if '$ref' in text:
+            import jsonref
+            data = jsonref.loads(text)
+        else:
+            data = json.loads(text)
+        hit = cache[path] = (stamp, data)
+
+    return copy.deepcopy(hit[1])
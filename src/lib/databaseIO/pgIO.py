@@ -1,8 +1,8 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
-from psycopg2.extras import execute_values
+from lib.configLib import configLib as cL
+import io
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.databaseIO.pgIO'
 
 @lD.log(logBase + '.getAllData')
@@ -39,7 +39,7 @@ def getAllData(logger, query, values=None, dbName=None):
     vals = None
     
     try:
-        db = jsonref.load(open('../config/db.json'))
+        db = cL.loadConfig('../config/db.json')
 
         # Check whether a dbName is available
         if (dbName is None) and ('defaultDB' in db):
@@ -50,6 +50,8 @@ def getAllData(logger, query, values=None, dbName=None):
             logger.error('A database name has not been specified.')
             return None
 
+        import psycopg2 # imported here so that importing pgIO is fast
+
         conn = psycopg2.connect(db[dbName]['connection'])
         cur  = conn.cursor()
     except Exception as e:
@@ -115,7 +117,7 @@ def getDataIterator(logger, query, values=None, chunks=100, dbName=None):
     '''
 
     try:
-        db = jsonref.load(open('../config/db.json'))
+        db = cL.loadConfig('../config/db.json')
 
         # Check whether a dbName is available
         if (dbName is None) and ('defaultDB' in db):
@@ -126,6 +128,8 @@ def getDataIterator(logger, query, values=None, chunks=100, dbName=None):
             logger.error('A database name has not been specified.')
             return None
 
+        import psycopg2
+
         conn = psycopg2.connect(db[dbName]['connection'])
         cur  = conn.cursor('remote')
     except Exception as e:
@@ -189,7 +193,7 @@ def getSingleDataIterator(logger, query, values=None, dbName=None):
     '''
 
     try:
-        db = jsonref.load(open('../config/db.json'))
+        db = cL.loadConfig('../config/db.json')
 
         # Check whether a dbName is available
         if (dbName is None) and ('defaultDB' in db):
@@ -200,6 +204,8 @@ def getSingleDataIterator(logger, query, values=None, dbName=None):
             logger.error('A database name has not been specified.')
             return None
 
+        import psycopg2
+
         conn = psycopg2.connect(db[dbName]['connection'])
         cur  = conn.cursor('remote')
     except Exception as e:
@@ -270,7 +276,7 @@ def commitData(logger, query, values=None, dbName=None):
     vals = True
     
     try:
-        db = jsonref.load(open('../config/db.json'))
+        db = cL.loadConfig('../config/db.json')
 
         # Check whether a dbName is available
         if (dbName is None) and ('defaultDB' in db):
@@ -281,6 +287,8 @@ def commitData(logger, query, values=None, dbName=None):
             logger.error('A database name has not been specified.')
             return None
 
+        import psycopg2
+
         conn = psycopg2.connect(db[dbName]['connection'])
         cur  = conn.cursor()
     except Exception as e:
@@ -347,7 +355,7 @@ def commitDataList(logger, query, values, dbName=None):
     val = True
 
     try:
-        db = jsonref.load(open('../config/db.json'))
+        db = cL.loadConfig('../config/db.json')
 
         # Check whether a dbName is available
         if (dbName is None) and ('defaultDB' in db):
@@ -358,6 +366,8 @@ def commitDataList(logger, query, values, dbName=None):
             logger.error('A database name has not been specified.')
             return None
 
+        import psycopg2
+
         conn = psycopg2.connect(db[dbName]['connection'])
         cur  = conn.cursor()
     except Exception as e:
@@ -367,6 +377,7 @@ def commitDataList(logger, query, values, dbName=None):
 
     try:
         query = cur.mogrify(query)
+        from psycopg2.extras import execute_values
         execute_values(cur, query, values)
     except Exception as e:
         logger.error('Unable to execute query for:\n query: {}\nvalues'.format(query, values))
@@ -383,3 +394,96 @@ def commitDataList(logger, query, values, dbName=None):
         return None
 
     return val
+
+def copyText(value):
+    '''format (value) as a field of the text format of ``COPY``'''
+
+    if value is None:
+        return '\\N'
+
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+@lD.log(logBase + '.copyDataList')
+def copyDataList(logger, copies, queries=[], dbName=None):
+    '''bulk insert rows into tables with ``COPY``
+    
+    Much faster than inserting the rows with ``commitDataList`` when there
+    are many of them. The (queries) are run first, and everything is
+    committed in a single transaction, so that either all of it or none of
+    it is written. If there is a problem, it is going to return the value
+    of ``None``, and log the error.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    copies : {list}
+        A list of ``(table, columns, rows)``, with the name of the table, the
+        list of columns to fill, and a list of rows holding a value for each
+        of the columns. ``None`` values are written as ``null``.
+    queries : {list}, optional
+        A list of ``(query, values)`` to run before copying (the default 
+        is an empty list)
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will 
+        attempt to read the name from the ``defaultDB`` item within the 
+        file ``../config/db.json``. 
+    
+    Returns
+    -------
+    True or None
+        A successful completion of this function returns a ``True``. 
+        In case there is an error, the error will be logged, and a ``None`` will
+        be returned
+    '''
+
+    val = True
+
+    try:
+        db = cL.loadConfig('../config/db.json')
+
+        # Check whether a dbName is available
+        if (dbName is None) and ('defaultDB' in db):
+            dbName = db['defaultDB']
+
+        # Check whether a dbName has been specified
+        if dbName is None:
+            logger.error('A database name has not been specified.')
+            return None
+
+        import psycopg2
+
+        conn = psycopg2.connect(db[dbName]['connection'])
+        cur  = conn.cursor()
+    except Exception as e:
+        logger.error('Unable to connect to the database')
+        logger.error(str(e))
+        return None
+
+    try:
+        for query, values in queries:
+            cur.execute(query, values)
+
+        for table, columns, rows in copies:
+            buf = io.StringIO()
+            for row in rows:
+                buf.write('\t'.join(copyText(v) for v in row) + '\n')
+            buf.seek(0)
+            cur.copy_expert('copy {} ({}) from stdin'.format(table, ', '.join(columns)), buf)
+
+        conn.commit()
+    except Exception as e:
+        logger.error('Unable to copy the data into: {}'.format([c[0] for c in copies]))
+        logger.error(str(e))
+        conn.rollback()
+        val = None
+
+    try:
+        cur.close()
+        conn.close()
+    except Exception as e:
+        logger.error('Unable to disconnect to the database')
+        logger.error(str(e))
+        return None
+
+    return val
@@ -83,34 +83,80 @@ Dependencies can then be tracked across different progeams, not just across diff
 modules.
 
 
+Caching the graph:
+^^^^^^^^^^^^^^^^^^
+
+``generateGraph`` caches the graph in ``config/modules/.graphCache.pickle``, along
+with the modification time, size and hash of every config file. Later calls only
+parse the config files that were added, changed or removed, and only update their
+nodes and edges, so the graph is available in milliseconds even with hundreds of
+modules. Delete the cache file to rebuild the graph from scratch.
+
+
+Plotting graphs:
+^^^^^^^^^^^^^^^^
+
+``plotGraph`` caches the layout of every graph in ``config/modules/.layouts``, by a hash
+of its nodes and edges, so Graphviz only lays out a graph once. Graphs with more than
+``MATPLOTLIB_NODES`` nodes are rendered by Graphviz directly (use a ``.svg`` file name
+for large graphs), and graphs with more than ``COLLAPSE_NODES`` nodes are plotted as a
+graph of their modules (``collapseGraph``). ``plotGraphs`` plots many graphs, such as
+the subgraphs of many nodes, in parallel processes.
+
+
 Uploading graphs to databases:
 ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
 It is absolutely possible that you would like to upload the graphs into dataabses. This
-can be done if the current database that you are working with has the following tables:
+can be done if the current database that you are working with has the following tables,
+which ``graphLib.createGraphTables`` creates (see ``graphLib.SCHEMA`` for the indexes):
 
 .. code-block:: SQL
 
   create schema if not exists graphs;
 
+  create table graphs.versions (
+      program_name     text,
+      version          integer,
+      now              timestamp with time zone,
+      structure_hash   text,
+      num_nodes        integer,
+      num_edges        integer,
+      primary key (program_name, version)
+  );
+
   create table graphs.nodes (
       program_name     text,
       now              timestamp with time zone,
       node_name        text,
       node_type        text,
-      summary          text
+      summary          text,
+      valid_from       integer,
+      valid_to         integer
   );
 
   create table graphs.edges (
       program_name     text,
       now              timestamp with time zone,
       node_from        text,
-      node_to          text
+      node_to          text,
+      valid_from       integer,
+      valid_to         integer
   );
 
 
 There are functions provided that will be able to take the entire graph and upload them
-directly into the databases. 
+directly into the databases. Uploads are versioned: ``uploadGraph`` does not write
+anything when the graph is the same as the latest version, and otherwise only writes the
+nodes and edges that were added or removed, with the version they were added in
+(``valid_from``) or removed in (``valid_to``). ``downloadGraph`` reconstructs any version,
+and ``downloadGraphs`` many versions at once, by version number or by upload time, with a
+single query. Downloaded versions are cached in memory, so comparing the lineage of
+different runs only downloads each version once.
+
+To find what feeds a table (or what it feeds) without downloading the graph, use
+``queryLineage``: it follows the edges with a recursive query on the database server,
+and only returns the nodes it finds and the edges between them.
 
 
 Available Graph Libraries:
@@ -118,6 +164,18 @@ Available Graph Libraries:
 
  - ``graphLib``: General purpose libraries for constructing graphs from the module
                  configurations. 
+ - ``scheduler``: Runs the modules of ``config/modules.json`` in parallel, in the order
+                 of their dependencies. Used by ``reportWriterDemo.importModules``.
+ - ``runCache``: Caches the file outputs of module runs, so that the scheduler skips
+                 modules when nothing they depend on changed. ``--force`` runs them anyway.
+ - ``criticalPath``: Reads the run time of every module from recent logs, and finds
+                 the critical path of the modules, the slack of every module, and
+                 the speedup from caching or parallelizing a module.
+                 ``criticalPath.addToReport`` adds the analysis to a report.
+ - ``reachability``: A precomputed index of the ancestors and descendants of every
+                 node of a graph, for lineage queries over large graphs. Build it
+                 once with ``graphLib.generateIndex`` and pass it to
+                 ``graphLib.generateSubGraph``.
 
 
 '''
\ No newline at end of file
@@ -0,0 +1,268 @@
+'''Critical path and bottlenecks of the modules, from measured run times
+
+The time every module takes is read from the logs of recent runs: the
+scheduler logs ``Module <name> finished in <seconds> seconds``, and older
+runs log the time of the main function of every module through the
+``lD.log`` decorator. Modules restored from the run cache are logged as
+``restored from the run cache`` instead, and are left out, since the
+time to copy their outputs is not the time they take to run. The dependencies of the modules come from
+``scheduler.moduleDAG``.
+
+With unlimited workers, a run takes as long as its critical path, the
+longest chain of modules that depend on each other. The slack of a module
+is how much longer it could take without making the run any longer, so
+only modules on the critical path (with no slack) are worth speeding up.
+'''
+
+from logs import logDecorator as lD
+from lib.configLib import configLib as cL
+import os, re, glob
+
+from lib.resultGraph import scheduler
+
+config = cL.loadConfig()
+logBase = config['logging']['logBase'] + '.lib.resultGraph.criticalPath'
+
+SCHEDULER_LINE = re.compile(r' - INFO - Module (\S+) finished in ([0-9.eE+-]+) seconds')
+MAIN_LINE      = re.compile(re.escape(config['logging']['logBase']) +
+                            r'\.modules\.(\w+)\.\w+\.main - INFO - Finished the function \[main\] in ([0-9.eE+-]+) seconds')
+
+@lD.log(logBase + '.moduleTimings')
+def moduleTimings(logger, logFolder=None, runs=5):
+    '''the run time of every module in recent runs
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    logFolder : {str}, optional
+        the folder of the log files (the default is None, which uses
+        the folder of the file logs in ``config/config.json``)
+    runs : {int}, optional
+        the number of most recent log files to read (the default is 5)
+
+    Returns
+    -------
+    dict
+        the median time in seconds of every module, over the runs it
+        appears in
+    '''
+
+    import numpy as np
+    if logFolder is None:
+        logFolder = config['logging']['specs']['file']['logFolder']
+
+    timings = {}
+    for fpath in sorted(glob.glob(os.path.join(logFolder, '*.log')))[-runs:]:
+        found, mains = {}, {}
+        with open(fpath, errors='replace') as f:
+            for line in f:
+                m = SCHEDULER_LINE.search(line)
+                if m is not None:
+                    found[m.group(1)] = float(m.group(2))
+                    continue
+                m = MAIN_LINE.search(line)
+                if m is not None:
+                    mains[m.group(1)] = float(m.group(2))
+
+        for name, seconds in dict(mains, **found).items():
+            timings.setdefault(name, []).append(seconds)
+
+    return {name: float(np.median(t)) for name, t in timings.items()}
+
+@lD.log(logBase + '.schedule')
+def schedule(logger, dag, durations):
+    '''the earliest and latest start of every module with unlimited workers
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    dag : {networkX.DiGraph object}
+        the dependencies of the modules, from ``scheduler.moduleDAG``
+    durations : {dict}
+        the time every module takes, in seconds. Modules without a
+        time are taken to take none.
+
+    Returns
+    -------
+    pandas.DataFrame
+        for every module in the order of its earliest start, its
+        ``duration``, ``earliestStart``, ``earliestFinish``,
+        ``latestStart``, ``latestFinish`` and ``slack``, and whether it
+        is ``critical``
+    '''
+
+    import numpy as np
+    import pandas as pd
+    import networkx as nx
+    order = list(nx.topological_sort(dag))
+    d     = {m: durations.get(m, 0.0) for m in order}
+
+    es, ef = {}, {}
+    for m in order:
+        es[m] = max([ef[p] for p in dag.predecessors(m)], default=0.0)
+        ef[m] = es[m] + d[m]
+    makespan = max(ef.values(), default=0.0)
+
+    ls, lf = {}, {}
+    for m in reversed(order):
+        lf[m] = min([ls[s] for s in dag.successors(m)], default=makespan)
+        ls[m] = lf[m] - d[m]
+
+    table = pd.DataFrame({
+        'duration'       : [d[m] for m in order],
+        'earliestStart'  : [es[m] for m in order],
+        'earliestFinish' : [ef[m] for m in order],
+        'latestStart'    : [ls[m] for m in order],
+        'latestFinish'   : [lf[m] for m in order],
+    }, index=pd.Index(order, name='module'))
+    table['slack']    = (table['latestStart'] - table['earliestStart']).clip(lower=0)
+    table['critical'] = np.isclose(table['slack'], 0)
+
+    return table.sort_values(['earliestStart', 'slack'], kind='mergesort')
+
+@lD.log(logBase + '.criticalPath')
+def criticalPath(logger, dag, durations):
+    '''the longest chain of dependent modules, from the first to the last
+
+    Returns
+    -------
+    list
+        the names of the modules on the critical path, in order
+    '''
+
+    import numpy as np
+    table = schedule(dag, durations)
+    if table.empty:
+        return []
+
+    path = [table['earliestFinish'].idxmax()]
+    while True:
+        m = path[-1]
+        preds = [p for p in dag.predecessors(m)
+                 if np.isclose(table.at[p, 'earliestFinish'], table.at[m, 'earliestStart'])]
+        if preds == []:
+            break
+        path.append(max(preds, key=lambda p: table.at[p, 'duration']))
+
+    return path[::-1]
+
+@lD.log(logBase + '.estimateSpeedup')
+def estimateSpeedup(logger, dag, durations, module, factor=0.0):
+    '''how much faster a run gets when one module gets faster
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    dag : {networkX.DiGraph object}
+        the dependencies of the modules
+    durations : {dict}
+        the time every module takes, in seconds
+    module : {str}
+        the module that gets faster
+    factor : {float}, optional
+        its new time, as a fraction of its current time: 0 when its
+        outputs are cached, or 1/k when it is split over k workers
+        (the default is 0.0)
+
+    Returns
+    -------
+    float
+        the time of a run now, divided by the time of a run with the
+        faster module (1 when the module is not on the critical path)
+    '''
+
+    before = schedule(dag, durations)['earliestFinish'].max()
+    after  = schedule(dag, dict(durations, **{module: durations.get(module, 0.0) * factor}))['earliestFinish'].max()
+
+    if not after > 0:
+        return float('inf') if before > 0 else 1.0
+
+    return float(before / after)
+
+@lD.log(logBase + '.analyzeModules')
+def analyzeModules(logger, durations=None, names=None, runs=5):
+    '''critical path analysis of the modules, from the logs of recent runs
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    durations : {dict}, optional
+        the time of every module (the default is None, which reads them
+        with ``moduleTimings`` from the last (runs) logs)
+    names : {list}, optional
+        the modules to analyse (the default is None, every module that
+        has a time)
+    runs : {int}, optional
+        see ``moduleTimings`` (the default is 5)
+
+    Returns
+    -------
+    pandas.DataFrame
+        the table of ``schedule``, with the ``speedupIfCached`` of
+        every module, the speedup of a run if the module were skipped
+    '''
+
+    if durations is None:
+        durations = moduleTimings(runs=runs)
+    if names is None:
+        names = sorted(durations)
+
+    dag   = scheduler.moduleDAG(names)
+    table = schedule(dag, durations)
+    table['speedupIfCached'] = [estimateSpeedup(dag, durations, m) for m in table.index]
+
+    path = criticalPath(dag, durations)
+    logger.info('Critical path: {} ({:.2f} seconds)'.format(
+        ' -> '.join(path), table['earliestFinish'].max() if len(table) else 0))
+
+    return table
+
+def plotSchedule(table):
+    '''Gantt chart of the earliest schedule of the modules in (table),
+    with the slack of every module, and the critical path in red'''
+
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 0.4 * len(table) + 1))
+    y = np.arange(len(table))
+    colors = ['tab:red' if c else 'tab:blue' for c in table['critical']]
+    ax.barh(y, table['duration'], left=table['earliestStart'], color=colors)
+    ax.barh(y, table['slack'], left=table['earliestFinish'], color='lightgray')
+    ax.set_yticks(y)
+    ax.set_yticklabels(table.index)
+    ax.invert_yaxis()
+    ax.set_xlabel('seconds')
+    fig.tight_layout()
+
+    return fig
+
+@lD.log(logBase + '.addToReport')
+def addToReport(logger, rep, table, name='moduleTimings'):
+    '''add the analysis (table) of ``analyzeModules`` to a report, as a
+    table and a Gantt chart of the schedule
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    rep : {Report}
+        the report, from ``lib.LaTeXreport.reportWriter``
+    table : {pandas.DataFrame}
+        the output of ``analyzeModules``
+    name : {str}, optional
+        the name of the table; the figure is saved as (name)Schedule
+        (the default is ``'moduleTimings'``)
+    '''
+
+    rep.saveTable(name, table.round(2), caption='Run time of the modules, and their slack. '
+                  'Modules without slack are on the critical path.', override=True)
+    rep.plotFigure(name + 'Schedule', plotSchedule, table,
+                   caption='Earliest schedule of the modules, with their slack in gray. '
+                   'The critical path is in red.', override=True)
+
+    return
@@ -1,75 +1,369 @@
 from logs import logDecorator as lD
-import jsonref, os
-import matplotlib.pyplot as plt # This comes before networkx
-import networkx as nx
-from networkx.drawing.nx_pydot import graphviz_layout
+from lib.configLib import configLib as cL
+import os, pickle, hashlib
+import shutil, subprocess
 from datetime import datetime as dt
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from lib.databaseIO import pgIO
 
-config = jsonref.load(open('../config/config.json'))
+# jsonref, networkx, numpy and matplotlib are imported in the functions
+# that use them, so that importing this module, e.g. for the scheduler,
+# stays quick
+
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.lib.resultGraph.graphLib'
 
+CACHE_VERSION = 1
+graphCaches   = {} # cached graphs already loaded in this process, by cache file
+
+LAYOUT_CACHE     = '../config/modules/.layouts' # laid out and rendered graphs, by layoutKey
+MATPLOTLIB_NODES = 100 # larger graphs are rendered by Graphviz directly
+COLLAPSE_NODES   = 500 # larger graphs are plotted as a graph of their modules
+
+VERSION_CACHE_SIZE = 64
+versionCache       = OrderedDict() # downloaded graph versions, by (dbName, programName, version)
+
+SCHEMA = '''
+create schema if not exists graphs;
+
+create table if not exists graphs.versions (
+    program_name     text,
+    version          integer,
+    now              timestamp with time zone,
+    structure_hash   text,
+    num_nodes        integer,
+    num_edges        integer,
+    primary key (program_name, version)
+);
+
+create table if not exists graphs.nodes (
+    program_name     text,
+    now              timestamp with time zone,
+    node_name        text,
+    node_type        text,
+    summary          text
+);
+
+create table if not exists graphs.edges (
+    program_name     text,
+    now              timestamp with time zone,
+    node_from        text,
+    node_to          text
+);
+
+alter table graphs.nodes add column if not exists valid_from integer;
+alter table graphs.nodes add column if not exists valid_to   integer;
+alter table graphs.edges add column if not exists valid_from integer;
+alter table graphs.edges add column if not exists valid_to   integer;
+
+create index if not exists nodes_version_idx on graphs.nodes (program_name, valid_from, valid_to);
+create index if not exists edges_version_idx on graphs.edges (program_name, valid_from, valid_to);
+create index if not exists versions_now_idx  on graphs.versions (program_name, now);
+
+-- lineage queries follow the edges from either end
+create index if not exists edges_to_idx   on graphs.edges (program_name, node_to, valid_from);
+create index if not exists edges_from_idx on graphs.edges (program_name, node_from, valid_from);
+create index if not exists nodes_name_idx on graphs.nodes (program_name, node_name, valid_from);
+'''
+
+@lD.log(logBase + '.readModuleConfig')
+def readModuleConfig(logger, text):
+    '''read the inputs and outputs of a module config
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    text : {bytes or str}
+        contents of the JSON config file of a module
+    
+    Returns
+    -------
+    dict
+        ``{'inputs': {name: (type, summary)}, 'outputs': {...}}``, where the
+        summary is the JSON of the input or output, as stored on the graph nodes
+    '''
+
+    import jsonref
+    data  = jsonref.loads(text)
+    entry = {}
+    for side in ['inputs', 'outputs']:
+        entry[side] = { n: (v['type'], jsonref.dumps(v)) for n, v in data[side].items() }
+
+    return entry
+
 @lD.log(logBase + '.generateGraph')
-def generateGraph(logger):
+def generateGraph(logger, folder='../config/modules', cachePath=None):
     '''generate a directed graph from the modules config
     
     generate a networkX.Graph object by reading the contents
     of the ``config/modules/`` folder. 
+
+    The graph is cached on disk (and in memory) along with the
+    modification time, size and hash of every config file. On
+    later calls, only the files that were added, changed or
+    removed are parsed again, and only their nodes and edges
+    are updated. A node that several modules refer to takes its
+    type and summary from the first of these files by name.
     
     Parameters
     ----------
     logger : {logging.logger}
         logging element 
+    folder : {str}, optional
+        folder containing the module configs (the default is
+        ``'../config/modules'``)
+    cachePath : {str}, optional
+        file the graph is cached in (the default is None, which
+        caches it in ``.graphCache.pickle`` within ``folder``)
     
     Returns
     -------
     networkX.Graph object
         Graph of which object is created when
     '''
-    
-    try:
 
-        graph = nx.DiGraph()
+    import networkx as nx
+    graph = nx.DiGraph()
 
-        folder = '../config/modules'
-        files  = [f for f in os.listdir(folder) if f.endswith('.json')]
-
-        for f in files:
-            data = jsonref.load(open(os.path.join(folder, f)))
-            inp  = list(data['inputs'].keys())
-            out  = list(data['outputs'].keys())
-            f = f.replace('.json', '')
-
-            graph.add_node( f, type='module', summary='' )
-            
-            # Add the incoming edges
-            for n in inp:
-                if n not in graph.nodes:
-                    summary = jsonref.dumps(data['inputs'][n])
-                    graph.add_node( n, 
-                        type    = data['inputs'][n]['type'],
-                        summary = summary)
-
-                graph.add_edge(n, f)
-
-            # Add the outgoing edges
-            for n in out:
-                if n not in graph.nodes:
-                    summary = jsonref.dumps(data['outputs'][n])
-                    graph.add_node( n, 
-                        type    = data['outputs'][n]['type'],
-                        summary = summary)
-
-                graph.add_edge(f, n)
+    try:
+
+        if cachePath is None:
+            cachePath = os.path.join(folder, '.graphCache.pickle')
+
+        cache = graphCaches.get(cachePath)
+        if cache is None and os.path.exists(cachePath):
+            try:
+                with open(cachePath, 'rb') as f:
+                    cache = pickle.load(f)
+                if cache.get('version') != CACHE_VERSION:
+                    cache = None
+            except Exception as e:
+                logger.warning('Ignoring the unreadable graph cache {}: {}'.format(cachePath, e))
+                cache = None
+        if cache is None:
+            cache = {'version': CACHE_VERSION, 'files': {}, 'graph': nx.DiGraph()}
+
+        files   = cache['files']
+        current = sorted(f for f in os.listdir(folder) if f.endswith('.json'))
+        changed = [f for f in files if f not in current]  # removed files
+        entries = {}
+        for f in current:
+            st  = os.stat(os.path.join(folder, f))
+            old = files.get(f)
+            if old is not None and (old['mtime'], old['size']) == (st.st_mtime_ns, st.st_size):
+                continue
+
+            with open(os.path.join(folder, f), 'rb') as fh:
+                text = fh.read()
+            digest = hashlib.sha256(text).hexdigest()
+            if old is not None and old['hash'] == digest:
+                old['mtime'], old['size'] = st.st_mtime_ns, st.st_size
+                continue
+
+            try:
+                entry = readModuleConfig(text)
+            except Exception as e:
+                logger.error('Unable to read the module config {}: {}'.format(f, e))
+                entry = {'inputs': {}, 'outputs': {}}
+            entry.update(mtime=st.st_mtime_ns, size=st.st_size, hash=digest)
+            entries[f] = entry
+            changed.append(f)
+
+        if changed != [] or not os.path.exists(cachePath):
+            updateGraph(cache, changed, entries)
+            tmpPath = '{}.{}.tmp'.format(cachePath, os.getpid())
+            with open(tmpPath, 'wb') as f:
+                pickle.dump(cache, f)
+            os.replace(tmpPath, cachePath)
+
+        graphCaches[cachePath] = cache
+        graph = cache['graph'].copy()
 
     except Exception as e:
         logger.error('Unable to generate the graph: {}'.format(e))
 
     return graph
 
+@lD.log(logBase + '.updateGraph')
+def updateGraph(logger, cache, changed, entries):
+    '''replace the nodes and edges of changed config files
+    
+    The changed files are removed from the cached graph, and those
+    among them with new entries are added back. Nodes that no module
+    refers to any more are removed, and the others take their type
+    and summary from the first file by name that refers to them.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    cache : {dict}
+        the cache of ``generateGraph``, updated in place
+    changed : {list}
+        names of the config files that were changed or removed
+    entries : {dict}
+        the output of ``readModuleConfig`` for the files that were
+        changed, with their modification time, size and hash
+    '''
+
+    graph, files = cache['graph'], cache['files']
+
+    affected = set()
+    for f in changed:
+        old = files.pop(f, None)
+        if old is not None:
+            affected |= set(old['inputs']) | set(old['outputs'])
+        if f.replace('.json', '') in graph:
+            graph.remove_node(f.replace('.json', ''))
+
+    for f, entry in entries.items():
+        files[f] = entry
+        module = f.replace('.json', '')
+        graph.add_node( module, type='module', summary='' )
+        for n in entry['inputs']:
+            graph.add_edge(n, module)
+        for n in entry['outputs']:
+            graph.add_edge(module, n)
+        affected |= set(entry['inputs']) | set(entry['outputs'])
+
+    owners = {}
+    for f in sorted(files):
+        for side in ['inputs', 'outputs']:
+            for n in files[f][side]:
+                if n in affected and n not in owners:
+                    owners[n] = files[f][side][n]
+
+    for n in affected:
+        if n in owners:
+            t, summary = owners[n]
+            graph.add_node( n, type=t, summary=summary )
+        elif n in graph and graph.nodes[n].get('type') != 'module':
+            graph.remove_node(n)
+
+    return
+
+@lD.log(logBase + '.layoutKey')
+def layoutKey(logger, graph):
+    '''hash of what the layout of a graph depends on: its nodes, their
+    type, and its edges
+    '''
+
+    h = hashlib.sha256()
+    for n, t in sorted((str(n), str(d.get('type'))) for n, d in graph.nodes(data=True)):
+        h.update('node\0{}\0{}\0'.format(n, t).encode())
+    for n1, n2 in sorted((str(n1), str(n2)) for n1, n2 in graph.edges):
+        h.update('edge\0{}\0{}\0'.format(n1, n2).encode())
+
+    return h.hexdigest()[:32]
+
+@lD.log(logBase + '.graphLayout')
+def graphLayout(logger, graph):
+    '''positions of the nodes of a graph, laid out by Graphviz dot
+
+    Layouts are cached in ``LAYOUT_CACHE`` by ``layoutKey``, so dot only
+    runs the first time a graph with these nodes and edges is plotted.
+    '''
+
+    from networkx.drawing.nx_pydot import graphviz_layout
+    cachePath = os.path.join(LAYOUT_CACHE, layoutKey(graph) + '.pickle')
+    if os.path.exists(cachePath):
+        try:
+            with open(cachePath, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning('Ignoring the unreadable layout {}: {}'.format(cachePath, e))
+
+    pos = graphviz_layout(graph, prog='dot')
+
+    os.makedirs(LAYOUT_CACHE, exist_ok=True)
+    tmpPath = '{}.{}.tmp'.format(cachePath, os.getpid())
+    with open(tmpPath, 'wb') as f:
+        pickle.dump(pos, f)
+    os.replace(tmpPath, cachePath)
+
+    return pos
+
+@lD.log(logBase + '.collapseGraph')
+def collapseGraph(logger, graph):
+    '''module-level view of a graph
+
+    Keeps the modules only, with an edge from a module to every module
+    that uses one of its outputs. The ``weight`` of an edge is the number
+    of outputs used, and the ``summary`` of a module counts its inputs
+    and outputs.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    graph : {networkX.Graph object}
+        The graph of ``generateGraph``
+    
+    Returns
+    -------
+    networkX.Graph object
+        The graph of the modules
+    '''
+
+    import networkx as nx
+    modules = [m for m, d in graph.nodes(data=True) if d.get('type') == 'module']
+    newGraph = nx.DiGraph()
+    for m in modules:
+        newGraph.add_node(m, type='module', summary='{} inputs, {} outputs'.format(
+            graph.in_degree(m), graph.out_degree(m)))
+
+    for m in modules:
+        for data in graph.successors(m):
+            for user in graph.successors(data):
+                if user in newGraph and user != m:
+                    weight = newGraph.edges[m, user]['weight'] + 1 if newGraph.has_edge(m, user) else 1
+                    newGraph.add_edge(m, user, weight=weight)
+
+    return newGraph
+
+@lD.log(logBase + '.renderGraphviz')
+def renderGraphviz(logger, graph, fileName):
+    '''render a graph with Graphviz dot, in the format of the extension
+    of (fileName), e.g. ``.svg``
+
+    The output is cached in ``LAYOUT_CACHE``, so a graph with the same
+    nodes and edges is only laid out once.
+    '''
+
+    fmt = os.path.splitext(fileName)[1].lstrip('.').lower() or 'svg'
+    cachePath = os.path.join(LAYOUT_CACHE, '{}.{}'.format(layoutKey(graph), fmt))
+
+    if not os.path.exists(cachePath):
+        quote = lambda n: '"{}"'.format(str(n).replace('\\', '\\\\').replace('"', '\\"'))
+        lines = ['digraph G {', '  node [style=filled, fontsize=10];']
+        for n, d in graph.nodes(data=True):
+            color = 'orange' if d.get('type') == 'module' else 'cyan'
+            lines.append('  {} [fillcolor={}];'.format(quote(n), color))
+        for n1, n2 in graph.edges:
+            lines.append('  {} -> {};'.format(quote(n1), quote(n2)))
+        lines.append('}')
+
+        os.makedirs(LAYOUT_CACHE, exist_ok=True)
+        tmpPath = '{}.{}.tmp'.format(cachePath, os.getpid())
+        subprocess.run(['dot', '-T' + fmt, '-o', tmpPath], input='\n'.join(lines).encode(), check=True)
+        os.replace(tmpPath, cachePath)
+
+    shutil.copyfile(cachePath, fileName)
+
+    return
+
 @lD.log(logBase + '.plotGraph')
-def plotGraph(logger, graph, fileName=None):
+def plotGraph(logger, graph, fileName=None, collapse=None):
     '''plot the graph
+
+    Graphs with up to ``MATPLOTLIB_NODES`` nodes are drawn with matplotlib,
+    with the layout cached by ``graphLayout``. Larger graphs are rendered by
+    Graphviz directly, in the format of the extension of (fileName), which
+    is much faster (use ``.svg`` for graphs that are too large to read as
+    an image). Graphs with more than ``COLLAPSE_NODES`` nodes are replaced
+    by their module-level view (see ``collapseGraph``).
     
     Parameters
     ----------
@@ -80,16 +374,30 @@ def plotGraph(logger, graph, fileName=None):
     fileName : {str}, optional
         name of the file where to save the graph (the default is None, which
         results in no graph being generated)
+    collapse : {bool}, optional
+        whether to plot the module-level view (the default is None, which
+        collapses graphs with more than ``COLLAPSE_NODES`` nodes)
     '''
 
+    import networkx as nx
     try:
+        if collapse or (collapse is None and graph.number_of_nodes() > COLLAPSE_NODES):
+            graph = collapseGraph(graph)
+
+        if graph.number_of_nodes() > MATPLOTLIB_NODES:
+            if fileName is not None:
+                renderGraphviz(graph, fileName)
+            print('Graph saved ...')
+            return
+
+        import matplotlib.pyplot as plt
         plt.figure()
 
         moduleNodes = [m for m, d in graph.nodes(data=True) if ('module' == d['type'])]
         otherNodes  = [m for m, d in graph.nodes(data=True) if ('module' != d['type'])]
         lables      = {m:m for m in graph.nodes}
 
-        pos = graphviz_layout(graph, prog='dot')
+        pos = graphLayout(graph)
         nx.draw_networkx_nodes(graph, pos, nodelist=moduleNodes, node_color='orange', node_size=500)
         nx.draw_networkx_nodes(graph, pos, nodelist=otherNodes, node_color='cyan', node_size=500)
         nx.draw_networkx_edges(graph, pos,  arrows=True)
@@ -105,8 +413,69 @@ def plotGraph(logger, graph, fileName=None):
 
     return
 
+@lD.log(logBase + '.plotGraphs')
+def plotGraphs(logger, graphs, fileNames, workers=None, collapse=None):
+    '''plot many graphs, e.g. the subgraphs of many nodes, in parallel
+
+    Every graph is plotted with ``plotGraph`` in a process of its own,
+    since matplotlib cannot draw from several threads.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    graphs : {list}
+        The graphs to plot
+    fileNames : {list}
+        The file to save each graph into
+    workers : {int}, optional
+        The number of graphs plotted at the same time (the default is
+        None, which uses the number of CPUs)
+    collapse : {bool}, optional
+        See ``plotGraph``
+    '''
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(plotGraph, g, f, collapse) for g, f in zip(graphs, fileNames)]
+            for future in futures:
+                future.result()
+    except Exception as e:
+        logger.error('Unable to plot the graphs: {}'.format(e))
+
+    return
+
+@lD.log(logBase + '.generateIndex')
+def generateIndex(logger, graph):
+    '''precompute the ancestors and descendants of every node
+
+    Build this once for a graph, and pass it to ``generateSubGraph``
+    when many subgraphs of the same graph are needed. It also answers
+    ancestor and descendant queries directly. See ``reachability``.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    graph : {networkX.Graph object}
+        The graph to index
+    
+    Returns
+    -------
+    ReachabilityIndex object
+        The index, or None if it could not be built
+    '''
+
+    try:
+        from lib.resultGraph.reachability import ReachabilityIndex
+        return ReachabilityIndex(graph)
+    except Exception as e:
+        logger.error('Unable to index the graph: {}'.format(e))
+
+    return None
+
 @lD.log(logBase + '.generateSubGraph')
-def generateSubGraph(logger, graph, keyNode):
+def generateSubGraph(logger, graph, keyNode, index=None):
     '''generate a subgraph that contains all prior nodes
     
     Parameters
@@ -115,8 +484,13 @@ def generateSubGraph(logger, graph, keyNode):
         logging element 
     graph : {networkX.Graph object}
         [description]
-    keyNode : {str}
-        Name of the node whose ancestors need to be geenrated.
+    keyNode : {str or list}
+        Name of the node whose ancestors need to be geenrated, or a
+        list of such nodes.
+    index : {ReachabilityIndex object}, optional
+        The index of ``graph`` made by ``generateIndex``, to look
+        the ancestors up instead of searching the graph (the default
+        is None)
     
     Returns
     -------
@@ -124,19 +498,19 @@ def generateSubGraph(logger, graph, keyNode):
         graph containing the particular node and its ancistors.
     '''
 
+    import networkx as nx
     try:
         newGraph = nx.DiGraph()
 
-        nodes = list(nx.ancestors(graph, keyNode))
-        nodes.append(keyNode)
-        
-        for n, d in graph.nodes(data=True):
-            if (n in nodes):
-                newGraph.add_node( n, **d )
+        keyNodes = keyNode if isinstance(keyNode, (list, set)) else [keyNode]
+        if index is not None:
+            nodes = index.upstream(keyNodes)
+        else:
+            nodes = set(keyNodes)
+            for n in keyNodes:
+                nodes |= nx.ancestors(graph, n)
 
-        for n1, n2 in graph.edges:
-            if (n1 in nodes) and (n2 in nodes):
-                newGraph.add_edge(n1, n2)
+        newGraph = graph.subgraph(nodes).copy()
 
     except Exception as e:
         logger.error('Unable to generate the right subgraph: {}'.format(e))
@@ -207,17 +581,354 @@ def serializedToGraph(logger, nodes, edges):
         into a networkX.Graph object
     '''
 
+    import networkx as nx
     graph = nx.DiGraph() 
 
-    for _, _, n, t, s in nodes:
-        graph.add_node( n, type = t, summary = s)
-
-    for _, _, e1, e2 in edges:
-        graph.add_edge( e1, e2)
-        
+    graph.add_nodes_from( (n, {'type': t, 'summary': s}) for _, _, n, t, s in nodes )
+    graph.add_edges_from( (e1, e2) for _, _, e1, e2 in edges )
 
     return graph
 
+@lD.log(logBase + '.structureHash')
+def structureHash(logger, graph):
+    '''hash of the nodes, their type and summary, and the edges of a graph
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    graph : {networkX.Graph object}
+        The graph to hash
+    
+    Returns
+    -------
+    str
+        sha256 hex digest, which does not depend on the order in which
+        the nodes and edges were added
+    '''
+
+    h = hashlib.sha256()
+    for n, t, s in sorted((str(n), str(d['type']), str(d['summary'])) for n, d in graph.nodes(data=True)):
+        h.update('node\0{}\0{}\0{}\0'.format(n, t, s).encode())
+    for n1, n2 in sorted((str(n1), str(n2)) for n1, n2 in graph.edges):
+        h.update('edge\0{}\0{}\0'.format(n1, n2).encode())
+
+    return h.hexdigest()
+
+@lD.log(logBase + '.graphDiff')
+def graphDiff(logger, old, new):
+    '''the nodes and edges that differ between two graphs
+    
+    A node whose type or summary changed is both removed and added.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    old : {networkX.Graph object}
+        The earlier graph
+    new : {networkX.Graph object}
+        The later graph
+    
+    Returns
+    -------
+    dict
+        The ``addedNodes`` and ``removedNodes`` (lists of names) and the
+        ``addedEdges`` and ``removedEdges`` (lists of pairs of names)
+    '''
+
+    oldNodes = {n: (d['type'], d['summary']) for n, d in old.nodes(data=True)}
+    newNodes = {n: (d['type'], d['summary']) for n, d in new.nodes(data=True)}
+    oldEdges, newEdges = set(old.edges), set(new.edges)
+
+    return {
+        'addedNodes'   : [n for n in newNodes if oldNodes.get(n) != newNodes[n]],
+        'removedNodes' : [n for n in oldNodes if newNodes.get(n) != oldNodes[n]],
+        'addedEdges'   : [e for e in new.edges if e not in oldEdges],
+        'removedEdges' : [e for e in old.edges if e not in newEdges],
+    }
+
+@lD.log(logBase + '.createGraphTables')
+def createGraphTables(logger, dbName=None):
+    '''create the tables that graphs are uploaded into
+    
+    Creates the ``graphs`` schema and its tables and indexes if they do not
+    exist, and adds the version columns to tables created before versioning.
+    See ``SCHEMA``.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    dbName : {str}, optional
+        The name of the database (the default is ``None``, which would use
+        the default database)
+    
+    Returns
+    -------
+    True or None
+        ``True`` on success, ``None`` on error
+    '''
+
+    return pgIO.commitData(SCHEMA, dbName=dbName)
+
+@lD.log(logBase + '.latestVersion')
+def latestVersion(logger, programName=None, dbName=None):
+    '''the latest version of the graph of a program in the database
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    programName : {str}, optional
+        The name of the program (the default is ``None``, which uses the
+        ``logBase`` of this program)
+    dbName : {str}, optional
+        The name of the database (the default is ``None``, which would use
+        the default database)
+    
+    Returns
+    -------
+    tuple or None
+        ``(version, structureHash)``, or ``(0, None)`` if no graph has been
+        uploaded yet, or ``None`` if there was an error
+    '''
+
+    programName = programName or config['logging']['logBase']
+    rows = pgIO.getAllData('''
+        select version, structure_hash from graphs.versions
+        where program_name = %s order by version desc limit 1''', (programName,), dbName=dbName)
+
+    if rows is None:
+        return None
+    if rows == []:
+        return (0, None)
+
+    return tuple(rows[0])
+
+@lD.log(logBase + '.downloadGraphs')
+def downloadGraphs(logger, versions=None, start=None, end=None, programName=None, dbName=None):
+    '''reconstruct many versions of a graph uploaded by ``uploadGraph``
+    
+    Every node and edge is stored once, with the version it was added in
+    (``valid_from``) and the version it was removed in (``valid_to``). A
+    single query returns the versions asked for, and every node and edge
+    that is part of any of them, once. The graphs are then built from
+    these rows in bulk.
+
+    Versions never change once they are uploaded, so the graphs are kept
+    in a cache of the last ``VERSION_CACHE_SIZE`` versions used, and are
+    only downloaded the first time. The graphs are frozen, since they are
+    shared: use ``graph.copy()`` to modify one.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    versions : {list}, optional
+        The versions to reconstruct (the default is ``None``, every version
+        uploaded between ``start`` and ``end``)
+    start : {datetime}, optional
+        Earliest upload time of the versions (the default is ``None``)
+    end : {datetime}, optional
+        Latest upload time of the versions (the default is ``None``)
+    programName : {str}, optional
+        The name of the program (the default is ``None``, which uses the
+        ``logBase`` of this program)
+    dbName : {str}, optional
+        The name of the database (the default is ``None``, which would use
+        the default database)
+    
+    Returns
+    -------
+    dict or None
+        The graphs by version, or ``None`` if there was an error
+    '''
+
+    import networkx as nx
+    try:
+        programName = programName or config['logging']['logBase']
+        graphs = {}
+        if versions is not None:
+            for v in versions:
+                if (dbName, programName, v) in versionCache:
+                    versionCache.move_to_end((dbName, programName, v))
+                    graphs[v] = versionCache[(dbName, programName, v)]
+            versions = [v for v in versions if v not in graphs]
+            if versions == []:
+                return graphs
+
+        rows = pgIO.getAllData('''
+            with v as (
+                select version from graphs.versions
+                where program_name = %(prog)s
+                and (%(versions)s::integer[] is null or version = any(%(versions)s::integer[]))
+                and (%(start)s::timestamptz is null or now >= %(start)s::timestamptz)
+                and (%(end)s::timestamptz is null or now <= %(end)s::timestamptz)
+            )
+            select 'version', null::text, null::text, null::text, version, null::integer from v
+            union all
+            select 'node', node_name, node_type, summary, valid_from, valid_to from graphs.nodes n
+            where program_name = %(prog)s and exists (select 1 from v
+                where n.valid_from <= v.version and (n.valid_to is null or n.valid_to > v.version))
+            union all
+            select 'edge', node_from, node_to, null, valid_from, valid_to from graphs.edges e
+            where program_name = %(prog)s and exists (select 1 from v
+                where e.valid_from <= v.version and (e.valid_to is null or e.valid_to > v.version))
+            ''', {'prog': programName, 'versions': versions, 'start': start, 'end': end}, dbName=dbName)
+        if rows is None:
+            raise RuntimeError('unable to read the graphs tables')
+
+        found  = sorted(r[4] for r in rows if r[0] == 'version')
+        nodes  = [r for r in rows if r[0] == 'node']
+        edges  = [r for r in rows if r[0] == 'edge']
+
+        import numpy as np
+        never  = np.iinfo(np.int64).max
+        nodeFrom = np.array([r[4] for r in nodes], dtype=np.int64)
+        nodeTo   = np.array([never if r[5] is None else r[5] for r in nodes], dtype=np.int64)
+        edgeFrom = np.array([r[4] for r in edges], dtype=np.int64)
+        edgeTo   = np.array([never if r[5] is None else r[5] for r in edges], dtype=np.int64)
+
+        for v in found:
+            graph = nx.DiGraph()
+            graph.add_nodes_from( (nodes[i][1], {'type': nodes[i][2], 'summary': nodes[i][3]})
+                for i in np.flatnonzero((nodeFrom <= v) & (nodeTo > v)) )
+            graph.add_edges_from( (edges[i][1], edges[i][2])
+                for i in np.flatnonzero((edgeFrom <= v) & (edgeTo > v)) )
+            graphs[v] = nx.freeze(graph)
+
+            versionCache[(dbName, programName, v)] = graphs[v]
+            while len(versionCache) > VERSION_CACHE_SIZE:
+                versionCache.popitem(last=False)
+
+        return graphs
+
+    except Exception as e:
+        logger.error('Unable to download the graphs: {}'.format(e))
+
+    return None
+
+@lD.log(logBase + '.downloadGraph')
+def downloadGraph(logger, version=None, programName=None, dbName=None):
+    '''reconstruct a version of a graph uploaded by ``uploadGraph``
+    
+    See ``downloadGraphs``, which this uses, and which downloads many
+    versions in a single query. The graph is frozen.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    version : {int}, optional
+        The version to reconstruct (the default is ``None``, the latest)
+    programName : {str}, optional
+        The name of the program (the default is ``None``, which uses the
+        ``logBase`` of this program)
+    dbName : {str}, optional
+        The name of the database (the default is ``None``, which would use
+        the default database)
+    
+    Returns
+    -------
+    networkX.Graph object or None
+        The graph, or ``None`` if there was an error
+    '''
+
+    try:
+        programName = programName or config['logging']['logBase']
+        if version is None:
+            version, _ = latestVersion(programName, dbName=dbName)
+
+        graphs = downloadGraphs([version], programName=programName, dbName=dbName)
+        if graphs is None or version not in graphs:
+            raise RuntimeError('the version was not found')
+
+        return graphs[version]
+
+    except Exception as e:
+        logger.error('Unable to download version {} of the graph: {}'.format(version, e))
+
+    return None
+
+@lD.log(logBase + '.queryLineage')
+def queryLineage(logger, keyNode, direction='ancestors', version=None, programName=None, dbName=None):
+    '''the ancestors or descendants of nodes, found by the database
+
+    The lineage is followed with a recursive query over ``graphs.edges``
+    on the database server, using the indexes on the ends of the edges,
+    and only the nodes found and the edges between them are returned.
+    The stored graph is never loaded as a whole, so this stays fast as
+    the history grows. The result is what ``generateSubGraph`` returns
+    for the ancestors of the same version of the graph.
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    keyNode : {str or list}
+        Name of the node whose lineage is needed, or a list of such nodes
+    direction : {str}, optional
+        ``'ancestors'`` (what feeds the nodes) or ``'descendants'`` (what
+        the nodes feed) (the default is ``'ancestors'``)
+    version : {int}, optional
+        The version of the graph (the default is ``None``, the latest)
+    programName : {str}, optional
+        The name of the program (the default is ``None``, which uses the
+        ``logBase`` of this program)
+    dbName : {str}, optional
+        The name of the database (the default is ``None``, which would use
+        the default database)
+    
+    Returns
+    -------
+    networkX.Graph object or None
+        The key nodes, their ancestors or descendants, and the edges
+        between them, or ``None`` if there was an error
+    '''
+
+    import networkx as nx
+    try:
+        if direction not in ['ancestors', 'descendants']:
+            raise ValueError('direction should be ancestors or descendants, not {}'.format(direction))
+        near, far = ('node_to', 'node_from') if direction == 'ancestors' else ('node_from', 'node_to')
+
+        programName = programName or config['logging']['logBase']
+        if version is None:
+            version, _ = latestVersion(programName, dbName=dbName)
+        keyNodes = keyNode if isinstance(keyNode, (list, set)) else [keyNode]
+
+        valid = '''program_name = %(prog)s and valid_from <= %(version)s
+                     and (valid_to is null or valid_to > %(version)s)'''
+        rows = pgIO.getAllData('''
+            with recursive lineage (node) as (
+                select unnest(%(nodes)s::text[])
+                union
+                select e.{far} from graphs.edges e join lineage l on e.{near} = l.node
+                where {valid}
+            )
+            select 'node', node_name, node_type, summary from graphs.nodes
+            where {valid} and node_name in (select node from lineage)
+            union all
+            select 'edge', node_from, node_to, null from graphs.edges
+            where {valid} and node_from in (select node from lineage)
+            and node_to in (select node from lineage)
+            '''.format(near=near, far=far, valid=valid),
+            {'prog': programName, 'version': version, 'nodes': [str(n) for n in keyNodes]}, dbName=dbName)
+        if rows is None:
+            raise RuntimeError('unable to query the graphs tables')
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from( (n, {'type': t, 'summary': s}) for k, n, t, s in rows if k == 'node' )
+        graph.add_edges_from( (n1, n2) for k, n1, n2, _ in rows if k == 'edge' )
+
+        return graph
+
+    except Exception as e:
+        logger.error('Unable to query the {} of {}: {}'.format(direction, keyNode, e))
+
+    return None
+
 @lD.log(logBase + '.uploadGraph')
 def uploadGraph(logger, graph, dbName=None):
     '''upload the supplied graph to a database
@@ -225,6 +936,13 @@ def uploadGraph(logger, graph, dbName=None):
     Given a graph, this function is going to upload the graph into
     a particular database. In case a database is not specified, this
     will try to upload the data into the default database.
+
+    Graphs are versioned. When the structure hash of the graph is that
+    of the latest version, nothing is written. Otherwise a new version
+    is recorded in ``graphs.versions``, and only the nodes and edges
+    that were added or removed since the latest version are written,
+    the added ones with ``COPY``. Use ``downloadGraph`` to reconstruct
+    any version.
     
     Parameters
     ----------
@@ -237,21 +955,63 @@ def uploadGraph(logger, graph, dbName=None):
         is the identifier within the ``db.json`` configuration file. (the 
         default is ``None``, which would use the default database specified
         within the same file)
+
+    Returns
+    -------
+    int or None
+        The version of the graph in the database, or ``None`` if there
+        was an error
     '''
 
+    import networkx as nx
     try:
 
-        nodes, edges = graphToSerialized(graph)
-
-        queryNodes = '''insert into graphs.nodes values %s'''
-        queryEdges = '''insert into graphs.edges values %s'''
-
-        pgIO.commitDataList(queryNodes, nodes, dbName=dbName)
-        pgIO.commitDataList(queryEdges, edges, dbName=dbName)
+        progName = config['logging']['logBase']
+        digest   = structureHash(graph)
+        latest, latestHash = latestVersion(progName, dbName=dbName)
+        if latestHash == digest:
+            logger.info('The graph is unchanged since version {}'.format(latest))
+            return latest
+
+        previous = downloadGraph(latest, progName, dbName=dbName) if latest > 0 else nx.DiGraph()
+        if previous is None:
+            raise RuntimeError('unable to read version {}'.format(latest))
+        diff     = graphDiff(previous, graph)
+        version  = latest + 1
+        now      = dt.now()
+
+        queries = [('''insert into graphs.versions
+                      (program_name, version, now, structure_hash, num_nodes, num_edges)
+                      values (%s, %s, %s, %s, %s, %s)''',
+                    (progName, version, now, digest, graph.number_of_nodes(), graph.number_of_edges()))]
+        if diff['removedNodes'] != []:
+            queries.append(('''update graphs.nodes set valid_to = %s
+                where program_name = %s and valid_from is not null and valid_to is null
+                and node_name = any(%s)''', (version, progName, diff['removedNodes'])))
+        if diff['removedEdges'] != []:
+            queries.append(('''update graphs.edges e set valid_to = %s
+                from unnest(%s::text[], %s::text[]) as r (node_from, node_to)
+                where e.program_name = %s and e.valid_from is not null and e.valid_to is null
+                and e.node_from = r.node_from and e.node_to = r.node_to''',
+                (version, [str(n1) for n1, _ in diff['removedEdges']],
+                 [str(n2) for _, n2 in diff['removedEdges']], progName)))
+
+        nodes = [[progName, now, n, graph.nodes[n]['type'], graph.nodes[n]['summary'], version]
+                 for n in diff['addedNodes']]
+        edges = [[progName, now, n1, n2, version] for n1, n2 in diff['addedEdges']]
+        copies = [
+            ('graphs.nodes', ['program_name', 'now', 'node_name', 'node_type', 'summary', 'valid_from'], nodes),
+            ('graphs.edges', ['program_name', 'now', 'node_from', 'node_to', 'valid_from'], edges)]
+
+        if pgIO.copyDataList(copies, queries, dbName=dbName) is None:
+            raise RuntimeError('unable to write version {}'.format(version))
+
+        logger.info('Uploaded version {} of the graph: +{} -{} nodes, +{} -{} edges'.format(
+            version, len(diff['addedNodes']), len(diff['removedNodes']),
+            len(diff['addedEdges']), len(diff['removedEdges'])))
+        return version
 
     except Exception as e:
-        logger.error()
-
-
-    return
+        logger.error('Unable to upload the graph: {}'.format(e))
 
+    return None
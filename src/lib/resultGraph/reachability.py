@@ -0,0 +1,134 @@
+'''Precomputed reachability of the nodes of a graph
+
+A ``ReachabilityIndex`` is built once for a graph, and then answers
+ancestor, descendant and subgraph queries without walking the graph.
+The strongly connected components of the graph are stored as a compact
+(CSR) adjacency in numpy arrays, and the transitive closure as one
+bitset per component, with a bit for every node of the graph. Looking
+up whether a node is an ancestor of another is a single bit test, and
+the ancestors of many nodes at once are the OR of their bitsets.
+
+The index is a snapshot: build a new one after the graph is modified.
+'''
+
+import numpy as np
+import networkx as nx
+
+class ReachabilityIndex():
+    '''ancestor and descendant queries on a snapshot of a graph
+
+    Parameters
+    ----------
+    graph : {networkX.DiGraph object}
+        The graph to index. Cycles are allowed.
+    '''
+
+    def __init__(self, graph):
+
+        self.graph = graph
+        self.nodes = list(graph.nodes)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        self.names = np.empty(len(self.nodes), dtype=object)
+        for i, n in enumerate(self.nodes):
+            self.names[i] = n
+        self.words = max(1, (len(self.nodes) + 63) // 64)
+
+        # Nodes in a cycle reach each other, so the closure is computed
+        # over the DAG of strongly connected components
+        cond      = nx.condensation(graph)
+        mapping   = cond.graph['mapping']
+        order     = list(nx.topological_sort(cond))
+        nodeIdx   = np.arange(len(self.nodes), dtype=np.int64)
+        self.component = np.array([mapping[n] for n in self.nodes], dtype=np.int64)
+
+        self.members = np.zeros((len(cond), self.words), dtype='<u8')
+        np.bitwise_or.at(self.members, (self.component, nodeIdx >> 6),
+                         np.left_shift(np.uint64(1), (nodeIdx & 63).astype(np.uint64)))
+
+        self.succPtr, self.succIdx = self.csr(cond, cond.successors)
+        self.predPtr, self.predIdx = self.csr(cond, cond.predecessors)
+        self.desc = self.closure(order[::-1], self.succPtr, self.succIdx, cond)
+        self.anc  = self.closure(order, self.predPtr, self.predIdx, cond)
+
+        return
+
+    def csr(self, cond, neighbours):
+        '''the neighbours of every component, as CSR arrays (indptr, indices)'''
+
+        indptr  = np.zeros(len(cond) + 1, dtype=np.int64)
+        indices = []
+        for c in range(len(cond)):
+            nbrs = list(neighbours(c))
+            indices += nbrs
+            indptr[c + 1] = indptr[c] + len(nbrs)
+
+        return indptr, np.array(indices, dtype=np.int64)
+
+    def closure(self, order, indptr, indices, cond):
+        '''bitsets of the nodes reachable from every component, following
+        (indptr, indices) and visiting the components in (order)'''
+
+        bits = np.zeros_like(self.members)
+        for c in order:
+            nbrs = indices[indptr[c]:indptr[c + 1]]
+            if len(nbrs) > 0:
+                bits[c] = np.bitwise_or.reduce(bits[nbrs] | self.members[nbrs], axis=0)
+            if len(cond.nodes[c]['members']) > 1:
+                bits[c] |= self.members[c]
+
+        return bits
+
+    def toNodes(self, bits):
+        '''the names of the nodes whose bits are set in (bits)'''
+
+        flags = np.unpackbits(bits.view(np.uint8), bitorder='little')[:len(self.nodes)]
+        return set(self.names[np.flatnonzero(flags)])
+
+    def rows(self, table, nodes):
+        '''the OR of the rows of (table) for the components of (nodes)'''
+
+        comps = self.component[[self.index[n] for n in nodes]]
+        return np.bitwise_or.reduce(table[comps], axis=0) if len(comps) > 0 else np.zeros(self.words, dtype='<u8')
+
+    def reaches(self, table, a, b):
+        '''whether the bit of node (b) is set in the row of node (a) of (table)'''
+
+        i, j = self.index[a], self.index[b]
+        return a != b and bool((int(table[self.component[i], j >> 6]) >> (j & 63)) & 1)
+
+    def ancestors(self, node):
+        '''the ancestors of (node), as ``nx.ancestors`` returns them'''
+
+        return self.toNodes(self.anc[self.component[self.index[node]]]) - {node}
+
+    def descendants(self, node):
+        '''the descendants of (node), as ``nx.descendants`` returns them'''
+
+        return self.toNodes(self.desc[self.component[self.index[node]]]) - {node}
+
+    def isAncestor(self, a, b):
+        '''whether there is a path from node (a) to node (b)'''
+
+        return self.reaches(self.desc, a, b)
+
+    def upstream(self, nodes):
+        '''the (nodes) together with all their ancestors'''
+
+        return self.closed(self.anc, nodes)
+
+    def downstream(self, nodes):
+        '''the (nodes) together with all their descendants'''
+
+        return self.closed(self.desc, nodes)
+
+    def closed(self, table, nodes):
+        '''the (nodes) together with the nodes set in their rows of (table)'''
+
+        nodes = list(nodes)
+        return self.toNodes(self.rows(table, nodes)) | set(nodes)
+
+    def subGraph(self, nodes):
+        '''the subgraph of the (nodes) and all their ancestors, with the data
+        of the nodes, as ``graphLib.generateSubGraph`` returns it'''
+
+        return self.graph.subgraph(self.upstream(nodes)).copy()
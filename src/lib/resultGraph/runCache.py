@@ -0,0 +1,267 @@
+'''Cache of the outputs of module runs
+
+A module whose inputs and outputs are all files or folders (``file-*``
+and ``folder-*`` types in ``config/modules/<name>.json``) is cached:
+after it runs, its outputs are copied into ``CACHE_FOLDER`` under a key
+made of the hash of its source files and of the ``lib`` packages it
+imports, its config, the command line arguments that are passed to it,
+and the contents of its inputs, which include the outputs of the modules
+upstream of it. When a module is about to run with the same key again,
+its outputs are restored from the cache instead. Modules with other
+inputs or outputs, e.g. database tables, or without declared outputs,
+always run.
+
+Only what is declared is tracked: a module that reads anything else,
+e.g. a file that is not one of its inputs, or the ``logs`` package, is
+restored even when that changed. Pass ``--force`` in that case.
+
+Entries that were not used for ``MAX_AGE_DAYS`` are removed, and then
+the least recently used ones until the cache is below ``MAX_BYTES``.
+Pass ``--force`` to ``reportWriterDemo.py`` to run every module anyway.
+'''
+
+from logs import logDecorator as lD
+from lib.configLib import configLib as cL
+import json, os, time, ast
+import shutil, hashlib
+
+config = cL.loadConfig()
+logBase = config['logging']['logBase'] + '.lib.resultGraph.runCache'
+
+CACHE_FOLDER = '../data/runCache'
+MAX_BYTES    = 5 * 2**30
+MAX_AGE_DAYS = 30
+IGNORED_ARGS = ['modules', 'workers', 'force', 'config'] # do not change what a module outputs
+
+def hashPath(h, path):
+    '''add the contents of the file or folder at (path) to the hash (h)'''
+
+    if os.path.isfile(path):
+        h.update(b'file\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    elif os.path.isdir(path):
+        h.update(b'folder\0')
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fname in sorted(files):
+                fpath = os.path.join(root, fname)
+                h.update(os.path.relpath(fpath, path).encode() + b'\0')
+                hashPath(h, fpath)
+    else:
+        h.update(b'missing\0')
+
+    return
+
+LIB_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def isFileLike(item):
+    return isinstance(item, dict) and str(item.get('type', '')).startswith(('file-', 'folder-'))
+
+def sourceFiles(folder):
+    '''the python files in (folder) and its sub-folders, in a fixed order'''
+
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        found += [os.path.join(root, f) for f in sorted(files) if f.endswith('.py')]
+
+    return found
+
+def libImports(folder):
+    '''the names of the ``lib`` packages that the python files in (folder)
+    import, and the packages that those import in turn'''
+
+    found, todo = set(), [folder]
+    while todo:
+        for fpath in sourceFiles(todo.pop()):
+            try:
+                with open(fpath, 'rb') as f:
+                    tree = ast.parse(f.read())
+            except SyntaxError:
+                continue
+            for node in ast.walk(tree):
+                names = []
+                if isinstance(node, ast.Import):
+                    names = [a.name for a in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+                    names = [node.module + '.' + a.name for a in node.names] if node.module == 'lib' else [node.module]
+                for name in names:
+                    parts = name.split('.')
+                    if len(parts) > 1 and parts[0] == 'lib' and parts[1] not in found \
+                            and os.path.isdir(os.path.join(LIB_FOLDER, parts[1])):
+                        found.add(parts[1])
+                        todo.append(os.path.join(LIB_FOLDER, parts[1]))
+
+    return found
+
+@lD.log(logBase + '.runKey')
+def runKey(logger, name, path, resultsDict, configFolder='../config/modules'):
+    '''the key of a run of a module, or None if it cannot be cached
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    name : {str}
+        the name of the module
+    path : {str}
+        the path of the main file of the module. All the python files
+        in its folder are hashed.
+    resultsDict : {dict}
+        the arguments passed to the main function of the module
+    configFolder : {str}, optional
+        the folder of the module configs (the default is
+        ``'../config/modules'``)
+
+    Returns
+    -------
+    str or None
+        the key, or None when the module has no outputs, or inputs or
+        outputs that are not files or folders
+    '''
+
+    configPath = os.path.join(configFolder, name + '.json')
+    if not os.path.exists(configPath):
+        return None
+    with open(configPath, 'rb') as f:
+        configText = f.read()
+    spec = cL.loadConfig(configPath)
+
+    outputs, inputs = spec.get('outputs', {}), spec.get('inputs', {})
+    if outputs == {} or not all(isFileLike(o) for o in outputs.values()):
+        return None
+    if not all(isFileLike(i) for i in inputs.values()):
+        return None # e.g. a database table, which may change without the key changing
+
+    h = hashlib.sha256(b'module\0' + name.encode() + b'\0')
+    folder = os.path.dirname(os.path.abspath(path))
+    for fpath in sourceFiles(folder):
+        h.update(os.path.relpath(fpath, folder).encode() + b'\0')
+        hashPath(h, fpath)
+    for pkg in sorted(libImports(folder)):
+        for fpath in sourceFiles(os.path.join(LIB_FOLDER, pkg)):
+            h.update(b'lib\0' + os.path.relpath(fpath, LIB_FOLDER).encode() + b'\0')
+            hashPath(h, fpath)
+
+    h.update(b'config\0' + configText)
+    args = {k: v for k, v in resultsDict.items() if k not in IGNORED_ARGS}
+    h.update(b'args\0' + json.dumps(args, sort_keys=True, default=str).encode())
+
+    for inp, item in sorted(inputs.items()):
+        h.update(b'input\0' + inp.encode() + b'\0')
+        hashPath(h, item['location'])
+
+    return h.hexdigest()
+
+def outputLocations(name, configFolder='../config/modules'):
+    '''the locations of the outputs of the module (name), by output name'''
+
+    spec = cL.loadConfig(os.path.join(configFolder, name + '.json'))
+
+    return {n: o['location'] for n, o in spec['outputs'].items()}
+
+@lD.log(logBase + '.restore')
+def restore(logger, name, key, configFolder='../config/modules'):
+    '''copy the outputs of the cached run (key) of module (name) into place
+
+    Returns
+    -------
+    bool
+        whether the run was in the cache
+    '''
+
+    entry = os.path.join(CACHE_FOLDER, key)
+    if not os.path.exists(os.path.join(entry, 'meta.json')):
+        return False
+
+    for n, location in outputLocations(name, configFolder).items():
+        src = os.path.join(entry, 'outputs', n)
+        if os.path.dirname(location) != '':
+            os.makedirs(os.path.dirname(location), exist_ok=True)
+        tmp = '{}.{}.tmp'.format(location.rstrip('/'), os.getpid())
+        if os.path.isdir(src):
+            shutil.copytree(src, tmp)
+            if os.path.isdir(location):
+                shutil.rmtree(location)
+            os.replace(tmp, location)
+        else:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, location)
+
+    os.utime(os.path.join(entry, 'meta.json')) # last used, for eviction
+    logger.info('Module {} restored from the run cache ({})'.format(name, key[:12]))
+
+    return True
+
+@lD.log(logBase + '.store')
+def store(logger, name, key, configFolder='../config/modules'):
+    '''copy the outputs of module (name) into the cache, under (key)'''
+
+    entry = os.path.join(CACHE_FOLDER, key)
+    if os.path.exists(entry):
+        return
+
+    tmp = '{}.{}.tmp'.format(entry, os.getpid())
+    os.makedirs(os.path.join(tmp, 'outputs'), exist_ok=True)
+    try:
+        locations = outputLocations(name, configFolder)
+        for n, location in locations.items():
+            if os.path.isdir(location):
+                shutil.copytree(location, os.path.join(tmp, 'outputs', n))
+            elif os.path.isfile(location):
+                shutil.copyfile(location, os.path.join(tmp, 'outputs', n))
+            else:
+                logger.warning('Module {} did not write its output {} to {}. The run is not cached.'.format(
+                    name, n, location))
+                return
+
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'module': name, 'created': time.time(), 'outputs': locations}, f)
+        os.replace(tmp, entry)
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+
+    return
+
+def entrySize(entry):
+
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(entry) for f in files)
+
+@lD.log(logBase + '.evict')
+def evict(logger, maxBytes=None, maxAgeDays=None):
+    '''remove the entries not used for (maxAgeDays), and then the least
+    recently used entries until the cache takes less than (maxBytes)
+
+    Returns
+    -------
+    int
+        the number of entries removed
+    '''
+
+    maxBytes   = MAX_BYTES if maxBytes is None else maxBytes
+    maxAgeDays = MAX_AGE_DAYS if maxAgeDays is None else maxAgeDays
+    if not os.path.isdir(CACHE_FOLDER):
+        return 0
+
+    entries = []
+    for key in os.listdir(CACHE_FOLDER):
+        meta = os.path.join(CACHE_FOLDER, key, 'meta.json')
+        if os.path.exists(meta):
+            entries.append((os.path.getmtime(meta), entrySize(os.path.join(CACHE_FOLDER, key)), key))
+    entries.sort()
+
+    removed, total = 0, sum(size for _, size, _ in entries)
+    for used, size, key in entries:
+        if time.time() - used < maxAgeDays * 86400 and total <= maxBytes:
+            break
+        shutil.rmtree(os.path.join(CACHE_FOLDER, key), ignore_errors=True)
+        total -= size
+        removed += 1
+
+    if removed > 0:
+        logger.info('Removed {} entries from the run cache'.format(removed))
+
+    return removed
@@ -0,0 +1,202 @@
+'''Run modules in the order of their dependencies, optionally in parallel
+
+The inputs and outputs of every module are read from ``config/modules/``
+by ``graphLib.generateGraph``. A module that uses an output of another
+module waits for it to finish, and modules that do not depend on each
+other run at the same time, each in a process of its own. When a module
+fails, the modules downstream of it are cancelled, and the others run
+as usual.
+
+Only the dependencies declared in ``config/modules/`` are known, so by
+default the modules run one after another, in the order they are listed
+in ``config/modules.json``. Run them with more workers only when every
+module declares what it reads and writes.
+
+Modules whose outputs are files are skipped when nothing they depend on
+changed, and their outputs restored from the run cache (see ``runCache``).
+
+A module can state how many of the workers it occupies with a
+``"cpus"`` entry in ``config/modules.json`` (the default is 1), e.g.
+for modules that use several cores themselves.
+'''
+
+from logs import logDecorator as lD
+from lib.configLib import configLib as cL
+import time
+from importlib import util
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from lib.resultGraph import graphLib, runCache
+
+config = cL.loadConfig()
+logBase = config['logging']['logBase'] + '.lib.resultGraph.scheduler'
+
+@lD.log(logBase + '.moduleDAG')
+def moduleDAG(logger, names, graph=None):
+    '''the dependencies between the modules (names)
+
+    Module ``a`` depends on module ``b`` when an output of ``b`` is an
+    input of ``a``. Only dependencies between the modules in (names)
+    are kept: modules that are not run do not hold others back.
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    names : {list}
+        names of the modules to run
+    graph : {networkX.Graph object}, optional
+        the graph of ``graphLib.generateGraph`` (the default is None,
+        which generates it)
+
+    Returns
+    -------
+    networkX.DiGraph object
+        a graph of the modules, with an edge from every module to
+        the modules that use its outputs
+    '''
+
+    import networkx as nx
+    if graph is None:
+        graph = graphLib.generateGraph()
+
+    dag = nx.DiGraph()
+    dag.add_nodes_from(names)
+    for m in names:
+        if m not in graph:
+            continue
+        for data in graph.successors(m):
+            for user in graph.successors(data):
+                if user in dag and user != m:
+                    dag.add_edge(m, user)
+
+    return dag
+
+def runModule(name, path, resultsDict):
+    '''import the module at (path) and run its main function
+
+    This runs in a worker process. When the outputs of the module are in
+    the run cache, they are restored instead, unless ``resultsDict['force']``
+    is set. Returns the time it took in seconds, and whether the outputs
+    were restored from the cache.
+    '''
+
+    t0  = time.time()
+    key = runCache.runKey(name, path, resultsDict)
+    if key is not None and not resultsDict.get('force') and runCache.restore(name, key):
+        return time.time() - t0, True
+
+    module_spec = util.spec_from_file_location(name, path)
+    module = util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    module.main(resultsDict)
+
+    if key is not None:
+        runCache.store(name, key)
+
+    return time.time() - t0, False
+
+@lD.log(logBase + '.runModules')
+def runModules(logger, modules, resultsDict, workers=1):
+    '''run the (modules) in the order of their dependencies
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element
+    modules : {list}
+        the entries of ``config/modules.json`` of the modules to run,
+        in the order they are run in when they do not depend on each other
+    resultsDict : {dict}
+        the arguments passed on to the main function of every module
+    workers : {int}, optional
+        the number of modules run at the same time (the default is 1,
+        which runs the modules one after another in this process, in the
+        listed order where they do not depend on each other)
+
+    Returns
+    -------
+    dict
+        the names of the modules that 'finished', that 'failed', and
+        that were 'cancelled' because a module upstream of them failed
+    '''
+
+    import networkx as nx
+    result  = {'finished': [], 'failed': [], 'cancelled': []}
+    workers = workers or 1
+    entries = {m['moduleName']: m for m in modules}
+    order   = [m['moduleName'] for m in modules]
+    dag     = moduleDAG(order)
+
+    if not nx.is_directed_acyclic_graph(dag):
+        logger.error('The modules depend on each other in a cycle: {}. They are run in the listed order.'.format(
+            nx.find_cycle(dag)))
+        dag = nx.DiGraph()
+        dag.add_nodes_from(order)
+        workers = 1
+
+    waiting = {m: set(dag.predecessors(m)) for m in order}
+    cpus    = {m: min(max(int(entries[m].get('cpus', 1)), 1), workers) for m in order}
+
+    def finished(name, run=None, error=None):
+        if error is None:
+            seconds, restored = run
+            if restored: # not a run time of the module, see criticalPath.moduleTimings
+                logger.info('Module {} restored from the run cache in {:.2f} seconds'.format(name, seconds))
+            else:
+                logger.info('Module {} finished in {:.2f} seconds'.format(name, seconds))
+            result['finished'].append(name)
+            for m in dag.successors(name):
+                waiting[m].discard(name)
+            return
+
+        print('Unable to load module: {}->{}\n{}'.format(name, entries[name]['path'], str(error)))
+        logger.error('Module {} failed: {}'.format(name, error))
+        result['failed'].append(name)
+        downstream = nx.descendants(dag, name)
+        for m in order:
+            if m in downstream and m in waiting:
+                logger.warning('Module {} is cancelled, since {} failed'.format(m, name))
+                del waiting[m]
+                result['cancelled'].append(m)
+        return
+
+    if workers == 1:
+        for name in nx.lexicographical_topological_sort(dag, key=order.index):
+            if name not in waiting:
+                continue
+            del waiting[name]
+            logger.info('Module {} is being executed'.format( name ))
+            try:
+                finished(name, runModule(name, entries[name]['path'], resultsDict))
+            except Exception as e:
+                finished(name, error=e)
+        runCache.evict()
+        return result
+
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while waiting or running:
+            free = workers - sum(cpus[m] for m in running.values())
+            for name in [m for m in order if m in waiting and not waiting[m]]:
+                if cpus[name] > free:
+                    continue
+                del waiting[name]
+                logger.info('Module {} is being executed'.format( name ))
+                running[pool.submit(runModule, name, entries[name]['path'], resultsDict)] = name
+                free -= cpus[name]
+
+            if not running: # cannot happen unless the bookkeeping above is wrong
+                logger.error('Modules {} never became ready'.format(list(waiting)))
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finished(name, future.result())
+                except Exception as e:
+                    finished(name, error=e)
+
+    runCache.evict()
+    return result
@@ -0,0 +1,16 @@
+'''Import time of the command line
+
+``python3 reportWriterDemo.py --help`` should start instantly. Libraries
+and modules therefore import heavy packages (pandas, numpy, matplotlib,
+networkx, sklearn, pylatex, psycopg2, logstash, ...) in the functions
+that use them, rather than at the top of the file, and read the config
+files with ``lib.configLib.configLib.loadConfig``.
+
+``startupTime`` runs the command line with ``python3 -X importtime``,
+reports the imports that take the longest, and fails when starting up
+takes longer than a budget, or imports one of the heavy packages. Run it
+from the ``src`` folder with::
+
+    make startupTime
+
+'''
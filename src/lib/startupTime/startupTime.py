@@ -0,0 +1,116 @@
+'''Import time benchmark of the command line
+
+Run from the ``src`` folder with::
+
+    python3 -m lib.startupTime.startupTime --budget 0.25 --runs 5
+
+Every command of ``COMMANDS``, the command line and the imports of the
+scheduler and of the report writer, is run (runs) times with
+``-X importtime``, and the median time of every import is reported. The
+exit status is 1 when the total import time of a command is over
+(budget) seconds, or when it imports one of ``HEAVY``.
+'''
+import sys, subprocess
+import argparse, statistics
+
+COMMAND  = ['reportWriterDemo.py', '--help']
+COMMANDS = [COMMAND,
+            ['-c', 'import lib.resultGraph.scheduler'],
+            ['-c', 'import lib.LaTeXreport.reportWriter']]
+HEAVY   = ['pandas', 'numpy', 'matplotlib', 'networkx', 'sklearn',
+           'pylatex', 'psycopg2', 'logstash', 'jsonref', 'celery']
+
+def parseImportTimes(text):
+    '''parse the output of ``python -X importtime``
+
+    Parameters
+    ----------
+    text : {str}
+        what the interpreter wrote to stderr
+
+    Returns
+    -------
+    list
+        a ``(name, self, cumulative, depth)`` tuple for every import, in
+        the order they finished, with the times in seconds. Imports at
+        depth 0 are the ones made by the command itself.
+    '''
+
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # the header
+        name = parts[2][1:]
+        imports.append((name.strip(), int(parts[0]) / 1e6, int(parts[1]) / 1e6,
+                        (len(name) - len(name.lstrip(' '))) // 2))
+
+    return imports
+
+def measure(command=COMMAND, runs=5):
+    '''the median import times of (command), over (runs) runs
+
+    Returns
+    -------
+    tuple
+        the median total import time in seconds, a dict of the median
+        ``(self, cumulative)`` time of every module, and the set of the
+        modules that were imported
+    '''
+
+    totals, times = [], {}
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] + list(command),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        imports = parseImportTimes(proc.stderr)
+        totals.append(sum(c for _, _, c, depth in imports if depth == 0))
+        for name, s, c, _ in imports:
+            times.setdefault(name, []).append((s, c))
+
+    medians = {name: (statistics.median(s for s, _ in t), statistics.median(c for _, c in t))
+               for name, t in times.items()}
+
+    return statistics.median(totals), medians, set(times)
+
+def heavyImports(modules):
+    '''the packages of ``HEAVY`` among the imported (modules)'''
+
+    return sorted({m.split('.')[0] for m in modules} & set(HEAVY))
+
+def report(total, medians, top=10):
+    '''print the total import time, and the (top) imports by their own
+    time and by their time including what they import'''
+
+    print('Total import time: {:.1f} ms'.format(total * 1e3))
+    for title, col in [('self', 0), ('cumulative', 1)]:
+        print('\nSlowest imports ({}):'.format(title))
+        for name, t in sorted(medians.items(), key=lambda x: -x[1][col])[:top]:
+            print('  {:8.1f} ms  {}'.format(t[col] * 1e3, name))
+
+    return
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='import time of the command line')
+    parser.add_argument('--budget', type=float, default=0.25, help='maximum total import time in seconds')
+    parser.add_argument('--runs',   type=int,   default=5,    help='number of runs to take the median of')
+    parser.add_argument('--top',    type=int,   default=10,   help='number of slowest imports to show')
+    args = parser.parse_args()
+
+    failed = False
+    for command in COMMANDS:
+        print('\n# python3 {}\n'.format(' '.join(command)))
+        total, medians, modules = measure(command, args.runs)
+        report(total, medians, args.top)
+
+        if total > args.budget:
+            print('\nThe imports take {:.1f} ms, over the budget of {:.1f} ms'.format(total * 1e3, args.budget * 1e3))
+            failed = True
+        heavy = heavyImports(modules)
+        if heavy != []:
+            print('\n{} imports {}. Import them in the functions that use them.'.format(' '.join(command), ', '.join(heavy)))
+            failed = True
+
+    sys.exit(1 if failed else 0)
@@ -1,7 +1,7 @@
 from logs import logDecorator as lD
-import jsonref
+from lib.configLib import configLib as cL
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.lib.testLib.simpleLib'
 
 @lD.log(logBase + '.simpleTestFunction')
@@ -1,8 +1,9 @@
 from logs       import logDecorator as lD
+from lib.configLib import configLib as cL
 from importlib  import util
-import jsonref, os
+import os
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.lib.versionedLib.versionedLib'
 
 def getLib(version, libName):
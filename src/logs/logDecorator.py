@@ -2,7 +2,6 @@ from datetime import datetime as dt
 from time import time
 import json, logging, sys
 from functools import wraps
-import logstash
 
 class log(object):
     '''decorator for logging values
@@ -121,6 +120,8 @@ class logInit(object):
             # Generate a file handler if necessary
             if ('logstash' in self.specs) and self.specs['logstash']['todo']:
 
+                import logstash # only needed when logs are sent to logstash
+
                 tags = [ 'reportWriterDemo' , now]
 
                 if 'tags' in self.specs['logstash']:
@@ -1,8 +1,9 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+from lib.configLib import configLib as cL
+import pprint
 from lib.celeryWorkerExample import worker_1
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.modules.celeryCheck.celeryCheck'
 
 
@@ -1,20 +1,17 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+from lib.configLib import configLib as cL
+import pprint
 from lib.databaseIO import pgIO
-from lib.LaTeXreport import reportWriter as rw
 
 import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets, linear_model
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
 import pickle
 
-config = jsonref.load(open('../config/config.json'))
+# pandas, numpy, matplotlib and sklearn are imported in the functions
+# that use them, so that importing this module is fast
+
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.modules.module1.module1'
-projConfig = jsonref.load(open('../config/modules/module1.json'))
+projConfig = cL.loadConfig('../config/modules/module1.json')
 
 @lD.log(logBase + '.getData')
 def getData(logger):
@@ -30,6 +27,12 @@ def getData(logger):
     cohortWindow = [0, 1000]
     daysWindow = [0, 365]
 
+    import pandas as pd
+    import numpy as np
+    from sklearn import datasets, linear_model
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_squared_error, r2_score
+
     diabetes = datasets.load_diabetes()
     diabetes_df = pd.DataFrame(diabetes.data, columns=diabetes.feature_names)
     descript = pd.DataFrame(diabetes.data, columns=diabetes.feature_names).describe()
@@ -46,14 +49,12 @@ def getData(logger):
     regr.fit(diabetes_X_train, diabetes_y_train)
     diabetes_y_pred = regr.predict(diabetes_X_test)
 
-    # Plot outputs
-    plt.scatter(diabetes_X_test, diabetes_y_test,  color='black')
-    plt.plot(diabetes_X_test, diabetes_y_pred, color='blue', linewidth=3)
-    plt.savefig('../data/raw_data/fig1.png')
-
-    plt.clf()
-    plt.hist(diabetes_df.age)
-    plt.savefig('../data/raw_data/fig2.png')
+    # Data for the plots. The plotting itself is left to the report,
+    # so that it is skipped when the data has not changed.
+    regression = pd.DataFrame({
+        'x'     : diabetes_X_test[:, 0],
+        'y'     : diabetes_y_test,
+        'yPred' : diabetes_y_pred})
 
     print('Coefficients: \n', regr.coef_)
     print("Mean squared error: %.2f"
@@ -78,48 +79,84 @@ def getData(logger):
         with open(f'../data/raw_data/tbls{x}.pkl', 'wb') as f:
             pickle.dump(dfx, f)
 
-    return [descript, results, [df1,df2,df3]]
+    return [descript, results, [df1,df2,df3], regression, diabetes_df.age]
+
+@lD.log(logBase + '.plotRegression')
+def plotRegression(logger, data):
+    '''scatter plot of the test data with the fitted regression line
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    data : {pandas.DataFrame}
+        Dataframe with the columns ``x``, ``y`` and ``yPred``
+    '''
+    import matplotlib.pyplot as plt
+    plt.scatter(data.x, data.y,  color='black')
+    plt.plot(data.x, data.yPred, color='blue', linewidth=3)
+    return
+
+@lD.log(logBase + '.plotHistogram')
+def plotHistogram(logger, data):
+    '''histogram of a single series
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    data : {pandas.Series}
+        values to be binned
+    '''
+    import matplotlib.pyplot as plt
+    plt.hist(data)
+    return
 
 @lD.log(logBase + '.runExample')
 def runExample(logger, projName='Demo'):
 
     examples = getData()
 
+    from lib.LaTeXreport import reportWriter as rw
+
     rep = rw.Report(projName) 
     rep.title = "Report Example"
     rep.author = "Insert Author Name here"
     rep.date = '25/09/2019'
     rep.initialize(rep.fpath)
+    rep.renderCache = rw.RenderCache()
 
     ### Add figures ###
-    # 1. by copying from other filepath 
-    rep.saveFigure('Figure1', 
-                '../data/raw_data/fig1.png', # some other filepath
+    # Plotted by the report, and only when the data has changed
+    rep.plotFigure('Figure1', 
+                plotRegression, examples[3],
                 caption='This is a plot of the linear reg output.', 
                 option='scale=0.6', override=True)
 
-    # 2. by saving or moving directly to figures folder if it's already created
-    rep.saveFigure('Figure2', 
-                '../data/raw_data/fig2.png', # some other filepath
+    rep.plotFigure('Figure2', 
+                plotHistogram, examples[4],
                 caption='This is a histogram of the patients\' age.',
                 option=r'width=0.5\textwidth')
 
     ### Add tables ###
-    # 1. Add directly from pandas dataframe 
-    rep.saveTable('Table1', 
-                examples[0], 
-                caption='Descriptive table of diabetes data.', 
-                override=False)
-
-    rep.saveTable('Table2', 
-                examples[1], 
-                caption='Results of the Logisitic Regression', 
-                override=True)
-
-    rep.saveTable('Table3', 
-                examples[2], # [df1,df2,df3]
-                caption='Merged dataframes example.', 
-                override=True)
+    # 1. Declared from the extracts pickled by getData. makeReport only
+    # rebuilds the tables whose extracts have changed.
+    rep.artifacts.addData('descript', pickle='../data/raw_data/descriptive_table.pkl')
+    rep.artifacts.addData('results', pickle='../data/raw_data/results.pkl')
+    for x in range(3):
+        rep.artifacts.addData(f'tbls{x}', pickle=f'../data/raw_data/tbls{x}.pkl')
+
+    rep.artifacts.addTable('Table1', 
+                inputs=['descript'], 
+                caption='Descriptive table of diabetes data.')
+
+    rep.artifacts.addTable('Table2', 
+                inputs=['results'], 
+                caption='Results of the Logisitic Regression')
+
+    rep.artifacts.addTable('Table3', 
+                inputs=['tbls0', 'tbls1', 'tbls2'], # concatenated columnwise
+                caption='Merged dataframes example.')
 
     # 2. Add tex files directly to tables folder 
     # (No need to run saveTable since it's already in TeX)
@@ -131,6 +168,7 @@ def runExample(logger, projName='Demo'):
     rep.addSection('Conclusion')
 
     rep.makeReport()
+    rep.renderCache.report()
     return 
 
 
@@ -1,10 +1,11 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+from lib.configLib import configLib as cL
+import pprint
 
-config = jsonref.load(open('../config/config.json'))
+config = cL.loadConfig()
 logBase = config['logging']['logBase'] + '.modules.versionedModule.versionedModule'
 
-configM = jsonref.load(open('../config/modules/versionedModule.json'))['params']
+configM = cL.loadConfig('../config/modules/versionedModule.json')['params']
 
 from lib.versionedLib import versionedLib
 
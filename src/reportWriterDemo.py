@@ -1,11 +1,11 @@
-import jsonref, argparse
+import argparse
 
-from importlib      import util
 from logs           import logDecorator  as lD
+from lib.configLib  import configLib     as cL
 from lib.testLib    import simpleLib     as sL
 from lib.argParsers import addAllParsers as aP
 
-config   = jsonref.load(open('../config/config.json'))
+config   = cL.loadConfig()
 logBase  = config['logging']['logBase']
 logLevel = config['logging']['level']
 logSpecs = config['logging']['specs']
@@ -24,7 +24,7 @@ def importModules(logger, resultsDict):
     logger : {logging.Logger}
         logger module for logging information
     '''
-    modules = jsonref.load(open('../config/modules.json'))
+    modules = cL.loadConfig('../config/modules.json')
 
     # update modules in the right order. Also get rid of the frivilous
     # modules
@@ -36,6 +36,7 @@ def importModules(logger, resultsDict):
 
         modules = tempModules
 
+    toRun = []
     for m in modules:
 
         if (resultsDict['modules'] is None):
@@ -63,17 +64,12 @@ def importModules(logger, resultsDict):
                 continue
 
                 
-        try:
-            name, path = m['moduleName'], m['path']
-            logger.info('Module {} is being executed'.format( name ))
-
-            module_spec = util.spec_from_file_location(
-                name, path)
-            module = util.module_from_spec(module_spec)
-            module_spec.loader.exec_module(module)
-            module.main(resultsDict)
-        except Exception as e:
-            print('Unable to load module: {}->{}\n{}'.format(name, path, str(e)))
+        toRun.append(m)
+
+    # modules that do not depend on each other run at the same time. This
+    # is imported here so that the command line starts up quickly
+    from lib.resultGraph import scheduler
+    scheduler.runModules(toRun, resultsDict, workers=resultsDict.get('workers'))
 
     return
 
@@ -97,7 +93,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='reportWriterDemo command line arguments')
     
     # Add the modules here
-    modules = jsonref.load(open('../config/modules.json'))
+    modules = cL.loadConfig('../config/modules.json')
     modules = [m['moduleName'] for m in modules]
     parser.add_argument('-m', '--module', action='append',
         type = str,
@@ -105,6 +101,17 @@ if __name__ == '__main__':
         help = '''Add modules to run over here. Multiple modules can be run
         simply by adding multiple strings over here. Make sure that the 
         available choices are reflected in the choices section''')
+    parser.add_argument('-w', '--workers',
+        type = int, default = 1,
+        help = '''Number of modules to run at the same time. Modules that
+        use the declared outputs of other modules wait for them to finish,
+        but nothing else keeps them in order, so only use more than 1 when
+        every module declares its inputs and outputs. Defaults to 1, which
+        runs the modules one after another in the listed order''')
+    parser.add_argument('--force', action='store_true',
+        help = '''Run every module, even those whose outputs are in the run
+        cache because nothing they depend on has changed. Use it when a
+        module reads something that its config does not declare''')
 
     parser = aP.parsersAdd(parser)
     results = parser.parse_args()
@@ -114,6 +121,8 @@ if __name__ == '__main__':
         resultsDict['modules'] = results.module
     else:
         resultsDict['modules'] = None
+    resultsDict['workers'] = results.workers
+    resultsDict['force']   = results.force
         
 
     # ---------------------------------------------------
@@ -0,0 +1,49 @@
+from lib.LaTeXreport import reportWriter as rw
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+
+def test_artifactGraph(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.renderCache = rw.RenderCache(str(tmp_path / 'cache'))
+    pkl = str(tmp_path / 'raw.pkl')
+    pd.DataFrame({'s1': [1.0, 2.0], 's3': [3.0, 4.0]}).to_pickle(pkl)
+
+    graph = rep.artifacts
+    graph.addData('raw', pickle=pkl)
+    graph.addData('s1', inputs=['raw'], func=lambda raw: raw.s1)
+    graph.addData('s3', inputs=['raw'], func=lambda raw: raw.s3)
+    graph.addTable('Table3', inputs=['s1', 's3'], caption='Merged')
+    graph.addFigure('Figure1', lambda data: plt.plot(data), inputs=['s1'])
+
+    assert sorted(graph.build()['built']) == ['Figure1', 'Table3', 'raw', 's1', 's3']
+    assert graph.build()['built'] == []
+
+    # a changed function rebuilds only what is downstream of it
+    graph.addData('s3', inputs=['raw'], func=lambda raw: raw.s3 * 2)
+    assert sorted(graph.build()['built']) == ['Table3', 's3']
+    assert rep.manifest.builds()['raw']['source'] == f'pickle: {pkl}'
+
+    graph.addData('s1', inputs=['Table3'], func=lambda t: t)
+    with pytest.raises(ValueError):
+        graph.build()
+    return
+
+def test_artifactGraph_redefine(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    pkl = str(tmp_path / 'raw.pkl')
+    pd.DataFrame({'a': [1.0, 2.0]}).to_pickle(pkl)
+
+    reads = []
+    readPickle = pd.read_pickle
+    monkeypatch.setattr(pd, 'read_pickle', lambda path: reads.append(path) or readPickle(path))
+
+    graph = rep.artifacts
+    graph.addData('raw', pickle=pkl)
+    graph.addTable('Table1', inputs=['typo'])
+    graph.addTable('Table1', inputs=['raw']) # the placeholder 'typo' goes away
+    assert graph.build()['built'] == ['raw', 'Table1']
+    assert len(reads) == 1 # the pickle is hashed, not loaded, to compute its key
+    return
@@ -0,0 +1,123 @@
+from lib.LaTeXreport.assetStore import AssetStore
+import os
+
+def test_assetStore_dedup(tmp_path):
+    src = tmp_path / 'fig.png'
+    src.write_bytes(b'not really a png')
+    store = AssetStore(root=str(tmp_path / 'store'))
+
+    dest1 = str(tmp_path / 'rep1.png')
+    dest2 = str(tmp_path / 'rep2.png')
+    store.place(str(src), dest1)
+    store.place(str(src), dest2)
+
+    assert os.path.samefile(dest1, dest2)
+    assert open(dest1, 'rb').read() == b'not really a png'
+    objects = [f for _, _, fs in os.walk(str(tmp_path / 'store')) for f in fs]
+    assert len(objects) == 1
+    return
+
+def test_assetStore_downscale(tmp_path):
+    from PIL import Image
+    src = str(tmp_path / 'big.png')
+    Image.new('RGB', (2000, 1000)).save(src)
+    store = AssetStore(root=str(tmp_path / 'store'), dpi=100, printWidth=5)
+
+    dest = str(tmp_path / 'small.png')
+    store.place(src, dest)
+    with Image.open(dest) as img:
+        assert img.size == (500, 250)
+    return
+
+def test_saveFigure_svg(tmp_path, monkeypatch):
+    from lib.LaTeXreport import reportWriter as rw
+    conversions = []
+    def toPdf(self, fpath, outPath):
+        conversions.append(fpath)
+        open(outPath, 'wb').write(b'%PDF-1.4')
+    monkeypatch.setattr(AssetStore, 'toPdf', toPdf)
+
+    src = tmp_path / 'chart.svg'
+    src.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.saveFigure('Chart', str(src), caption='A chart')
+    rep.saveFigure('Chart', str(src), caption='A chart', override=True)
+
+    assert len(conversions) == 1 # converted once, then reused
+    assert open(os.path.join(rep.fpath, 'figures', 'Chart.pdf'), 'rb').read() == b'%PDF-1.4'
+    assert 'Chart.pdf' in rep.figures
+    rep.makeReport(tex_only=True)
+    tex = open(os.path.join(rep.outputPath, 'Test.tex')).read()
+    assert '../figures/Chart.pdf' in tex and '{svg}' not in tex
+    return
+
+def test_assetStore_prune(tmp_path):
+    src = tmp_path / 'fig.png'
+    src.write_bytes(b'figure')
+    copies = AssetStore(root=str(tmp_path / 'copies'), linkMode='copy')
+    copies.place(str(src), str(tmp_path / 'copy.png'))
+    assert copies.prune() == 0 # copies cannot be tracked, so they are kept
+
+    store = AssetStore(root=str(tmp_path / 'store'))
+    dest = str(tmp_path / 'linked.png')
+    store.place(str(src), dest)
+    assert store.prune() == 0
+    os.remove(dest)
+    assert store.prune() == 1
+    return
+
+def test_assetStore_rasterFormats(tmp_path):
+    from PIL import Image
+    from lib.LaTeXreport import reportWriter as rw
+    jpg, tif = str(tmp_path / 'photo.jpg'), str(tmp_path / 'scan.tiff')
+    Image.new('RGB', (2000, 1000)).save(jpg)
+    Image.new('RGB', (2000, 1000)).save(tif)
+
+    store = AssetStore(root=str(tmp_path / 'store'), dpi=100, printWidth=5)
+    store.place(jpg, str(tmp_path / 'small.jpg'))
+    store.place(tif, str(tmp_path / 'small.png'))
+    with Image.open(str(tmp_path / 'small.jpg')) as img:
+        assert (img.format, img.size) == ('JPEG', (500, 250))
+    with Image.open(str(tmp_path / 'small.png')) as img:
+        assert (img.format, img.size) == ('PNG', (500, 250))
+
+    # without a figureDpi, the report keeps the images at full size
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.saveFigure('Photo', jpg)
+    rep.saveFigure('Scan', tif)
+    assert open(os.path.join(rep.fpath, 'figures', 'Photo.jpg'), 'rb').read() == open(jpg, 'rb').read()
+    with Image.open(os.path.join(rep.fpath, 'figures', 'Scan.png')) as img:
+        assert img.size == (2000, 1000)
+    return
+
+def test_assetStore_pruneAfterFallback(tmp_path, monkeypatch):
+    src = tmp_path / 'fig.png'
+    src.write_bytes(b'figure')
+    store = AssetStore(root=str(tmp_path / 'store'))
+    objPath = store.add(str(src))
+    open(objPath + '.1.2.tmp', 'w').write('') # another writer
+
+    def noLink(*args):
+        raise OSError('cross-device link')
+    monkeypatch.setattr(os, 'link', noLink)
+    dest = str(tmp_path / 'linked.png')
+    store.link(objPath, dest) # falls back to a symlink
+    assert os.path.islink(dest)
+
+    assert store.prune() == 0
+    assert open(dest, 'rb').read() == b'figure' and os.path.exists(objPath + '.1.2.tmp')
+    return
+
+def test_saveFigure_plainCopy(tmp_path):
+    from lib.LaTeXreport import reportWriter as rw
+    src = tmp_path / 'chart.png'
+    src.write_bytes(b'png')
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.saveFigure('Chart', str(src), caption='A chart')
+
+    assert open(os.path.join(rep.fpath, 'figures', 'Chart.png'), 'rb').read() == b'png'
+    assert not os.path.exists(os.path.join(rep.fpath, '.figureCache'))
+    return
@@ -0,0 +1,42 @@
+from lib.LaTeXreport import reportWriter as rw
+import os
+
+def test_buildDir(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Introduction')
+    rep.buildDir = str(tmp_path / 'ram')
+
+    def fakeCompile(filepath, **kwargs):
+        # the sections are reachable from the build folder, as from the output folder
+        assert os.path.exists(os.path.join(os.path.dirname(filepath), '../sections/Introduction.tex'))
+        for ext in ['.aux', '.log', '.pdf']:
+            open(filepath + ext, 'w').write('%PDF' if ext == '.pdf' else '')
+        return 1
+    monkeypatch.setattr(rep, 'compileTex', fakeCompile)
+    rep.makeReport()
+
+    assert sorted(f for f in os.listdir(rep.outputPath) if f.startswith('Test.')) == [
+        'Test.pdf', 'Test.tex']
+    buildDir = rep.prepareBuildDir()
+    assert buildDir.startswith(rep.buildDir) and os.path.exists(os.path.join(buildDir, 'Test.aux'))
+    return
+
+def test_defaultBuildDir(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Introduction')
+
+    def fakeCompile(filepath, **kwargs):
+        # the compiler never writes into the output folder
+        assert os.path.dirname(os.path.abspath(filepath)) != os.path.abspath(rep.outputPath)
+        for ext in ['.aux', '.log', '.pdf']:
+            open(filepath + ext, 'w').write('%PDF' if ext == '.pdf' else '')
+        return 1
+    monkeypatch.setattr(rep, 'compileTex', fakeCompile)
+    rep.makeReport()
+
+    assert sorted(f for f in os.listdir(rep.outputPath) if f.startswith('Test.')) == [
+        'Test.pdf', 'Test.tex']
+    assert rep.prepareBuildDir().startswith(os.path.join(rep.fpath, '.build'))
+    return
@@ -0,0 +1,50 @@
+from lib.LaTeXreport.buildProfile import BuildProfile
+import json, os
+
+def test_buildProfile_saveAndCompare(tmp_path):
+    fpath = str(tmp_path / 'Test.profile.json')
+
+    first = BuildProfile()
+    with first.stage('tables'):
+        data = [0] * 10000
+    first.count('images', 3)
+    assert first.save(fpath) is None
+
+    second = BuildProfile(memory=False)
+    with second.stage('tables'):
+        pass
+    second.count('images', 4)
+    previous = second.save(fpath)
+
+    assert previous['counts'] == {'images': 3}
+    assert previous['stages'][0]['peakMB'] > 0
+    assert os.path.exists(str(tmp_path / 'Test.profile.prev.json'))
+    assert json.load(open(fpath))['counts'] == {'images': 4}
+    assert second.compare(previous)['images'] == (3, 4)
+    return
+
+def test_buildProfile_disabled(tmp_path):
+    prof = BuildProfile(enabled=False)
+    with prof.stage('tables'):
+        prof.count('images')
+    assert prof.stages == [] and prof.counts == {}
+    assert prof.save(str(tmp_path / 'x.json')) is None
+    assert not os.path.exists(str(tmp_path / 'x.json'))
+    return
+
+def test_buildProfile_outerTracing():
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        data = [0] * 100000
+        del data
+        outerPeak = tracemalloc.get_traced_memory()[1]
+        prof = BuildProfile()
+        with prof.stage('tables'):
+            pass
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= outerPeak # not reset by the stage
+        assert prof.stages[0]['peakMB'] * 2**20 < outerPeak
+    finally:
+        tracemalloc.stop()
+    return
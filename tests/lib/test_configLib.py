@@ -0,0 +1,21 @@
+from lib.configLib import configLib as cL
+import json, os
+
+def test_loadConfig(tmp_path, monkeypatch):
+    path = str(tmp_path / 'a.json')
+    json.dump({'a': {'b': 1}, 'c': {'$ref': '#/a'}}, open(path, 'w'))
+    config = cL.loadConfig(path)
+    assert config['c']['b'] == 1
+
+    # later reads are served from the cache, and return copies
+    config['a']['b'] = 2
+    monkeypatch.setattr(cL.json, 'loads', None)
+    assert cL.loadConfig(path)['a']['b'] == 1
+
+    # a changed file is read again
+    json.dump({'a': 3}, open(path, 'w'))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    monkeypatch.undo()
+    assert cL.loadConfig(path) == {'a': 3}
+    return
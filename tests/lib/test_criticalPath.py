@@ -0,0 +1,29 @@
+from lib.resultGraph import criticalPath as cP
+import networkx as nx
+import os
+
+def test_criticalPath(tmp_path):
+    base = cP.config['logging']['logBase']
+    with open(os.path.join(str(tmp_path), '2026-01-01_00-00-00.log'), 'w') as f:
+        f.write('2026-01-01 00:00:01 - {}.modules.a.a.main - INFO - Finished the function [main] in 9.0e+00 seconds\n'.format(base))
+    with open(os.path.join(str(tmp_path), '2026-01-02_00-00-00.log'), 'w') as f:
+        for name, seconds in [('a', 5), ('b', 2), ('c', 1), ('d', 4)]:
+            f.write('2026-01-02 00:00:01 - {}.lib.resultGraph.scheduler.runModules - INFO - '
+                    'Module {} finished in {:.2f} seconds\n'.format(base, name, seconds))
+    with open(os.path.join(str(tmp_path), '2026-01-03_00-00-00.log'), 'w') as f:
+        f.write('2026-01-03 00:00:01 - {}.lib.resultGraph.scheduler.runModules - INFO - '
+                'Module a restored from the run cache in 0.01 seconds\n'.format(base))
+    durations = cP.moduleTimings(str(tmp_path))
+    assert durations == {'a': 7.0, 'b': 2.0, 'c': 1.0, 'd': 4.0}
+
+    # a -> b -> d and c -> d
+    dag = nx.DiGraph([('a', 'b'), ('b', 'd'), ('c', 'd')])
+    table = cP.schedule(dag, durations)
+    assert table.at['d', 'earliestStart'] == 9.0 and table['earliestFinish'].max() == 13.0
+    assert table.at['c', 'slack'] == 8.0 and not table.at['c', 'critical']
+    assert cP.criticalPath(dag, durations) == ['a', 'b', 'd']
+
+    assert cP.estimateSpeedup(dag, durations, 'c') == 1.0
+    assert cP.estimateSpeedup(dag, durations, 'a') == 13.0 / 6.0
+    assert cP.estimateSpeedup(dag, durations, 'a', factor=0.5) == 13.0 / 9.5
+    return
@@ -0,0 +1,165 @@
+from lib.resultGraph import graphLib
+import json, os
+
+def writeConfig(folder, name, inputs={}, outputs={}):
+    with open(os.path.join(folder, name + '.json'), 'w') as f:
+        json.dump({'inputs': inputs, 'outputs': outputs, 'params': {}}, f)
+    return
+
+def test_generateGraph_incremental(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    csv = {'type': 'file-csv', 'location': '../data/a.csv'}
+    writeConfig(folder, 'moduleA', outputs={'a': csv})
+    writeConfig(folder, 'moduleB', inputs={'a': csv}, outputs={'b': {'type': 'file-png', 'location': 'b.png'}})
+
+    parsed = []
+    readModuleConfig = graphLib.readModuleConfig
+    monkeypatch.setattr(graphLib, 'readModuleConfig', lambda text: parsed.append(text) or readModuleConfig(text))
+
+    graph = graphLib.generateGraph(folder)
+    assert set(graph.edges) == {('moduleA', 'a'), ('a', 'moduleB'), ('moduleB', 'b')}
+    assert graph.nodes['a']['type'] == 'file-csv' and graph.nodes['b']['type'] == 'file-png'
+    assert len(parsed) == 2
+
+    # nothing changed: nothing is parsed, also from a fresh process
+    graphLib.graphCaches.clear()
+    assert set(graphLib.generateGraph(folder).edges) == set(graph.edges)
+    assert len(parsed) == 2
+
+    # only the changed file is parsed again, and its nodes and edges replaced
+    writeConfig(folder, 'moduleB', inputs={'a': csv}, outputs={'c': {'type': 'file-csv', 'location': 'c.csv'}})
+    graph = graphLib.generateGraph(folder)
+    assert len(parsed) == 3
+    assert set(graph.edges) == {('moduleA', 'a'), ('a', 'moduleB'), ('moduleB', 'c')}
+    assert 'b' not in graph
+
+    os.remove(os.path.join(folder, 'moduleA.json'))
+    graph = graphLib.generateGraph(folder)
+    assert set(graph.nodes) == {'a', 'moduleB', 'c'} and len(parsed) == 3
+    return
+
+def test_reachabilityIndex():
+    import networkx as nx, random
+    random.seed(0)
+    graph = nx.gnp_random_graph(150, 0.03, seed=1, directed=True) # has cycles
+    graph = nx.relabel_nodes(graph, {n: 'n{}'.format(n) for n in graph})
+    nx.set_node_attributes(graph, 'module', 'type')
+    index = graphLib.generateIndex(graph)
+
+    for n in random.sample(list(graph), 20):
+        assert index.ancestors(n) == nx.ancestors(graph, n)
+        assert index.descendants(n) == nx.descendants(graph, n)
+    a, b = 'n3', 'n40'
+    assert index.isAncestor(a, b) == (a in nx.ancestors(graph, b))
+
+    keys = ['n5', 'n60', 'n120']
+    sub = graphLib.generateSubGraph(graph, keys, index=index)
+    expected = graphLib.generateSubGraph(graph, keys)
+    assert set(sub.nodes) == set(expected.nodes) and set(sub.edges) == set(expected.edges)
+    assert sub.nodes['n5']['type'] == 'module'
+    assert index.downstream(['n5']) == nx.descendants(graph, 'n5') | {'n5'}
+    return
+
+def test_uploadGraph_diff(monkeypatch):
+    import networkx as nx
+    old = nx.DiGraph()
+    old.add_node('a', type='file-csv', summary='{}')
+    old.add_node('m', type='module', summary='')
+    old.add_node('b', type='file-png', summary='{}')
+    old.add_edges_from([('a', 'm'), ('m', 'b')])
+    new = old.copy()
+    new.remove_node('b')
+    new.add_node('c', type='file-csv', summary='{}')
+    new.add_edge('m', 'c')
+    new.nodes['a']['summary'] = '{"location": "a.csv"}'
+
+    shuffled = nx.DiGraph()
+    shuffled.add_nodes_from(reversed(list(old.nodes(data=True))))
+    shuffled.add_edges_from(reversed(list(old.edges)))
+    assert graphLib.structureHash(old) == graphLib.structureHash(shuffled)
+    assert graphLib.structureHash(old) != graphLib.structureHash(new)
+
+    written = []
+    monkeypatch.setattr(graphLib, 'latestVersion', lambda *args, **kwargs: (3, graphLib.structureHash(old)))
+    assert graphLib.uploadGraph(old) == 3 # unchanged: nothing written
+
+    monkeypatch.setattr(graphLib, 'latestVersion', lambda *args, **kwargs: (3, 'previous'))
+    monkeypatch.setattr(graphLib, 'downloadGraph', lambda *args, **kwargs: old)
+    monkeypatch.setattr(graphLib.pgIO, 'copyDataList', lambda copies, queries, dbName=None: written.append((copies, queries)) or True)
+    assert graphLib.uploadGraph(new) == 4
+
+    copies, queries = written[0]
+    nodes, edges = copies[0][2], copies[1][2]
+    assert sorted(row[2] for row in nodes) == ['a', 'c'] and all(row[-1] == 4 for row in nodes)
+    assert [row[2:4] for row in edges] == [['m', 'c']]
+    assert queries[1][1] == (4, graphLib.config['logging']['logBase'], ['a', 'b'])
+    return
+
+def test_downloadGraphs(monkeypatch):
+    rows = [('version', None, None, None, 1, None), ('version', None, None, None, 2, None),
+            ('node', 'a', 'file-csv', '{}', 1, None), ('node', 'm', 'module', '', 1, None),
+            ('node', 'b', 'file-png', '{}', 1, 2), ('node', 'c', 'file-csv', '{}', 2, None),
+            ('edge', 'a', 'm', None, 1, None), ('edge', 'm', 'b', None, 1, 2), ('edge', 'm', 'c', None, 2, None)]
+    queries = []
+    monkeypatch.setattr(graphLib.pgIO, 'getAllData', lambda query, values, dbName=None: queries.append(values) or rows)
+    graphLib.versionCache.clear()
+
+    graphs = graphLib.downloadGraphs([1, 2], programName='test')
+    assert set(graphs[1].edges) == {('a', 'm'), ('m', 'b')}
+    assert set(graphs[2].edges) == {('a', 'm'), ('m', 'c')}
+    assert graphs[2].nodes['c'] == {'type': 'file-csv', 'summary': '{}'}
+    assert len(queries) == 1 and queries[0]['versions'] == [1, 2]
+
+    # versions are cached, and only the missing ones are queried
+    assert graphLib.downloadGraph(2, programName='test') is graphs[2]
+    graphLib.downloadGraphs([1, 2, 3], programName='test')
+    assert len(queries) == 2 and queries[1]['versions'] == [3]
+    return
+
+def test_queryLineage(monkeypatch):
+    queries = []
+    rows = [('node', 'a', 'file-csv', '{}'), ('node', 'm', 'module', ''), ('edge', 'a', 'm', None)]
+    monkeypatch.setattr(graphLib.pgIO, 'getAllData', lambda query, values, dbName=None: queries.append((query, values)) or rows)
+
+    graph = graphLib.queryLineage('m', version=3, programName='test')
+    assert set(graph.edges) == {('a', 'm')} and graph.nodes['a']['type'] == 'file-csv'
+    query, values = queries[0]
+    assert 'with recursive' in query and 'e.node_from from graphs.edges e join lineage l on e.node_to' in query
+    assert values == {'prog': 'test', 'version': 3, 'nodes': ['m']}
+
+    graphLib.queryLineage(['a', 'b'], direction='descendants', version=3, programName='test')
+    assert 'e.node_to from graphs.edges e join lineage l on e.node_from' in queries[1][0]
+    assert graphLib.queryLineage('m', direction='sideways', version=3) is None
+    return
+
+def test_plotGraph_cached(tmp_path, monkeypatch):
+    import networkx as nx
+    graph = nx.DiGraph([('a', 'm1'), ('m1', 'b'), ('b', 'm2'), ('m1', 'c'), ('c', 'm2')])
+    nx.set_node_attributes(graph, {n: {'type': 'module' if n.startswith('m') else 'file-csv', 'summary': ''} for n in graph})
+    monkeypatch.setattr(graphLib, 'LAYOUT_CACHE', str(tmp_path / 'layouts'))
+
+    layouts = []
+    def layout(g, prog):
+        layouts.append(prog)
+        return {n: (i, i) for i, n in enumerate(g)}
+    from networkx.drawing import nx_pydot
+    monkeypatch.setattr(nx_pydot, 'graphviz_layout', layout)
+    for i in range(2):
+        graphLib.plotGraph(graph, str(tmp_path / 'graph{}.png'.format(i)))
+    assert layouts == ['dot'] and os.path.exists(tmp_path / 'graph1.png')
+
+    modules = graphLib.collapseGraph(graph)
+    assert list(modules.edges(data='weight')) == [('m1', 'm2', 2)]
+
+    # large graphs are rendered by Graphviz, once
+    renders = []
+    def run(cmd, input, check):
+        renders.append(input.decode())
+        open(cmd[-1], 'w').write('<svg/>')
+    monkeypatch.setattr(graphLib.subprocess, 'run', run)
+    monkeypatch.setattr(graphLib, 'MATPLOTLIB_NODES', 3)
+    for i in range(2):
+        graphLib.plotGraph(graph, str(tmp_path / 'graph{}.svg'.format(i)), collapse=False)
+    assert len(renders) == 1 and '"m1" -> "b";' in renders[0]
+    assert open(tmp_path / 'graph1.svg').read() == '<svg/>'
+    return
@@ -0,0 +1,35 @@
+from lib.LaTeXreport import reportWriter as rw
+import pandas as pd
+import os
+
+def test_makePreview(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.saveTable('Table1', pd.DataFrame({'value': [1.234, 2.0]}), caption='Some values')
+    rep.addSection('Introduction')
+    pd.DataFrame({0: ['a', 'b'], 1: ['x', 'y']}).to_csv(
+        os.path.join(rep.fpath, 'mappingTables', 'Codes.csv'), header=False, index=False)
+
+    page = open(rep.makePreview()).read()
+    assert '<h2>Introduction</h2>' in page
+    assert '1.23' in page and 'Some values' in page
+    assert 'Appendix - Mapping Tables' in page and '<td>x</td>' in page
+    return
+
+def test_makePreview_vectorFigures(tmp_path, monkeypatch):
+    from lib.LaTeXreport.assetStore import AssetStore
+    monkeypatch.setattr(AssetStore, 'toPdf', lambda self, fpath, outPath: open(outPath, 'wb').write(b'%PDF-1.4'))
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    svg = tmp_path / 'chart.svg'
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    pdf = tmp_path / 'plain.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    rep.saveFigure('Chart', str(svg), caption='From an SVG')
+    rep.saveFigure('Plain', str(pdf), caption='A PDF')
+
+    page = open(rep.makePreview()).read()
+    assert 'Image not shown' not in page
+    assert '<img src="data:image/svg+xml;base64,' in page
+    assert '<embed type="application/pdf" src="data:application/pdf;base64,' in page
+    return
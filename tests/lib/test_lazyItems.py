@@ -0,0 +1,36 @@
+from lib.LaTeXreport import reportWriter as rw
+import pandas as pd
+import os
+
+def test_lazyItems_onlyWhenIncluded(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.renderCache = rw.RenderCache(root=str(tmp_path / 'cache'))
+
+    calls = []
+    def getData(n):
+        calls.append(n)
+        return pd.DataFrame({'a': range(n)})
+
+    rep.addLazyTable('Used', func=getData, args=(2,))
+    rep.addLazyTable('Unused', func=getData, args=(3,))
+    rep.addSection('Introduction')
+    with open(rep.sections['Introduction']['fpath'], 'a') as f:
+        f.write(r'\input{../tables/Used.tex}')
+
+    rep.makeReport(sectionOnly=True, tex_only=True)
+    assert calls == [2]
+    assert os.path.exists(os.path.join(rep.fpath, 'tables', 'Used.tex'))
+    assert not os.path.exists(os.path.join(rep.fpath, 'tables', 'Unused.tex'))
+
+    # the data of Used is cached for later builds
+    rep.makeReport(tex_only=True)
+    assert sorted(calls) == [2, 3]
+    return
+
+def test_lazyItems_queriesNotCachedByDefault():
+    from lib.LaTeXreport.lazyItems import LazyItem
+    assert not LazyItem('Q', 'table', query='select 1').cache
+    assert LazyItem('Q', 'table', query='select 1', maxAge=3600).cache
+    assert LazyItem('F', 'table', func=list).cache
+    return
@@ -0,0 +1,58 @@
+from lib.LaTeXreport import reportWriter as rw
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import threading, time, os
+
+def test_sameArtifact(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    df = pd.DataFrame({'a': [1, 2]})
+
+    renders = []
+    renderTable = rep.renderTable
+    def slowRender(*args):
+        renders.append(1)
+        time.sleep(0.2)
+        renderTable(*args)
+    monkeypatch.setattr(rep, 'renderTable', slowRender)
+
+    # the second builder waits for the first, and reuses its table
+    with ThreadPoolExecutor(2) as ex:
+        list(ex.map(lambda _: rep.saveTable('Table1', df, override=True), range(2)))
+    assert len(renders) == 1
+
+    # a different table is not held up
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(2) as ex:
+        list(ex.map(lambda n: rep.saveTable(n, df, override=True), ['Table2', 'Table3']))
+    assert time.perf_counter() - t0 < 0.35
+    return
+
+def test_reportLock(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    events = []
+
+    def holdLock():
+        with rep.lock('report'):
+            events.append('held')
+            time.sleep(0.2)
+            events.append('released')
+    t = threading.Thread(target=holdLock)
+    t.start()
+    while events == []:
+        time.sleep(0.01)
+    rep.makeReport(tex_only=True)
+    events.append('built')
+    t.join()
+    assert events == ['held', 'released', 'built']
+    return
+
+def test_overrideAfterSkip(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.saveTable('T1', pd.DataFrame({'a': [1.0]}))
+    rep.saveTable('T1', pd.DataFrame({'a': [2.0]})) # exists, and no override: nothing is written
+    rep.saveTable('T1', pd.DataFrame({'a': [2.0]}), override=True)
+    assert '2.00' in open(os.path.join(rep.fpath, 'tables', 'T1.tex')).read()
+    return
@@ -0,0 +1,48 @@
+from lib.LaTeXreport import reportWriter as rw
+import matplotlib.pyplot as plt
+import pandas as pd
+import shutil, os
+
+def test_manifest(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Methods', level=2)
+    rep.addSection('Introduction')
+    rep.saveTable('Table1', pd.DataFrame({'value': [1.0, 2.0]}), caption='Some values')
+    rep.plotFigure('Line', lambda data: plt.plot(data), [1, 2, 3], caption='A line', option='scale=0.5')
+    shutil.copyfile(os.path.join(rep.fpath, 'figures', 'Line.png'),
+                    os.path.join(rep.fpath, 'figures', 'Copied.png')) # added by hand
+
+    # a fresh process gets the state back
+    rep2 = rw.Report('Test')
+    rep2.initialize(str(tmp_path / 'Test'))
+    assert list(rep2.sections) == ['Methods', 'Introduction']
+    assert rep2.sections['Methods']['level'] == 2
+    assert rep2.figures['Line.png']['caption'] == 'A line'
+    assert rep2.tables['Table1.tex']['caption'] == 'Some values'
+    assert [os.path.basename(f) for f in rep2.listArtifacts('figures', '.png')] == ['Line.png', 'Copied.png']
+    assert rep2.manifest.stale() == []
+
+    with open(os.path.join(rep.fpath, 'tables', 'Table1.tex'), 'a') as f:
+        f.write('% edited')
+    os.remove(os.path.join(rep.fpath, 'figures', 'Copied.png'))
+    assert sorted(item['name'] for item in rep2.manifest.stale()) == ['Copied.png', 'Table1.tex']
+    return
+
+def test_manifest_closesConnections(tmp_path, monkeypatch):
+    from lib.LaTeXreport import manifest
+    import sqlite3
+    opened = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(manifest.sqlite3, 'connect', lambda *args, **kwargs: opened.append(connect(*args, **kwargs)) or opened[-1])
+
+    man = manifest.Manifest(str(tmp_path / 'manifest.sqlite'))
+    man.items('table')
+    assert len(opened) == 2
+    for conn in opened:
+        try:
+            conn.execute('select 1')
+            assert False, 'the connection was left open'
+        except sqlite3.ProgrammingError:
+            pass
+    return
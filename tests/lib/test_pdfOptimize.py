@@ -0,0 +1,21 @@
+from lib.LaTeXreport import pdfOptimize
+import pytest
+
+def test_optimize(tmp_path):
+    pikepdf = pytest.importorskip('pikepdf')
+    from PIL import Image
+    import numpy as np
+
+    # the same image on three pages, embedded three times
+    img = Image.fromarray(np.random.RandomState(0).randint(0, 255, (300, 300, 3), dtype=np.uint8))
+    fpath = str(tmp_path / 'report.pdf')
+    img.save(fpath, save_all=True, append_images=[img.copy(), img.copy()])
+
+    stats = pdfOptimize.optimize(fpath)
+    assert stats['after'] < stats['before'] / 2
+    with pikepdf.open(fpath) as pdf:
+        assert len(pdf.pages) == 3 and pdf.is_linearized
+        images = {image.objgen for page in pdf.pages
+                  for _, _, image in pdfOptimize.imageXObjects(page.obj.Resources)}
+        assert len(images) == 1
+    return
@@ -0,0 +1,60 @@
+from lib.LaTeXreport import reportWriter as rw
+from lib.LaTeXreport.renderCache import RenderCache, makeKey
+import pandas as pd
+import os
+
+def test_renderCache_key(tmp_path):
+    df = pd.DataFrame({'a': [1, 2], 'b': [0.5, 1.5]})
+    assert makeKey('table', df, 'c') == makeKey('table', df.copy(), 'c')
+    assert makeKey('table', df, 'c') != makeKey('table', df, 'd')
+    df2 = df.copy()
+    df2.loc[1, 'b'] = 2.5
+    assert makeKey('table', df, 'c') != makeKey('table', df2, 'c')
+    return
+
+def test_renderCache_evict(tmp_path):
+    cache = RenderCache(root=str(tmp_path / 'cache'), maxBytes=150)
+    for i in range(3):
+        src = tmp_path / f'{i}.tex'
+        src.write_text('x' * 100)
+        cache.put(f'k{i}', '.tex', str(src))
+    assert cache.stats()['entries'] == 1
+    assert cache.get('k2', '.tex') is not None
+    assert cache.get('k0', '.tex') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    return
+
+def test_renderCache_report(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.renderCache = RenderCache(root=str(tmp_path / 'cache'))
+    df = pd.DataFrame({'a': [1, 2]})
+
+    rep.saveTable('Table1', df, caption='first', override=True)
+    rep.saveTable('Table1', df, caption='first', override=True)
+    assert (rep.renderCache.hits, rep.renderCache.misses) == (1, 1)
+
+    calls = []
+    def plot(data):
+        calls.append(1)
+        data.plot()
+    rep.plotFigure('Figure1', plot, df, override=True)
+    rep.plotFigure('Figure1', plot, df, override=True)
+    assert len(calls) == 1
+    assert os.path.exists(str(tmp_path / 'Test' / 'figures' / 'Figure1.png'))
+    return
+
+def test_plotFigure_closesFigures(tmp_path):
+    import matplotlib.pyplot as plt
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    plt.close('all')
+
+    def plot(data):
+        fig, ax = plt.subplots() # a figure of its own
+        ax.plot(data)
+        return fig
+    rep.plotFigure('Own', plot, [1, 2, 3])
+    rep.plotFigure('Frame', lambda data: data.plot(), pd.DataFrame({'a': [1, 2]}))
+    assert plt.get_fignums() == []
+    return
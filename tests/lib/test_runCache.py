@@ -0,0 +1,63 @@
+from lib.resultGraph import runCache
+import json, os, time
+
+def test_runCache(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    monkeypatch.setattr(runCache, 'CACHE_FOLDER', os.path.join(folder, 'cache'))
+    configs = os.path.join(folder, 'configs')
+    os.makedirs(configs)
+    os.makedirs(os.path.join(folder, 'modB'))
+    source = os.path.join(folder, 'modB', 'modB.py')
+    open(source, 'w').write('def main(resultsDict): pass\n')
+    inPath, outPath = os.path.join(folder, 'a.csv'), os.path.join(folder, 'out', 'b.csv')
+    open(inPath, 'w').write('1,2\n')
+    with open(os.path.join(configs, 'modB.json'), 'w') as f:
+        json.dump({'inputs' : {'a': {'type': 'file-csv', 'location': inPath}},
+                   'outputs': {'b': {'type': 'file-csv', 'location': outPath}}, 'params': {}}, f)
+
+    key = runCache.runKey('modB', source, {'workers': 2}, configFolder=configs)
+    assert key == runCache.runKey('modB', source, {'workers': 4, 'force': True}, configFolder=configs)
+    assert not runCache.restore('modB', key, configFolder=configs)
+
+    os.makedirs(os.path.dirname(outPath))
+    open(outPath, 'w').write('3\n')
+    runCache.store('modB', key, configFolder=configs)
+    os.remove(outPath)
+    assert runCache.restore('modB', key, configFolder=configs)
+    assert open(outPath).read() == '3\n'
+
+    # a changed input, source or argument changes the key
+    open(inPath, 'w').write('1,5\n')
+    assert runCache.runKey('modB', source, {}, configFolder=configs) != key
+    open(inPath, 'w').write('1,2\n')
+    assert runCache.runKey('modB', source, {}, configFolder=configs) == key
+    assert runCache.runKey('modB', source, {'year': 2020}, configFolder=configs) != key
+    open(source, 'a').write('# changed\n')
+    assert runCache.runKey('modB', source, {}, configFolder=configs) != key
+
+    # old entries are evicted
+    meta = os.path.join(runCache.CACHE_FOLDER, key, 'meta.json')
+    assert runCache.evict() == 0
+    os.utime(meta, (time.time() - 40 * 86400,) * 2)
+    assert runCache.evict() == 1 and not os.path.exists(meta)
+    return
+
+def test_runKey_uncacheable(tmp_path):
+    with open(os.path.join(str(tmp_path), 'modC.json'), 'w') as f:
+        json.dump({'inputs': {}, 'outputs': {'t': {'type': 'DB-dbTable', 'location': 'db.s.t'}}, 'params': {}}, f)
+    assert runCache.runKey('modC', 'modC.py', {}, configFolder=str(tmp_path)) is None
+    assert runCache.runKey('missing', 'missing.py', {}, configFolder=str(tmp_path)) is None
+
+    # file outputs, but read from a database
+    with open(os.path.join(str(tmp_path), 'modD.json'), 'w') as f:
+        json.dump({'inputs': {'t': {'type': 'DB-dbTable', 'location': 'db.s.t'}},
+                   'outputs': {'o': {'type': 'file-csv', 'location': 'o.csv'}}, 'params': {}}, f)
+    assert runCache.runKey('modD', 'modD.py', {}, configFolder=str(tmp_path)) is None
+    return
+
+def test_libImports(tmp_path):
+    open(str(tmp_path / 'modE.py'), 'w').write('from lib.testLib import simpleLib\nimport os\n')
+    found = runCache.libImports(str(tmp_path))
+    assert 'testLib' in found and 'configLib' in found # simpleLib imports lib.configLib
+    assert 'resultGraph' not in found
+    return
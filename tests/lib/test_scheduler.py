@@ -0,0 +1,49 @@
+from lib.resultGraph import scheduler
+import networkx as nx
+import os
+
+def writeModule(folder, name, fail=False):
+    path = os.path.join(folder, name + '.py')
+    with open(path, 'w') as f:
+        f.write('import os\n')
+        f.write('def main(resultsDict):\n')
+        f.write('    raise RuntimeError("broken")\n' if fail else
+                '    open(os.path.join({!r}, {!r}), "w").close()\n'.format(folder, name + '.done'))
+    return {'moduleName': name, 'path': path, 'execute': True}
+
+def test_runModules(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    graph = nx.DiGraph([('a', 'x'), ('x', 'b'), ('b', 'y'), ('y', 'd')])
+    graph.add_node('c')
+    monkeypatch.setattr(scheduler.graphLib, 'generateGraph', lambda: graph)
+
+    dag = scheduler.moduleDAG(['a', 'b', 'c', 'd'])
+    assert set(dag.edges) == {('a', 'b'), ('b', 'd')}
+    # modules that are not run do not hold others back
+    assert set(scheduler.moduleDAG(['a', 'd']).edges) == set()
+
+    for workers in [1, 2]:
+        modules = [writeModule(folder, 'a', fail=True)] + [writeModule(folder, n) for n in 'bcd']
+        result = scheduler.runModules(modules, {}, workers=workers)
+        assert result == {'finished': ['c'], 'failed': ['a'], 'cancelled': ['b', 'd']}
+        assert os.path.exists(os.path.join(folder, 'c.done'))
+
+    modules = [writeModule(folder, n) for n in 'dcba']
+    result = scheduler.runModules(modules, {}, workers=2)
+    assert result['finished'].index('a') < result['finished'].index('b') < result['finished'].index('d')
+    return
+
+def test_runModules_undeclared(tmp_path, monkeypatch):
+    # modules that declare no inputs or outputs keep their listed order
+    folder = str(tmp_path)
+    monkeypatch.setattr(scheduler.graphLib, 'generateGraph', lambda: nx.DiGraph())
+    modules = [writeModule(folder, n) for n in 'cab']
+    path = os.path.join(folder, 'reads.py')
+    with open(path, 'w') as f:
+        f.write('import os\ndef main(resultsDict):\n')
+        f.write('    assert os.path.exists(os.path.join({!r}, "b.done"))\n'.format(folder))
+    modules.append({'moduleName': 'reads', 'path': path, 'execute': True})
+
+    result = scheduler.runModules(modules, {})
+    assert result == {'finished': ['c', 'a', 'b', 'reads'], 'failed': [], 'cancelled': []}
+    return
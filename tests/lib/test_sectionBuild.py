@@ -0,0 +1,45 @@
+from lib.LaTeXreport import reportWriter as rw
+from lib.LaTeXreport.sectionBuild import SectionBuilder, COUNTERS
+from lib.LaTeXreport.buildProfile import BuildProfile
+import re
+
+def fakeCompile(filepath, **kwargs):
+    """Stands in for pdflatex: every section file has one section, and
+    its figure environments are counted."""
+    tex = open(filepath + '.tex').read()
+    counters = {c: int(v) for c, v in re.findall(r'\\setcounter\{(\w+)\}\{(\d+)\}', tex)}
+    name = re.search(r'\\input\{../sections/(\w+)\}', tex).group(1)
+    body = open(f'{filepath.rsplit("/output/", 1)[0]}/sections/{name}.tex').read()
+    counters['section'] += 1
+    counters['figure'] += body.count(r'\begin{figure}')
+    with open(filepath + '.log', 'w') as f:
+        f.write('SECTIONCOUNTERS ' + ' '.join(f'{c}={counters[c]}' for c in COUNTERS) + '\n')
+    open(filepath + '.pdf', 'w').close()
+    return 1
+
+def test_sectionBuild(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    for name in ['Introduction', 'Methods', 'Results']:
+        rep.addSection(name)
+    monkeypatch.setattr(rep, 'compileTex', fakeCompile)
+
+    def build():
+        prof = BuildProfile(memory=False)
+        lines = SectionBuilder(rep, workers=2).build(prof)
+        return prof.counts['sectionsCompiled'], lines
+
+    compiled, lines = build()
+    assert compiled == 3 and len(lines) == 3
+    assert '{1,section,1,{2 Methods},sec:Methods}' in lines[1]
+    assert build()[0] == 0
+
+    with open(rep.sections['Methods']['fpath'], 'a') as f:
+        f.write('\nMore text.')
+    assert build()[0] == 1
+
+    # a new figure in the first section renumbers the figures after it
+    with open(rep.sections['Introduction']['fpath'], 'a') as f:
+        f.write('\n\\begin{figure}\\end{figure}')
+    assert build()[0] == 3
+    return
@@ -0,0 +1,54 @@
+from lib.LaTeXreport import reportWriter as rw
+from lib.LaTeXreport.snippetPreview import SnippetPreview
+from PIL import Image
+import os
+
+def test_previewSnippet(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Introduction')
+
+    compiled = []
+    def compileTex(filepath, **kwargs):
+        compiled.append(open(filepath + '.tex').read())
+        open(filepath + '.pdf', 'wb').write(b'%PDF-1.4')
+        return 1
+    def rasterize(self, pdfPath, prefix):
+        Image.new('RGB', (20, 10), 'white').save(prefix + '-1.png')
+        return [prefix + '-1.png']
+    monkeypatch.setattr(rep, 'compileTex', compileTex)
+    monkeypatch.setattr(SnippetPreview, 'rasterize', rasterize)
+    monkeypatch.setattr(SnippetPreview, 'formatFile', lambda self, preamble: None)
+
+    pages = rep.previewSnippet('Introduction', display=False)
+    assert len(pages) == 1 and pages[0].startswith(b'\x89PNG')
+    assert '\\input{../sections/Introduction}' in compiled[0]
+    assert '\\begin{document}' in compiled[0] and 'graphicx' in compiled[0]
+
+    # unchanged: served from the cache, edited: recompiled
+    rep.previewSnippet('Introduction', display=False)
+    assert len(compiled) == 1
+    with open(os.path.join(rep.fpath, 'sections', 'Introduction.tex'), 'a') as f:
+        f.write('\nMore text.')
+    rep.previewSnippet('Introduction', display=False)
+    assert len(compiled) == 2
+    return
+
+def test_pageCount(tmp_path, monkeypatch):
+    import builtins
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    pdf = str(tmp_path / 'two.pdf')
+    open(pdf, 'wb').write(b'%PDF-1.4\n1 0 obj << /Type /Pages /Count 2 >>\n'
+                          b'2 0 obj << /Type /Page >>\n3 0 obj << /Type/Page >>\n')
+
+    # neither poppler, PyMuPDF nor pikepdf is needed
+    realImport = builtins.__import__
+    def noOptional(name, *args, **kwargs):
+        if name in ('fitz', 'pikepdf'):
+            raise ImportError(name)
+        return realImport(name, *args, **kwargs)
+    monkeypatch.setattr(builtins, '__import__', noOptional)
+    monkeypatch.setattr('shutil.which', lambda cmd: None)
+    assert SnippetPreview(rep).pageCount(pdf) == 2
+    return
@@ -0,0 +1,20 @@
+from lib.startupTime import startupTime
+
+def test_parseImportTimes():
+    text = ('import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _json\n'
+            'import time:       300 |        420 | json\n')
+    assert startupTime.parseImportTimes(text) == [('_json', 120e-6, 120e-6, 1), ('json', 300e-6, 420e-6, 0)]
+    return
+
+def test_helpIsLight():
+    total, medians, modules = startupTime.measure(runs=1)
+    assert 'logs.logDecorator' in medians
+    assert startupTime.heavyImports(modules) == []
+    return
+
+def test_librariesAreLight():
+    for command in startupTime.COMMANDS[1:]:
+        total, medians, modules = startupTime.measure(command, runs=1)
+        assert startupTime.heavyImports(modules) == [], command
+    return
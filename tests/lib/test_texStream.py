@@ -0,0 +1,22 @@
+from lib.LaTeXreport import reportWriter as rw
+from lib.LaTeXreport.texStream import StreamingReport
+import pandas as pd
+import os
+
+def test_streamingReport_sameTex(tmp_path):
+    texs = []
+    for cls in [rw.Report, StreamingReport]:
+        rep = cls('Test')
+        rep.initialize(str(tmp_path / cls.__name__))
+        apdxPath = os.path.join(rep.fpath, 'mappingTables')
+        pd.DataFrame({0: range(1500), 1: range(1500), 2: ['c'] * 1500}).to_csv(
+            os.path.join(apdxPath, 'Ranges.csv'), header=False, index=False)
+        pd.DataFrame({0: ['a', 'b', 'c'], 1: ['x', 'x', 'y']}).to_csv(
+            os.path.join(apdxPath, 'Codes.csv'), header=False, index=False)
+        rep.saveTable('Table1', pd.DataFrame({'a': [1.0, 2.0]}), caption='cap')
+        rep.addSection('Introduction')
+        rep.makeReport(tex_only=True)
+        texs.append(open(os.path.join(rep.outputPath, 'Test.tex')).read())
+
+    assert texs[0] == texs[1]
+    return
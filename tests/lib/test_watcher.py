@@ -0,0 +1,51 @@
+from lib.LaTeXreport import reportWriter as rw
+from lib.LaTeXreport.watcher import ReportWatcher
+import matplotlib.pyplot as plt
+import os
+
+def test_watcher(tmp_path):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Introduction')
+    rep.plotFigure('Line', lambda data: plt.plot(data), [1, 2, 3])
+
+    watcher = ReportWatcher(rep, useInotify=False, interval=0, debounce=0)
+    watcher.rebuild()
+    fig = os.path.join(rep.fpath, 'figures', 'Line.png')
+    encoded = watcher.fragments[fig]
+
+    # edit a section and add a new one
+    with open(rep.sections['Introduction']['fpath'], 'a') as f:
+        f.write('\nAn edited paragraph.')
+    with open(os.path.join(rep.fpath, 'sections', 'Methods.tex'), 'w') as f:
+        f.write(r'\section{Methods}Some methods.')
+
+    changed = watcher.step()
+    assert len(changed) == 2 and 'Methods' in rep.sections
+    page = open(os.path.join(rep.outputPath, 'Test.html')).read()
+    assert 'An edited paragraph.' in page and '<h2>Methods</h2>' in page
+    assert watcher.fragments[fig] is encoded # the unchanged image was not encoded again
+
+    assert watcher.step() == set()
+    return
+
+def test_watcherPdf(tmp_path, monkeypatch):
+    rep = rw.Report('Test')
+    rep.initialize(str(tmp_path / 'Test'))
+    rep.addSection('Introduction')
+    compiled = []
+    def fakeCompile(filepath, **kwargs):
+        compiled.append(os.path.dirname(os.path.abspath(filepath)))
+        open(filepath + '.pdf', 'w').write('%PDF')
+        return 1
+    monkeypatch.setattr(rep, 'compileTex', fakeCompile)
+
+    watcher = ReportWatcher(rep, preview=False, pdf=True, useInotify=False, interval=0, debounce=0)
+    watcher.rebuild()
+    with open(rep.sections['Introduction']['fpath'], 'a') as f:
+        f.write('\nAn edited paragraph.')
+    watcher.step()
+
+    assert len(compiled) == 2 and os.path.abspath(rep.outputPath) not in compiled
+    assert open(os.path.join(rep.outputPath, 'Test.pdf')).read() == '%PDF'
+    return